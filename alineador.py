@@ -0,0 +1,187 @@
+"""
+Etapa de alineación en línea: junta los flujos de 1 a 4 dispositivos sobre una
+grilla de tiempo común y emite cuadros sincronizados (tiempo, dispositivo, eje)
+a medida que llegan los bloques, sin pasar por los CSV.
+
+Cada ManejadorDispositivo entrega sus bloques con la hora alineada al PC de la
+primera muestra y el intervalo entre muestras (ver reloj_dispositivo.py). El
+alineador interpola linealmente cada eje en los instantes t_inicio + k / frecuencia
+y solo emite hasta la marca de agua: el mínimo, entre los dispositivos activos,
+de la hora de su última muestra menos `retardo`. Los puntos de la grilla que
+caen dentro de un hueco de un dispositivo salen como NaN.
+
+La salida se entrega a un callback (t_grilla, valores (K, D, 6) float32) y/o se
+escribe con EscritorAlineado en un archivo float32 crudo más un .json con la
+descripción (dispositivos, frecuencia, t_inicio).
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+FRECUENCIA_ALINEADO = 1000.0  # Hz de la grilla común
+RETARDO_ALINEADO    = 0.05    # s de margen detrás del dispositivo más atrasado
+TIMEOUT_INACTIVO    = 1.0     # s sin bloques para dejar de esperar a un dispositivo
+FACTOR_HUECO        = 3.0     # separación entre muestras (en dt) que se considera hueco
+CARPETA_ALINEADO    = "imu_alineado"
+
+
+class _FlujoDispositivo:
+    """Muestras recientes de un dispositivo, con memoria acotada."""
+
+    def __init__(self):
+        self.tiempos  = np.empty(0, dtype=np.float64)
+        self.valores  = np.empty((0, 6), dtype=np.float32)
+        self.dt       = None   # intervalo entre muestras más reciente
+        self.ultima_llegada = 0.0
+
+    @property
+    def t_ultima(self):
+        return self.tiempos[-1] if len(self.tiempos) else None
+
+    def agregar(self, t_muestra0, dt, muestras, ahora):
+        n = len(muestras)
+        t = t_muestra0 + dt * np.arange(n)
+        # Bloques fuera de orden o repetidos no retroceden el flujo
+        if self.t_ultima is not None:
+            nuevos = t > self.t_ultima
+            t, muestras = t[nuevos], np.asarray(muestras)[nuevos]
+        self.tiempos = np.concatenate([self.tiempos, t])
+        self.valores = np.concatenate([self.valores, np.asarray(muestras, dtype=np.float32)])
+        if dt > 0:
+            self.dt = dt
+        self.ultima_llegada = ahora
+
+    def recortar(self, t_desde):
+        """Descarta lo anterior a t_desde, conservando una muestra para interpolar."""
+        i = np.searchsorted(self.tiempos, t_desde) - 1
+        if i > 0:
+            self.tiempos = self.tiempos[i:]
+            self.valores = self.valores[i:]
+
+    def interpolar(self, grilla):
+        """(K, 6) interpolado en la grilla; NaN fuera del rango o dentro de huecos."""
+        salida = np.full((len(grilla), 6), np.nan, dtype=np.float32)
+        if len(self.tiempos) < 2:
+            return salida
+        derecha = np.searchsorted(self.tiempos, grilla)
+        valido = (derecha > 0) & (derecha < len(self.tiempos))
+        if self.dt:
+            izquierda = np.clip(derecha - 1, 0, len(self.tiempos) - 1)
+            separacion = self.tiempos[np.clip(derecha, 0, len(self.tiempos) - 1)] - self.tiempos[izquierda]
+            valido &= separacion <= FACTOR_HUECO * self.dt
+        # Coincidencia exacta con una muestra
+        exacto = np.isin(grilla, self.tiempos)
+        valido |= exacto
+        if not valido.any():
+            return salida
+        for eje in range(6):
+            salida[valido, eje] = np.interp(grilla[valido], self.tiempos, self.valores[:, eje])
+        return salida
+
+
+class AlineadorMultidispositivo:
+    """
+    Recibe bloques de varios dispositivos (agregar_bloque) y emite cuadros
+    sincronizados a `al_cuadro(t_grilla, valores)`. Seguro para llamarse desde
+    varios hilos escritores.
+    """
+
+    def __init__(self, ids, frecuencia=FRECUENCIA_ALINEADO, retardo=RETARDO_ALINEADO,
+                 al_cuadro=None, timeout_inactivo=TIMEOUT_INACTIVO):
+        self.ids        = list(ids)                  # orden de los dispositivos en cada cuadro
+        self.posicion   = {d: i for i, d in enumerate(self.ids)}
+        self.frecuencia = frecuencia
+        self.periodo    = 1.0 / frecuencia
+        self.retardo    = retardo
+        self.al_cuadro  = al_cuadro
+        self.timeout_inactivo = timeout_inactivo
+
+        self.flujos    = {d: _FlujoDispositivo() for d in self.ids}
+        self.t_inicio  = None   # primer instante de la grilla
+        self.k         = 0      # índice del próximo punto de la grilla a emitir
+        self.cuadros_emitidos = 0
+        self._lock = threading.Lock()
+
+    def agregar_bloque(self, id_disp, seq, muestras, t_muestra0, dt, t_recepcion=0.0, ms=0):
+        """Incorpora un bloque ya ordenado de un dispositivo y emite lo que ya se puede alinear."""
+        if id_disp not in self.posicion or t_muestra0 <= 0:
+            return
+        ahora = time.time()
+        with self._lock:
+            self.flujos[id_disp].agregar(t_muestra0, dt, muestras, ahora)
+            if self.t_inicio is None:
+                # La grilla arranca en un múltiplo del período para que sea reproducible
+                self.t_inicio = np.ceil(t_muestra0 * self.frecuencia) / self.frecuencia
+            self._emitir(ahora)
+
+    def _marca_de_agua(self, ahora):
+        ultimas = [
+            f.t_ultima for f in self.flujos.values()
+            if f.t_ultima is not None and ahora - f.ultima_llegada < self.timeout_inactivo
+        ]
+        return min(ultimas) - self.retardo if ultimas else None
+
+    def _emitir(self, ahora):
+        marca = self._marca_de_agua(ahora)
+        if marca is None:
+            return
+        k_fin = int(np.floor((marca - self.t_inicio) * self.frecuencia)) + 1
+        if k_fin <= self.k:
+            return
+        grilla = self.t_inicio + np.arange(self.k, k_fin) * self.periodo
+        valores = np.stack([self.flujos[d].interpolar(grilla) for d in self.ids], axis=1)
+        self.k = k_fin
+        self.cuadros_emitidos += len(grilla)
+        for f in self.flujos.values():
+            f.recortar(grilla[-1])
+        if self.al_cuadro is not None:
+            self.al_cuadro(grilla, valores)
+
+
+class EscritorAlineado:
+    """Escribe los cuadros alineados como float32 crudo (K, D, 6) más un .json descriptivo."""
+
+    def __init__(self, nombres, frecuencia=FRECUENCIA_ALINEADO, carpeta=CARPETA_ALINEADO):
+        os.makedirs(carpeta, exist_ok=True)
+        base = os.path.join(carpeta, f"alineado_{time.strftime('%Y%m%d_%H%M%S')}")
+        self.ruta = base + ".f32"
+        self.ruta_descripcion = base + ".json"
+        self.nombres    = list(nombres)
+        self.frecuencia = frecuencia
+        self.archivo    = open(self.ruta, "ab")
+        self.t_inicio   = None
+        self.cuadros    = 0
+
+    def __call__(self, grilla, valores):
+        if self.t_inicio is None:
+            self.t_inicio = float(grilla[0])
+            self._escribir_descripcion()
+        self.archivo.write(np.ascontiguousarray(valores, dtype="<f4").tobytes())
+        self.cuadros += len(grilla)
+
+    def _escribir_descripcion(self):
+        with open(self.ruta_descripcion, "w") as f:
+            json.dump({
+                "dispositivos": self.nombres,
+                "ejes": ["ax", "ay", "az", "gx", "gy", "gz"],
+                "frecuencia_hz": self.frecuencia,
+                "t_inicio": self.t_inicio,
+                "dtype": "<f4",
+                "forma_cuadro": [len(self.nombres), 6],
+            }, f, indent=2)
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+def leer_alineado(ruta_base):
+    """Devuelve (t, valores (K, D, 6), descripción) de un archivo escrito por EscritorAlineado."""
+    with open(ruta_base + ".json") as f:
+        descripcion = json.load(f)
+    d = len(descripcion["dispositivos"])
+    valores = np.fromfile(ruta_base + ".f32", dtype="<f4").reshape(-1, d, 6)
+    t = descripcion["t_inicio"] + np.arange(len(valores)) / descripcion["frecuencia_hz"]
+    return t, valores, descripcion
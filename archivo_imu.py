@@ -0,0 +1,382 @@
+"""
+Archivo comprimido de las sesiones (<disp>N.imuz), para guardar las capturas
+viejas sin el costo del CSV en texto.
+
+Las filas (block_seq + 6 ejes int16) se agrupan en trozos de ~FILAS_POR_TROZO
+filas que nunca parten un bloque. Cada trozo se codifica por canal:
+  - delta entre muestras consecutivas (los ejes cambian poco de una a la otra),
+  - byte shuffle (primero todos los bytes bajos, después los altos),
+  - compresor rápido: zstd o lz4 si están instalados, zlib si no.
+
+  cabecera  "<4s H B B I"  b"IMUZ", versión, formato original (csv/binario), códec, filas por trozo
+  trozos    comprimidos, uno detrás de otro
+  índice    por trozo "<Q I I I I Q": offset, bytes, filas, block_seq mínimo y máximo, fila inicial
+  cola      "<Q I 4s"      offset del índice, cantidad de trozos, b"IMUZ"
+
+El índice al final permite ubicar un block_seq y descomprimir solo su trozo.
+Los archivos chicos de la sesión (_tiempos.csv, _huecos.csv, .idx, _resumen.json)
+quedan como están; desempaquetar regenera el .csv (o el .imu) original.
+
+Uso:
+    python archivo_imu.py empaquetar [carpeta] [--codec zstd|lz4|zlib] [--borrar]
+    python archivo_imu.py desempaquetar [carpeta] [--borrar]
+    python archivo_imu.py medir [carpeta]      (tasa de compresión y MB/s de decodificación)
+"""
+import argparse
+import bisect
+import csv
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from sumideros import (
+    COLUMNAS, ENCABEZADO_CSV, EXTENSION_DATOS, FORMATO_CAB_DATOS, MARCA_DATOS, VERSION_BINARIO,
+    existe_binario,
+)
+
+EXTENSION_ARCHIVO = ".imuz"
+MARCA_ARCHIVO     = b"IMUZ"
+VERSION_ARCHIVO   = 1
+FORMATO_CAB_ARCHIVO = "<4s H B B I"
+FORMATO_TROZO       = "<Q I I I I Q"
+FORMATO_COLA        = "<Q I 4s"
+TAMANO_CAB_ARCHIVO  = struct.calcsize(FORMATO_CAB_ARCHIVO)
+TAMANO_TROZO        = struct.calcsize(FORMATO_TROZO)
+TAMANO_COLA         = struct.calcsize(FORMATO_COLA)
+
+FILAS_POR_TROZO = 21 * 1024   # ~1024 bloques de 21 muestras (~21 s a 1 kHz)
+
+FORMATO_CSV, FORMATO_BINARIO = 0, 1
+CODEC_ZLIB, CODEC_ZSTD, CODEC_LZ4 = 1, 2, 3
+NOMBRES_CODEC = {"zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD, "lz4": CODEC_LZ4}
+
+
+def _codec(codigo):
+    """(comprimir, descomprimir) del códec; zstd y lz4 son opcionales."""
+    if codigo == CODEC_ZSTD:
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdDecompressor().decompress
+    if codigo == CODEC_LZ4:
+        import lz4.frame
+        return lz4.frame.compress, lz4.frame.decompress
+    return (lambda datos: zlib.compress(datos, 6)), zlib.decompress
+
+
+def codec_disponible():
+    """El mejor códec instalado: zstd, si no lz4, si no zlib (siempre está)."""
+    for nombre in ("zstd", "lz4"):
+        try:
+            _codec(NOMBRES_CODEC[nombre])
+            return nombre
+        except ImportError:
+            continue
+    return "zlib"
+
+
+# ---- Codificación de un trozo ----
+
+def _shuffle(arr):
+    """(n, c) enteros -> bytes agrupados por canal y por byte (bajos de todas las filas, luego altos...)."""
+    planos = np.ascontiguousarray(arr.T).view(np.uint8).reshape(arr.shape[1], arr.shape[0], arr.itemsize)
+    return np.ascontiguousarray(planos.transpose(0, 2, 1)).tobytes()
+
+
+def _unshuffle(datos, filas, columnas, dtype):
+    dtype = np.dtype(dtype)
+    planos = np.frombuffer(datos, dtype=np.uint8).reshape(columnas, dtype.itemsize, filas)
+    return np.ascontiguousarray(planos.transpose(0, 2, 1)).view(dtype).reshape(columnas, filas).T
+
+
+def codificar_trozo(seq, valores, comprimir):
+    """seq (n,) y valores (n, 6) int16 -> bytes comprimidos."""
+    # El primer delta es el block_seq absoluto: el trozo se decodifica solo
+    delta_seq = np.diff(np.asarray(seq, dtype=np.int64), prepend=0).astype("<i8")
+    # La resta en int16 da la vuelta igual que la suma al decodificar: delta sin pérdida
+    valores = np.asarray(valores, dtype="<i2")
+    delta = np.diff(valores, axis=0, prepend=np.zeros((1, COLUMNAS), dtype="<i2"))
+    return comprimir(_shuffle(delta_seq.reshape(-1, 1)) + _shuffle(delta))
+
+
+def decodificar_trozo(datos, filas, descomprimir):
+    """Inversa de codificar_trozo: (seq uint32 (n,), valores int16 (n, 6))."""
+    crudo = descomprimir(datos)
+    delta_seq = _unshuffle(crudo[:filas * 8], filas, 1, "<i8")[:, 0]
+    delta = _unshuffle(crudo[filas * 8:], filas, COLUMNAS, "<i2")
+    seq = np.cumsum(delta_seq).astype(np.uint32)
+    valores = np.cumsum(delta, axis=0, dtype=np.int16)
+    return seq, valores
+
+
+def _cortes_trozos(seq, filas_por_trozo):
+    """Índices de inicio de trozo: cada ~filas_por_trozo filas, siempre en un cambio de block_seq."""
+    cambios = np.flatnonzero(np.diff(seq)) + 1
+    cortes, siguiente = [0], filas_por_trozo
+    for i in cambios[np.searchsorted(cambios, filas_por_trozo):]:
+        if i >= siguiente:
+            cortes.append(int(i))
+            siguiente = i + filas_por_trozo
+    return cortes
+
+
+# ---- Archivo ----
+
+def escribir_archivo(ruta, seq, valores, formato=FORMATO_CSV, codec=None, filas_por_trozo=FILAS_POR_TROZO):
+    """
+    Escribe el .imuz de una tabla (seq, valores). Devuelve los bytes escritos.
+    codec=None usa el mejor instalado (codec_disponible()).
+    """
+    codigo = NOMBRES_CODEC[codec or codec_disponible()]
+    comprimir, _ = _codec(codigo)
+    seq = np.asarray(seq)
+    cortes = _cortes_trozos(seq, filas_por_trozo) if len(seq) else []
+    indice = []
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(struct.pack(FORMATO_CAB_ARCHIVO, MARCA_ARCHIVO, VERSION_ARCHIVO, formato, codigo, filas_por_trozo))
+        for inicio, fin in zip(cortes, cortes[1:] + [len(seq)]):
+            datos = codificar_trozo(seq[inicio:fin], valores[inicio:fin], comprimir)
+            trozo_seq = seq[inicio:fin]
+            indice.append((f.tell(), len(datos), fin - inicio, int(trozo_seq.min()), int(trozo_seq.max()), inicio))
+            f.write(datos)
+        offset_indice = f.tell()
+        for entrada in indice:
+            f.write(struct.pack(FORMATO_TROZO, *entrada))
+        f.write(struct.pack(FORMATO_COLA, offset_indice, len(indice), MARCA_ARCHIVO))
+        tamano = f.tell()
+    os.replace(temporal, ruta)
+    return tamano
+
+
+class ArchivoIMU:
+    """Lector de un .imuz: solo lee la cabecera y el índice al abrir; los trozos, a pedido."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.f = open(ruta, "rb")
+        marca, version, self.formato, self.codec, self.filas_por_trozo = struct.unpack(
+            FORMATO_CAB_ARCHIVO, self.f.read(TAMANO_CAB_ARCHIVO)
+        )
+        if marca != MARCA_ARCHIVO or version != VERSION_ARCHIVO:
+            raise ValueError(f"{ruta}: archivo no reconocido ({marca!r}, v{version})")
+        self.f.seek(-TAMANO_COLA, os.SEEK_END)
+        offset_indice, n_trozos, marca = struct.unpack(FORMATO_COLA, self.f.read(TAMANO_COLA))
+        if marca != MARCA_ARCHIVO:
+            raise ValueError(f"{ruta}: archivo incompleto (sin índice)")
+        self.f.seek(offset_indice)
+        self.trozos = list(struct.iter_unpack(FORMATO_TROZO, self.f.read(n_trozos * TAMANO_TROZO)))
+        self.filas = sum(t[2] for t in self.trozos)
+        _, self._descomprimir = _codec(self.codec)
+        self._filas_inicio = [t[5] for t in self.trozos]
+
+    def trozo(self, i):
+        """(seq, valores) del trozo i."""
+        offset, tamano, filas, _, _, _ = self.trozos[i]
+        self.f.seek(offset)
+        return decodificar_trozo(self.f.read(tamano), filas, self._descomprimir)
+
+    def tabla(self):
+        """(seq, valores) de todo el archivo."""
+        if not self.trozos:
+            return np.empty(0, dtype=np.uint32), np.empty((0, COLUMNAS), dtype=np.int16)
+        partes = [self.trozo(i) for i in range(len(self.trozos))]
+        return np.concatenate([p[0] for p in partes]), np.concatenate([p[1] for p in partes])
+
+    def bloque(self, block_seq):
+        """
+        Filas (n, 6) del bloque `block_seq` descomprimiendo solo su trozo, o None.
+        Si el dispositivo se reinició y el seq aparece más de una vez, la primera.
+        """
+        for i, (_, _, _, minimo, maximo, _) in enumerate(self.trozos):
+            if not minimo <= block_seq <= maximo:
+                continue
+            seq, valores = self.trozo(i)
+            filas = np.flatnonzero(seq == block_seq)
+            if len(filas):
+                saltos = np.flatnonzero(np.diff(filas) != 1)
+                fin = filas[saltos[0]] if len(saltos) else filas[-1]
+                return valores[filas[0]:fin + 1]
+        return None
+
+    def filas_rango(self, inicio, fin):
+        """Filas [inicio, fin) como (seq, valores), descomprimiendo solo los trozos necesarios."""
+        primero = max(bisect.bisect_right(self._filas_inicio, inicio) - 1, 0)
+        ultimo = bisect.bisect_left(self._filas_inicio, fin)
+        partes = [self.trozo(i) for i in range(primero, ultimo)]
+        if not partes:
+            return np.empty(0, dtype=np.uint32), np.empty((0, COLUMNAS), dtype=np.int16)
+        base = self._filas_inicio[primero]
+        seq = np.concatenate([p[0] for p in partes])[inicio - base:fin - base]
+        valores = np.concatenate([p[1] for p in partes])[inicio - base:fin - base]
+        return seq, valores
+
+    def cerrar(self):
+        self.f.close()
+
+
+# ---- Sesiones ----
+
+def _ruta_datos(ruta_base, formato):
+    return ruta_base + (EXTENSION_DATOS if formato == FORMATO_BINARIO else ".csv")
+
+
+def empaquetar(ruta_base, codec=None, borrar=False):
+    """
+    <disp>N.csv (o .imu) -> <disp>N.imuz. Devuelve (bytes originales, bytes del archivo).
+    codec=None usa el mejor instalado (codec_disponible()).
+    """
+    from sesion_imu import DispositivoSesion
+
+    disp = DispositivoSesion(ruta_base)
+    formato = FORMATO_BINARIO if disp.binario else FORMATO_CSV
+    seq, valores = np.asarray(disp.seq_por_fila()), np.asarray(disp.muestras())
+    ruta_datos = _ruta_datos(ruta_base, formato)
+    tamano = escribir_archivo(ruta_base + EXTENSION_ARCHIVO, seq, valores, formato, codec)
+    original = os.path.getsize(ruta_datos)
+
+    # Verificar antes de borrar el original
+    archivo = ArchivoIMU(ruta_base + EXTENSION_ARCHIVO)
+    try:
+        seq2, valores2 = archivo.tabla()
+    finally:
+        archivo.cerrar()
+    if not (np.array_equal(seq, seq2) and np.array_equal(valores, valores2)):
+        os.remove(ruta_base + EXTENSION_ARCHIVO)
+        raise ValueError(f"{ruta_base}: la verificación del archivo falló, se conserva el original")
+    if borrar:
+        os.remove(ruta_datos)
+        try:
+            os.remove(ruta_base + ".cache.npy")
+        except OSError:
+            pass
+    return original, tamano
+
+
+def desempaquetar(ruta_base, borrar=False):
+    """<disp>N.imuz -> el .csv (o .imu) original. Devuelve la cantidad de filas."""
+    archivo = ArchivoIMU(ruta_base + EXTENSION_ARCHIVO)
+    try:
+        formato = archivo.formato
+        if formato == FORMATO_BINARIO:
+            with open(ruta_base + EXTENSION_DATOS + ".tmp", "wb") as f:
+                f.write(struct.pack(FORMATO_CAB_DATOS, MARCA_DATOS, VERSION_BINARIO, COLUMNAS))
+                for i in range(len(archivo.trozos)):
+                    f.write(archivo.trozo(i)[1].astype("<i2").tobytes())
+        else:
+            with open(ruta_base + ".csv.tmp", "w", newline="") as f:
+                escritor = csv.writer(f)
+                escritor.writerow(ENCABEZADO_CSV)
+                for i in range(len(archivo.trozos)):
+                    seq, valores = archivo.trozo(i)
+                    escritor.writerows(np.column_stack([seq.astype(np.int64), valores]).tolist())
+        filas = archivo.filas
+    finally:
+        archivo.cerrar()
+    ruta_datos = _ruta_datos(ruta_base, formato)
+    os.replace(ruta_datos + ".tmp", ruta_datos)
+    if borrar:
+        os.remove(ruta_base + EXTENSION_ARCHIVO)
+    return filas
+
+
+def encontrar_dispositivos(base_dir, extension):
+    """Rutas sin extensión de cada <disp>N<extension> dentro de las carpetas imu_capturasN."""
+    from sesion_imu import PREFIJO_SESION, obtener_indices_sesion
+
+    rutas = []
+    for n in obtener_indices_sesion(base_dir):
+        ruta_sesion = os.path.join(base_dir, f"{PREFIJO_SESION}{n}")
+        for sub in sorted(os.listdir(ruta_sesion)):
+            base = os.path.join(ruta_sesion, sub, sub)
+            if os.path.isfile(base + extension):
+                rutas.append(base)
+    return rutas
+
+
+def medir(base_dir):
+    """Tasa de compresión y velocidad de decodificación de cada códec disponible."""
+    rutas = [r for r in encontrar_dispositivos(base_dir, ".csv")] + [
+        r for r in encontrar_dispositivos(base_dir, EXTENSION_DATOS) if existe_binario(r)
+    ]
+    if not rutas:
+        print("No se encontraron sesiones en:", base_dir)
+        return
+    from sesion_imu import DispositivoSesion
+
+    tablas = []
+    original = 0
+    for ruta in rutas:
+        disp = DispositivoSesion(ruta)
+        tablas.append((np.asarray(disp.seq_por_fila()), np.asarray(disp.muestras())))
+        original += os.path.getsize(_ruta_datos(ruta, FORMATO_BINARIO if disp.binario else FORMATO_CSV))
+    filas = sum(len(s) for s, _ in tablas)
+    crudo = filas * (4 + 2 * COLUMNAS)
+    print(f"{len(rutas)} archivos, {filas:,} filas: {original / 1e6:.1f} MB en disco, "
+          f"{crudo / 1e6:.1f} MB como int32 + 6 int16\n")
+    print(f"{'códec':<6} {'MB':>8} {'vs disco':>9} {'vs crudo':>9} {'codif MB/s':>11} {'decod MB/s':>11}")
+
+    temporal = os.path.join(base_dir, "_medicion" + EXTENSION_ARCHIVO)
+    for nombre in ("zlib", "lz4", "zstd"):
+        try:
+            _codec(NOMBRES_CODEC[nombre])
+        except ImportError:
+            print(f"{nombre:<6} (no instalado)")
+            continue
+        tamano, t_cod, t_dec = 0, 0.0, 0.0
+        for seq, valores in tablas:
+            t0 = time.perf_counter()
+            tamano += escribir_archivo(temporal, seq, valores, codec=nombre)
+            t_cod += time.perf_counter() - t0
+            t0 = time.perf_counter()
+            archivo = ArchivoIMU(temporal)
+            archivo.tabla()
+            archivo.cerrar()
+            t_dec += time.perf_counter() - t0
+        os.remove(temporal)
+        print(f"{nombre:<6} {tamano / 1e6:>8.2f} {original / tamano:>8.1f}x {crudo / tamano:>8.1f}x "
+              f"{crudo / 1e6 / t_cod:>11.0f} {crudo / 1e6 / t_dec:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivo comprimido (.imuz) de sesiones IMU")
+    parser.add_argument("orden", choices=["empaquetar", "desempaquetar", "medir"])
+    parser.add_argument("carpeta", nargs="?", default=".")
+    parser.add_argument("--codec", choices=sorted(NOMBRES_CODEC), default=None,
+                        help="por defecto el mejor instalado (zstd > lz4 > zlib)")
+    parser.add_argument("--borrar", action="store_true", help="borrar el original una vez verificado")
+    args = parser.parse_args()
+
+    if args.orden == "medir":
+        medir(args.carpeta)
+        return
+
+    if args.orden == "empaquetar":
+        codec = args.codec or codec_disponible()
+        rutas = encontrar_dispositivos(args.carpeta, ".csv") + [
+            r for r in encontrar_dispositivos(args.carpeta, EXTENSION_DATOS) if existe_binario(r)
+        ]
+        total_original = total_archivo = 0
+        t0 = time.perf_counter()
+        for ruta in rutas:
+            original, tamano = empaquetar(ruta, codec, args.borrar)
+            total_original += original
+            total_archivo += tamano
+            print(f"[IMUZ] {ruta}{EXTENSION_ARCHIVO}  {original / 1e6:.2f} MB -> {tamano / 1e6:.2f} MB")
+        if rutas:
+            print(f"\n{len(rutas)} archivos ({codec}): {total_original / 1e6:.1f} MB -> "
+                  f"{total_archivo / 1e6:.1f} MB ({total_original / total_archivo:.1f}x) "
+                  f"en {time.perf_counter() - t0:.1f} s")
+    else:
+        rutas = encontrar_dispositivos(args.carpeta, EXTENSION_ARCHIVO)
+        for ruta in rutas:
+            filas = desempaquetar(ruta, args.borrar)
+            print(f"[OK] {ruta}: {filas} filas")
+    if not rutas:
+        print("No se encontraron archivos para procesar en:", args.carpeta, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
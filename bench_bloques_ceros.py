@@ -0,0 +1,159 @@
+"""
+Benchmark de la detección de bloques en cero de revisador_bloques.py sobre un
+CSV sintético de varios millones de filas: la versión original (fila por fila
+con csv.reader) frente a la vectorizada (np.diff + np.add.reduceat), esta
+última en frío (parsea el CSV y arma el caché .npy de sesion_imu) y con el
+caché ya hecho (memoria mapeada). Verifica que las tres den lo mismo.
+
+Uso: python bench_bloques_ceros.py [filas] [carpeta]
+"""
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from revisador_bloques import MUESTRAS_POR_BLOQUE, detectar_bloques_ceros_en_csv
+from sesion_imu import SUFIJO_CACHE
+from sumideros import ENCABEZADO_CSV
+
+PROB_HUECO    = 0.02   # bloques enteros en cero (relleno por pérdida)
+PROB_CORTO    = 0.002  # bloques en cero con menos filas (no cuentan)
+PROB_REINICIO = 1e-4  # el block_seq vuelve a 0
+
+
+def detectar_bloques_ceros_filas(ruta_csv):
+    """Copia de la versión original de revisador_bloques.py (referencia)."""
+
+    bloques_ceros = []
+
+    if not os.path.isfile(ruta_csv):
+        return bloques_ceros
+
+    with open(ruta_csv, newline="") as f:
+        reader = csv.reader(f)
+        first_row = True
+
+        current_seq = None
+        any_non_zero = False
+        filas_en_bloque = 0
+
+        def cerrar_bloque():
+            nonlocal current_seq, any_non_zero, filas_en_bloque, bloques_ceros
+            if current_seq is None:
+                return
+            if (not any_non_zero) and (filas_en_bloque == MUESTRAS_POR_BLOQUE):
+                bloques_ceros.append((current_seq, filas_en_bloque))
+
+        for row in reader:
+            if not row:
+                continue
+
+            if first_row:
+                first_row = False
+                try:
+                    int(row[0])
+                except ValueError:
+                    continue
+
+            try:
+                seq = int(row[0])
+            except ValueError:
+                continue
+
+            valores = row[1:7]
+            all_zero_this_row = True
+            for v in valores:
+                try:
+                    if int(v) != 0:
+                        all_zero_this_row = False
+                        break
+                except ValueError:
+                    try:
+                        if float(v) != 0.0:
+                            all_zero_this_row = False
+                            break
+                    except ValueError:
+                        all_zero_this_row = False
+                        break
+
+            if current_seq is None:
+                current_seq = seq
+                filas_en_bloque = 1
+                any_non_zero = not all_zero_this_row
+            elif seq == current_seq:
+                filas_en_bloque += 1
+                if not all_zero_this_row:
+                    any_non_zero = True
+            else:
+                cerrar_bloque()
+                current_seq = seq
+                filas_en_bloque = 1
+                any_non_zero = not all_zero_this_row
+
+        cerrar_bloque()
+
+    return bloques_ceros
+
+
+def generar_csv(ruta, filas, semilla=0):
+    """CSV block_seq,ax..gz con huecos en cero, bloques cortos y algún reinicio."""
+    rng = np.random.default_rng(semilla)
+    n_bloques = filas // MUESTRAS_POR_BLOQUE
+    largos = np.full(n_bloques, MUESTRAS_POR_BLOQUE)
+    cortos = rng.random(n_bloques) < PROB_CORTO
+    largos[cortos] = rng.integers(1, MUESTRAS_POR_BLOQUE, cortos.sum())
+    en_cero = (rng.random(n_bloques) < PROB_HUECO) | cortos
+
+    seq_bloque = np.arange(n_bloques, dtype=np.int64)
+    for i in np.flatnonzero(rng.random(n_bloques) < PROB_REINICIO):
+        seq_bloque[i:] -= seq_bloque[i]
+
+    seq = np.repeat(seq_bloque, largos)
+    valores = rng.integers(-2000, 2000, (len(seq), 6), dtype=np.int16)
+    valores[np.repeat(en_cero, largos)] = 0
+    # Un bloque casi en cero: una sola fila con datos no lo convierte en hueco
+    valores[np.repeat(np.arange(n_bloques) == 1, largos)] = 0
+    valores[MUESTRAS_POR_BLOQUE + 5, 2] = 7
+
+    tabla = np.column_stack([seq, valores])
+    with open(ruta, "w") as f:
+        f.write(",".join(ENCABEZADO_CSV) + "\n")
+        np.savetxt(f, tabla, fmt="%d", delimiter=",")
+    return len(seq)
+
+
+def cronometrar(funcion):
+    t0 = time.perf_counter()
+    resultado = funcion()
+    return time.perf_counter() - t0, resultado
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000_000
+    carpeta = sys.argv[2] if len(sys.argv) > 2 else tempfile.gettempdir()
+    ruta = os.path.join(carpeta, f"bench_bloques_ceros_{filas}.csv")
+    if not os.path.exists(ruta):
+        print(f"Generando {ruta} ...")
+        generar_csv(ruta, filas)
+    try:
+        os.remove(os.path.splitext(ruta)[0] + SUFIJO_CACHE)
+    except OSError:
+        pass
+    mb = os.path.getsize(ruta) / 1e6
+
+    t_filas, ref  = cronometrar(lambda: detectar_bloques_ceros_filas(ruta))
+    t_frio, frio  = cronometrar(lambda: detectar_bloques_ceros_en_csv(ruta))
+    t_cache, cache = cronometrar(lambda: detectar_bloques_ceros_en_csv(ruta))
+    assert frio == ref and cache == ref, "la versión vectorizada no coincide con la original"
+
+    print(f"{filas:,} filas ({mb:.0f} MB), {len(ref)} bloques en cero (resultados idénticos)\n")
+    print(f"{'fila por fila':<22} {t_filas:8.2f} s")
+    print(f"{'vectorizado (frío)':<22} {t_frio:8.2f} s   x{t_filas / t_frio:.1f}")
+    print(f"{'vectorizado (caché)':<22} {t_cache:8.3f} s   x{t_filas / t_cache:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Microbenchmark del decodificador de payloads IMU2: decodificar_carga (struct,
+una muestra por iteración, tal como está en los receptores) frente a
+decodificador_imu (np.frombuffer por bloque y por lote).
+
+Uso: python bench_decodificador.py [paquetes]
+"""
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from decodificador_imu import decodificar_bloque, decodificar_lote, muestras_en_payload
+
+TAMANOS_BLOQUE = [256, 1024, 4096]
+
+
+def decodificar_carga(payload):
+    """Copia de la versión de Comunicacion_UDP_buff256_*.py (referencia)."""
+    muestras = []
+    util = len(payload) - 4
+    for i in range(0, util, 12):
+        fragmento = payload[i:i+12]
+        if len(fragmento) < 12:
+            break
+        datos = struct.unpack(">6h", fragmento)
+        muestras.append(datos)
+    return muestras
+
+
+def cronometrar(funcion, repeticiones=3):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def main():
+    num_paquetes = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print(f"{num_paquetes} paquetes por caso (mejor de 3)\n")
+    print(f"{'bloque':>7} {'muestras':>8} | {'struct':>12} {'np bloque':>12} {'np lote':>12} | "
+          f"{'x bloque':>8} {'x lote':>8}")
+
+    for tam in TAMANOS_BLOQUE:
+        n = muestras_en_payload(tam)
+        payloads = [os.urandom(tam) for _ in range(num_paquetes)]
+
+        # Mismo resultado en los tres caminos
+        ref = np.array(decodificar_carga(payloads[0]), dtype=np.int16)
+        assert np.array_equal(ref, decodificar_bloque(payloads[0], n))
+        assert np.array_equal(ref, decodificar_lote(payloads[:1], n)[0])
+
+        t_struct = cronometrar(lambda: [decodificar_carga(p) for p in payloads])
+        t_bloque = cronometrar(lambda: [decodificar_bloque(p, n) for p in payloads])
+        t_lote   = cronometrar(lambda: decodificar_lote(payloads, n))
+
+        muestras_totales = num_paquetes * n
+        def tasa(t):
+            return f"{muestras_totales / t / 1e6:8.2f} Mm/s"
+
+        print(f"{tam:>7} {n:>8} | {tasa(t_struct):>12} {tasa(t_bloque):>12} {tasa(t_lote):>12} | "
+              f"{t_struct / t_bloque:7.1f}x {t_struct / t_lote:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Pérdida efectiva de muestras frente a ancho de banda extra, con y sin FEC
+(fec_imu.py), para varios modelos de pérdida de simulador_flota.py. Cada caso
+es una corrida de punta a punta de bench_receptor.py por loopback:
+
+  pérdida    filas en cero / filas escritas (lo que queda sin reconstruir)
+  extra      bytes de redundancia / bytes de los mismos bloques sin FEC
+  reconstr.  bloques que el receptor reconstruyó con la redundancia
+
+Uso: python bench_fec.py [-r Comunicacion_UDP_buff256_1KHz.py] [-n 4] [-t 5]
+"""
+import argparse
+
+from bench_receptor import RECEPTOR_DEFECTO, correr
+from simulador_flota import ModeloRed
+
+MODELOS = {
+    "sueltas 3%":       dict(perdida=0.03),
+    "ráfagas ~3":       dict(rafaga=0.01, largo_rafaga=3),
+    "sueltas+ráfagas":  dict(perdida=0.01, rafaga=0.005, largo_rafaga=6),
+    "sueltas+reorden":  dict(perdida=0.03, reorden=0.1),
+}
+
+# (modo, bloques): sin FEC, copias de los 1 o 2 anteriores, paridad cada 4 u 8
+CASOS = [(None, None), ("copia", 1), ("copia", 2), ("paridad", 4), ("paridad", 8)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FEC: pérdida efectiva frente a ancho de banda extra")
+    parser.add_argument("-r", "--receptor", default=RECEPTOR_DEFECTO, help="script del receptor")
+    parser.add_argument("-n", "--dispositivos", type=int, default=4)
+    parser.add_argument("-f", "--frecuencia", type=float, default=1000.0, help="Hz de muestreo")
+    parser.add_argument("-t", "--duracion", type=float, default=5.0, help="segundos de envío por caso")
+    args = parser.parse_args()
+
+    print(f"{args.receptor}: {args.dispositivos} dispositivos a {args.frecuencia:.0f} Hz, "
+          f"{args.duracion:.1f} s por caso\n")
+    print(f"{'modelo':<17} {'fec':<11} | {'pérdida':>8} {'extra':>8} {'reconstr.':>9}")
+    for nombre, parametros in MODELOS.items():
+        for modo, bloques in CASOS:
+            r = correr(args.receptor, args.dispositivos, args.frecuencia, args.duracion,
+                       ModeloRed(**parametros), fec=modo, fec_bloques=bloques)
+            perdida = r["filas_cero"] / r["filas"] if r["filas"] else 0.0
+            extra = r["bytes_fec"] / r["bytes_bloques"] if r["bytes_bloques"] else 0.0
+            etiqueta = f"{modo} {bloques}" if modo else "sin FEC"
+            print(f"{nombre:<17} {etiqueta:<11} | {perdida:>8.2%} {extra:>8.1%} {r['fec'] or 0:>9d}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark de recepción UDP por loopback: paquetes/s con recvfrom (un datagrama
+por syscall, como el receptor original) frente al anillo de recepcion_lotes
+(recv_into y recvmmsg). Varios procesos emisores saturan el puerto y se mide
+cuántos datagramas IMU2 procesa el receptor por segundo.
+
+Uso: python bench_recepcion.py [segundos] [emisores]
+"""
+import multiprocessing as mp
+import socket
+import struct
+import sys
+import time
+
+from recepcion_lotes import (
+    AnilloRecepcion, crear_socket, desempaquetar_cabecera,
+    FORMATO_CABECERA, MARCA_MAGICA, TAMANO_CABECERA,
+)
+
+IP     = "127.0.0.1"
+PUERTO = 50123
+TAM_BLOQUE = 256
+
+
+def emisor(id_disp, parar):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    payload = bytes(TAM_BLOQUE)
+    seq = 0
+    while not parar.is_set():
+        for _ in range(256):
+            cab = struct.pack(FORMATO_CABECERA, MARCA_MAGICA, 1, id_disp, 0, seq, 0, TAM_BLOQUE)
+            try:
+                s.sendto(cab + payload, (IP, PUERTO))
+            except OSError:
+                pass
+            seq += 1
+    s.close()
+
+
+def medir_recvfrom(sock, duracion):
+    """Receptor original: bytes nuevos por datagrama y slices de cabecera/payload."""
+    sock.settimeout(0.5)
+    n = 0
+    fin = time.perf_counter() + duracion
+    while time.perf_counter() < fin:
+        try:
+            datos, _ = sock.recvfrom(4096)
+        except socket.timeout:
+            continue
+        if len(datos) < TAMANO_CABECERA:
+            continue
+        marca, ver, id_disp, rsv, seq, ms, longitud = struct.unpack(
+            FORMATO_CABECERA, datos[:TAMANO_CABECERA]
+        )
+        payload = datos[TAMANO_CABECERA:]
+        if marca == MARCA_MAGICA and len(payload) == longitud:
+            n += 1
+    return n
+
+
+def medir_anillo(sock, duracion, usar_recvmmsg):
+    anillo = AnilloRecepcion(sock, usar_recvmmsg=usar_recvmmsg)
+    n = 0
+    fin = time.perf_counter() + duracion
+    while time.perf_counter() < fin:
+        for vista in anillo.drenar(0.5):
+            if desempaquetar_cabecera(vista) is not None:
+                n += 1
+    return n, anillo.modo
+
+
+def correr(nombre, medir, duracion, num_emisores):
+    sock = crear_socket(IP, PUERTO, rcvbuf=4_000_000)
+    parar = mp.Event()
+    procesos = [mp.Process(target=emisor, args=(i + 1, parar)) for i in range(num_emisores)]
+    for p in procesos:
+        p.start()
+    time.sleep(0.3)  # que los emisores arranquen
+
+    t0 = time.perf_counter()
+    resultado = medir(sock, duracion)
+    dt = time.perf_counter() - t0
+
+    parar.set()
+    for p in procesos:
+        p.join()
+    sock.close()
+
+    if isinstance(resultado, tuple):
+        n, nombre = resultado[0], f"{nombre} ({resultado[1]})"
+    else:
+        n = resultado
+    print(f"{nombre:28s} {n:>10d} paquetes  {n / dt:>12,.0f} paq/s")
+    return n / dt
+
+
+def main():
+    duracion     = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    num_emisores = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    print(f"Loopback {IP}:{PUERTO}, {num_emisores} emisores, {duracion:.1f} s por modo\n")
+    base = correr("recvfrom", medir_recvfrom, duracion, num_emisores)
+    into = correr("anillo", lambda s, d: medir_anillo(s, d, False), duracion, num_emisores)
+    mmsg = correr("anillo", lambda s, d: medir_anillo(s, d, True), duracion, num_emisores)
+    print(f"\nrecv_into / recvfrom = {into / base:.2f}x   recvmmsg / recvfrom = {mmsg / base:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
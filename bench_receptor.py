@@ -0,0 +1,207 @@
+"""
+Benchmark de punta a punta de un receptor: lo lanza como proceso aparte en una
+carpeta temporal, le manda la flota de simulador_flota.py por loopback y mide
+
+  - paquetes/s y muestras/s sostenidos (bloques que terminaron escritos en las sesiones),
+  - CPU del receptor por paquete y por muestra (utime + stime de /proc/<pid>/stat),
+  - descartes del kernel en el socket (columna drops de /proc/net/udp),
+  - tasa de relleno con ceros (filas en cero / filas escritas).
+
+Con --tam-bloque se comparan bloques de 256 B y de 1024 B (o una flota mezclada,
+--tam-bloque 256,1024) a igual frecuencia de muestreo: el costo por muestra es
+lo que se ahorra con bloques más grandes.
+
+Con --nack el receptor pide retransmisión de los huecos y los emisores la
+atienden: se informan los bloques recuperados e irrecuperables, los pedidos
+cuyo original llegó demorado antes que el reenvío (de la última línea de
+estado del receptor) y el ancho de banda extra (NACKs + reenvíos sobre lo
+enviado normalmente). Con --fec, los bloques reconstruidos por el
+receptor y el ancho de banda de la redundancia (comparación completa en bench_fec.py).
+
+Uso: python bench_receptor.py [-r Comunicacion_UDP_buff256_1KHz.py] [-n 4] [-f 1000] [-t 10]
+         [--tam-bloque 1024] ...
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from metricas import drops_kernel
+from simulador_flota import (
+    argumentos_flota, argumentos_modelo, correr_flota, modelo_desde, totales, PUERTO_DESTINO, TAM_BLOQUE,
+)
+from sumideros import leer_indice, existe_binario, TIPO_HUECO, EXTENSION_INDICE
+
+RECEPTOR_DEFECTO = "Comunicacion_UDP_buff256_1KHz.py"
+ESPERA_ARRANQUE  = 1.5   # s para que el receptor abra el socket
+ESPERA_DRENADO   = 1.0   # s para que termine de escribir lo recibido
+PATRON_NACK      = re.compile(r"recup=(\d+) irrec=(\d+) tardnack=(\d+)")
+PATRON_FEC       = re.compile(r"fec=(\d+)")
+
+
+def cpu_proceso(pid):
+    """Segundos de CPU (usuario + sistema, todos los hilos) de un proceso, desde /proc."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            campos = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(campos[11]) + int(campos[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def contar_filas(carpeta):
+    """(filas escritas, filas en cero, bloques con datos) de todas las sesiones dentro de `carpeta`."""
+    filas = ceros = bloques = 0
+    for ruta in glob.glob(os.path.join(carpeta, "*", "*", "*")):
+        base, ext = os.path.splitext(ruta)
+        if ext == ".csv" and not base.endswith(("_huecos", "_tiempos")):
+            with open(ruta, newline="") as f:
+                lector = csv.reader(f)
+                next(lector, None)
+                seq_anterior = None
+                for fila in lector:
+                    filas += 1
+                    if not any(int(v) for v in fila[1:]):
+                        ceros += 1
+                    elif fila[0] != seq_anterior:
+                        bloques += 1  # primera fila con datos de un bloque nuevo
+                        seq_anterior = fila[0]
+        elif ext == EXTENSION_INDICE and existe_binario(base):
+            for e in leer_indice(ruta):
+                n = e.n_bloques * e.n_filas
+                filas += n
+                if e.tipo == TIPO_HUECO:
+                    ceros += n
+                else:
+                    bloques += 1
+    return filas, ceros, bloques
+
+
+def contadores_log(ruta_log, patron):
+    """
+    Suma por grupo de `patron` sobre los dispositivos de la última línea de
+    estado del receptor que lo contiene, p. ej. (recuperados, irrecuperables).
+    """
+    with open(ruta_log, encoding="utf-8", errors="replace") as f:
+        lineas = [l for l in f if patron.search(l)]
+    if not lineas:
+        return None
+    grupos = [g if isinstance(g, tuple) else (g,) for g in patron.findall(lineas[-1])]
+    return tuple(sum(int(g[i]) for g in grupos) for i in range(len(grupos[0])))
+
+
+def correr(receptor, num_dispositivos, frecuencia, duracion, modelo, procesos=1,
+           puerto=PUERTO_DESTINO, conservar=False, tam_bloque=TAM_BLOQUE, version=1, nack=False,
+           fec=None, fec_bloques=None):
+    script = os.path.abspath(receptor)
+    carpeta = tempfile.mkdtemp(prefix="bench_receptor_")
+    log = open(os.path.join(carpeta, "receptor.log"), "w")
+    proceso = subprocess.Popen(
+        [sys.executable, script] + (["--nack"] if nack else []), cwd=carpeta, stdout=log, stderr=subprocess.STDOUT,
+        # Que Ctrl-C / SIGINT le llegue aunque este proceso corra en segundo plano
+        preexec_fn=lambda: signal.signal(signal.SIGINT, signal.SIG_DFL),
+    )
+    try:
+        time.sleep(ESPERA_ARRANQUE)
+        if proceso.poll() is not None:
+            raise RuntimeError(f"El receptor terminó al arrancar (ver {log.name})")
+
+        drops0, cpu0 = drops_kernel(puerto), cpu_proceso(proceso.pid)
+        t0 = time.perf_counter()
+        contadores, errores = correr_flota(
+            num_dispositivos, frecuencia, duracion, modelo, ("127.0.0.1", puerto), procesos,
+            tam_bloque=tam_bloque, version=version, nack=nack, fec=fec, fec_bloques=fec_bloques,
+        )
+        t_envio = time.perf_counter() - t0
+        time.sleep(ESPERA_DRENADO)
+        drops1, cpu1 = drops_kernel(puerto), cpu_proceso(proceso.pid)
+    finally:
+        proceso.send_signal(signal.SIGINT)
+        try:
+            proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+        log.close()
+
+    filas, ceros, paquetes = contar_filas(carpeta)
+    t = totales(contadores)
+    resultado = {
+        "enviados":      t["enviados"],
+        "perdidos_sim":  t["perdidos"],
+        "corrompidos_sim": t["corrompidos"],
+        "paquetes":      paquetes,
+        "paq_por_s":     paquetes / t_envio,
+        "muestras":      filas - ceros,
+        "muestras_por_s": (filas - ceros) / t_envio,
+        "cpu_s":         (cpu1 - cpu0) if cpu0 is not None and cpu1 is not None else None,
+        "drops_kernel":  (drops1 - drops0) if drops0 is not None and drops1 is not None else None,
+        "filas":         filas,
+        "filas_cero":    ceros,
+        "errores_envio": errores,
+        "carpeta":       carpeta,
+        "bytes_enviados": t["bytes_enviados"],
+        "bytes_extra":   t["bytes_nack"] + t["bytes_retransmitidos"],
+        "retransmitidos": t["retransmitidos"],
+        "sin_historial": t["sin_historial"],
+        "nack":          contadores_log(log.name, PATRON_NACK) if nack else None,
+        "bytes_bloques": t["bytes_bloques"],
+        "bytes_fec":     t["bytes_fec"],
+        "fec":           (contadores_log(log.name, PATRON_FEC) or (0,))[0] if fec else None,
+    }
+    if not conservar:
+        shutil.rmtree(carpeta, ignore_errors=True)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de punta a punta de un receptor IMU2")
+    parser.add_argument("-r", "--receptor", default=RECEPTOR_DEFECTO, help="script del receptor")
+    parser.add_argument("-n", "--dispositivos", type=int, default=4)
+    parser.add_argument("-f", "--frecuencia", type=float, default=1000.0, help="Hz de muestreo")
+    parser.add_argument("-t", "--duracion", type=float, default=10.0, help="segundos de envío")
+    parser.add_argument("-p", "--procesos", type=int, default=1, help="procesos emisores")
+    parser.add_argument("--conservar", action="store_true", help="no borrar las sesiones grabadas")
+    argumentos_flota(parser)
+    argumentos_modelo(parser)
+    args = parser.parse_args()
+
+    print(f"{args.receptor}: {args.dispositivos} dispositivos a {args.frecuencia:.0f} Hz, "
+          f"bloques de {args.tam_bloque} B, {args.duracion:.1f} s por loopback")
+    r = correr(args.receptor, args.dispositivos, args.frecuencia, args.duracion,
+               modelo_desde(args), args.procesos, conservar=args.conservar, tam_bloque=args.tam_bloque,
+               version=args.version, nack=args.nack, fec=args.fec, fec_bloques=args.fec_bloques)
+
+    print(f"enviados={r['enviados']} (perdidos por el modelo={r['perdidos_sim']}, "
+          f"dañados={r['corrompidos_sim']}, errores de envío={r['errores_envio']})")
+    print(f"paquetes escritos   {r['paquetes']:>10d}   {r['paq_por_s']:>10,.0f} paq/s sostenidos")
+    print(f"muestras escritas   {r['muestras']:>10d}   {r['muestras_por_s']:>10,.0f} muestras/s sostenidas")
+    if r["cpu_s"] is not None and r["paquetes"]:
+        print(f"CPU del receptor    {r['cpu_s']:>10.2f} s   {r['cpu_s'] / r['paquetes'] * 1e6:>10.1f} µs/paq"
+              f"   {r['cpu_s'] / r['muestras'] * 1e6:>8.2f} µs/muestra")
+    if r["drops_kernel"] is not None:
+        print(f"drops del kernel    {r['drops_kernel']:>10d}")
+    if r["filas"]:
+        print(f"relleno con ceros   {r['filas_cero']:>10d}   {r['filas_cero'] / r['filas']:>10.2%} de las filas")
+    if args.nack:
+        if r["nack"] is not None:
+            print(f"recuperados         {r['nack'][0]:>10d}   irrecuperables {r['nack'][1]}   "
+                  f"originales tardíos {r['nack'][2]}")
+        print(f"retransmitidos      {r['retransmitidos']:>10d}   ({r['sin_historial']} pedidos fuera del historial)")
+        if r["bytes_enviados"]:
+            print(f"ancho de banda extra {r['bytes_extra']:>9d} B {r['bytes_extra'] / r['bytes_enviados']:>10.2%}")
+    if args.fec and r["bytes_bloques"]:
+        print(f"reconstruidos (FEC) {r['fec']:>10d}   redundancia {r['bytes_fec'] / r['bytes_bloques']:.2%} "
+              f"del tráfico sin FEC")
+    if args.conservar:
+        print(f"Sesiones en {r['carpeta']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Catálogo de sesiones en SQLite (<carpeta>/catalogo_sesiones.sqlite): asocia un
+número de sesión lógico a cada carpeta física imu_capturasN, con sus
+dispositivos, filas y rango horario.
+
+Las carpetas no se renombran nunca: renumerar, filtrar y buscar son
+operaciones sobre el catálogo, cada una en una sola transacción (si algo se
+corta a la mitad, el catálogo queda como estaba). Reemplaza el renombrado en
+disco de cambiador_nombres.py, y los scripts de análisis resuelven los números
+de sesión a través de él con sesiones_disponibles() / indice_fisico().
+
+Uso:
+    python catalogo_sesiones.py [carpeta] actualizar
+    python catalogo_sesiones.py [carpeta] listar [--dispositivo pecho] [--desde 2025-03-01] [--hasta ...] [--filas-min N]
+    python catalogo_sesiones.py [carpeta] renumerar [numero_inicial]
+    python catalogo_sesiones.py [carpeta] ruta N
+"""
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from sesion_imu import PREFIJO_SESION, abrir_sesion, obtener_indices_sesion
+
+ARCHIVO_CATALOGO = "catalogo_sesiones.sqlite"
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS sesiones (
+    carpeta       TEXT PRIMARY KEY,     -- imu_capturasN tal como está en disco
+    indice_fisico INTEGER NOT NULL,     -- la N de la carpeta (y de <disp>N adentro)
+    numero        INTEGER UNIQUE,       -- número lógico con el que se la nombra
+    t_inicio      REAL,
+    t_fin         REAL,
+    agregada      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dispositivos (
+    carpeta   TEXT NOT NULL REFERENCES sesiones(carpeta) ON DELETE CASCADE,
+    nombre    TEXT NOT NULL,
+    formato   TEXT NOT NULL,
+    filas     INTEGER,
+    t_inicio  REAL,
+    t_fin     REAL,
+    tamano    INTEGER NOT NULL,         -- del archivo de datos, para saber si hay que releerlo
+    mtime_ns  INTEGER NOT NULL,
+    PRIMARY KEY (carpeta, nombre)
+);
+"""
+
+
+class Catalogo:
+
+    def __init__(self, base_dir=".", prefijo=PREFIJO_SESION):
+        self.base_dir = base_dir
+        self.prefijo  = prefijo
+        self.ruta     = os.path.join(base_dir, ARCHIVO_CATALOGO)
+        self.db = sqlite3.connect(self.ruta)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(ESQUEMA)
+
+    def cerrar(self):
+        self.db.close()
+
+    # ---- Sincronización con el disco ----
+
+    def actualizar(self):
+        """
+        Agrega las carpetas nuevas (con el número lógico siguiente al último),
+        quita las que ya no están y relee solo los dispositivos cuyo archivo de
+        datos cambió. Devuelve (agregadas, quitadas, dispositivos releídos).
+        """
+        fisicas = {f"{self.prefijo}{n}": n for n in obtener_indices_sesion(self.base_dir, self.prefijo)}
+        conocidas = {fila["carpeta"] for fila in self.db.execute("SELECT carpeta FROM sesiones")}
+        nuevas = sorted(set(fisicas) - conocidas, key=fisicas.get)
+        quitadas = conocidas - set(fisicas)
+        releidos = 0
+
+        with self.db:
+            self.db.executemany("DELETE FROM sesiones WHERE carpeta = ?", [(c,) for c in quitadas])
+            siguiente = (self.db.execute("SELECT MAX(numero) FROM sesiones").fetchone()[0] or 0) + 1
+            for i, carpeta in enumerate(nuevas):
+                self.db.execute(
+                    "INSERT INTO sesiones (carpeta, indice_fisico, numero, agregada) VALUES (?, ?, ?, ?)",
+                    (carpeta, fisicas[carpeta], siguiente + i, time.time()),
+                )
+            for carpeta, indice in fisicas.items():
+                releidos += self._actualizar_dispositivos(carpeta, indice)
+
+        return len(nuevas), len(quitadas), releidos
+
+    def _actualizar_dispositivos(self, carpeta, indice):
+        previos = {
+            fila["nombre"]: (fila["tamano"], fila["mtime_ns"])
+            for fila in self.db.execute("SELECT nombre, tamano, mtime_ns FROM dispositivos WHERE carpeta = ?", (carpeta,))
+        }
+        presentes = abrir_sesion(indice, self.base_dir, self.prefijo).dispositivos()
+        releidos = 0
+        for nombre, disp in presentes.items():
+            st = os.stat(disp.ruta_datos)
+            if previos.get(nombre) == (st.st_size, st.st_mtime_ns):
+                continue
+            t_inicio, t_fin = disp.rango_tiempos() or (None, None)
+            self.db.execute(
+                "INSERT OR REPLACE INTO dispositivos VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (carpeta, nombre, "binario" if disp.binario else "csv", disp.filas,
+                 t_inicio, t_fin, st.st_size, st.st_mtime_ns),
+            )
+            releidos += 1
+        self.db.executemany(
+            "DELETE FROM dispositivos WHERE carpeta = ? AND nombre = ?",
+            [(carpeta, n) for n in set(previos) - set(presentes)],
+        )
+        if releidos or set(previos) - set(presentes):
+            self.db.execute(
+                "UPDATE sesiones SET (t_inicio, t_fin) = "
+                "(SELECT MIN(t_inicio), MAX(t_fin) FROM dispositivos WHERE carpeta = ?) WHERE carpeta = ?",
+                (carpeta, carpeta),
+            )
+        return releidos
+
+    # ---- Consultas ----
+
+    def sesiones(self, dispositivo=None, desde=None, hasta=None, filas_min=None):
+        """
+        Filas de `sesiones` (con la lista de dispositivos) ordenadas por número
+        lógico, filtradas por dispositivo presente, rango horario y mínimo de
+        filas en todos sus dispositivos.
+        """
+        condiciones, parametros = [], []
+        if dispositivo is not None:
+            condiciones.append("EXISTS (SELECT 1 FROM dispositivos d WHERE d.carpeta = s.carpeta AND d.nombre = ?)")
+            parametros.append(dispositivo)
+        if desde is not None:
+            condiciones.append("s.t_fin >= ?")
+            parametros.append(desde)
+        if hasta is not None:
+            condiciones.append("s.t_inicio <= ?")
+            parametros.append(hasta)
+        if filas_min is not None:
+            condiciones.append("(SELECT MIN(d.filas) FROM dispositivos d WHERE d.carpeta = s.carpeta) >= ?")
+            parametros.append(filas_min)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        filas = self.db.execute(
+            f"SELECT s.*, (SELECT GROUP_CONCAT(d.nombre || '=' || IFNULL(d.filas, 'NA'), ', ') "
+            f"FROM dispositivos d WHERE d.carpeta = s.carpeta) AS dispositivos "
+            f"FROM sesiones s {donde} ORDER BY s.numero",
+            parametros,
+        )
+        return [dict(fila) for fila in filas]
+
+    def indice_fisico(self, numero):
+        """La N de la carpeta física de la sesión lógica `numero`, o None."""
+        fila = self.db.execute("SELECT indice_fisico FROM sesiones WHERE numero = ?", (numero,)).fetchone()
+        return fila["indice_fisico"] if fila else None
+
+    def carpeta(self, numero):
+        """Ruta de la carpeta física de la sesión lógica `numero`, o None."""
+        indice = self.indice_fisico(numero)
+        return None if indice is None else os.path.join(self.base_dir, f"{self.prefijo}{indice}")
+
+    # ---- Renumeración ----
+
+    def renumerar(self, numero_inicial=1):
+        """
+        Números lógicos consecutivos desde numero_inicial, en el orden actual.
+        Devuelve [(numero viejo, numero nuevo, carpeta)].
+        """
+        actuales = self.db.execute("SELECT carpeta, numero FROM sesiones ORDER BY numero").fetchall()
+        cambios = [(f["numero"], numero_inicial + i, f["carpeta"]) for i, f in enumerate(actuales)]
+        with self.db:
+            # Liberar los números antes de reasignarlos (la columna es UNIQUE)
+            self.db.execute("UPDATE sesiones SET numero = NULL")
+            self.db.executemany(
+                "UPDATE sesiones SET numero = ? WHERE carpeta = ?", [(nuevo, c) for _, nuevo, c in cambios]
+            )
+        return cambios
+
+
+def sesiones_disponibles(base_dir=".", prefijo=PREFIJO_SESION):
+    """
+    [(numero lógico, índice físico)] ordenados. Con catálogo en base_dir se lo
+    actualiza y se lo usa; sin catálogo, cada carpeta imu_capturasN es la sesión N.
+    """
+    if not os.path.exists(os.path.join(base_dir, ARCHIVO_CATALOGO)):
+        return [(n, n) for n in obtener_indices_sesion(base_dir, prefijo)]
+    catalogo = Catalogo(base_dir, prefijo)
+    try:
+        catalogo.actualizar()
+        return [(s["numero"], s["indice_fisico"]) for s in catalogo.sesiones()]
+    finally:
+        catalogo.cerrar()
+
+
+def indice_fisico(numero, base_dir=".", prefijo=PREFIJO_SESION):
+    """Índice de carpeta de la sesión lógica `numero` (el mismo número si no hay catálogo)."""
+    if not os.path.exists(os.path.join(base_dir, ARCHIVO_CATALOGO)):
+        return numero
+    catalogo = Catalogo(base_dir, prefijo)
+    try:
+        catalogo.actualizar()
+        return catalogo.indice_fisico(numero)
+    finally:
+        catalogo.cerrar()
+
+
+def _fecha(texto):
+    """Segundos epoch o fecha ISO (2025-03-01, 2025-03-01T10:30) a epoch."""
+    try:
+        return float(texto)
+    except ValueError:
+        return datetime.fromisoformat(texto).timestamp()
+
+
+def _hora(t):
+    return "-" if t is None else datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catálogo de sesiones imu_capturasN")
+    parser.add_argument("carpeta", nargs="?", default=".")
+    sub = parser.add_subparsers(dest="orden", required=True)
+    sub.add_parser("actualizar", help="sincronizar el catálogo con las carpetas")
+    listar = sub.add_parser("listar", help="listar (y filtrar) sesiones")
+    listar.add_argument("--dispositivo")
+    listar.add_argument("--desde", type=_fecha)
+    listar.add_argument("--hasta", type=_fecha)
+    listar.add_argument("--filas-min", type=int)
+    renumerar = sub.add_parser("renumerar", help="números lógicos consecutivos (sin tocar archivos)")
+    renumerar.add_argument("numero_inicial", nargs="?", type=int, default=1)
+    ruta = sub.add_parser("ruta", help="carpeta física de una sesión lógica")
+    ruta.add_argument("numero", type=int)
+    args = parser.parse_args()
+
+    catalogo = Catalogo(args.carpeta)
+    try:
+        agregadas, quitadas, releidos = catalogo.actualizar()
+        if args.orden == "actualizar":
+            print(f"{agregadas} sesiones nuevas, {quitadas} quitadas, {releidos} dispositivos releídos "
+                  f"({catalogo.ruta})")
+        elif args.orden == "listar":
+            for s in catalogo.sesiones(args.dispositivo, args.desde, args.hasta, args.filas_min):
+                print(f"Sesión {s['numero']:>4} [{s['carpeta']}]  {_hora(s['t_inicio'])} .. {_hora(s['t_fin'])}  "
+                      f"{s['dispositivos'] or '(vacía)'}")
+        elif args.orden == "renumerar":
+            for viejo, nuevo, carpeta in catalogo.renumerar(args.numero_inicial):
+                if viejo != nuevo:
+                    print(f"  sesión {viejo} -> {nuevo}  ({carpeta})")
+            print("Catálogo renumerado (no se renombró ningún archivo).")
+        elif args.orden == "ruta":
+            print(catalogo.carpeta(args.numero) or f"No hay sesión {args.numero} en el catálogo")
+    finally:
+        catalogo.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import re
+import sys
+
+from sumideros import EXTENSION_DATOS, binario_a_csv, existe_binario
+
+
+BASE_DIR = "."
+
+PREFIJO_SESION = "imu_capturas"
+
+PATRON_SESION = re.compile(rf"^{PREFIJO_SESION}(\d+)$")
+
+
+def encontrar_binarios(base_dir):
+    """Rutas (sin extensión) de cada <disp>N.imu dentro de las carpetas imu_capturasN."""
+    rutas = []
+    for nombre in sorted(os.listdir(base_dir)):
+        if not PATRON_SESION.match(nombre):
+            continue
+        ruta_sesion = os.path.join(base_dir, nombre)
+        for sub in sorted(os.listdir(ruta_sesion)):
+            ruta_sub = os.path.join(ruta_sesion, sub)
+            if not os.path.isdir(ruta_sub):
+                continue
+            for archivo in sorted(os.listdir(ruta_sub)):
+                if archivo.endswith(EXTENSION_DATOS):
+                    rutas.append(os.path.join(ruta_sub, archivo[:-len(EXTENSION_DATOS)]))
+    return rutas
+
+
+def necesita_conversion(ruta_sin_extension):
+    ruta_csv = ruta_sin_extension + ".csv"
+    if not os.path.isfile(ruta_csv):
+        return True
+    return os.path.getmtime(ruta_csv) < os.path.getmtime(ruta_sin_extension + EXTENSION_DATOS)
+
+
+def main():
+    base_dir = sys.argv[1] if len(sys.argv) > 1 else BASE_DIR
+    rutas = [r for r in encontrar_binarios(base_dir) if existe_binario(r)]
+    if not rutas:
+        print("No se encontraron sesiones binarias (.imu/.idx) en:", base_dir)
+        return
+
+    for ruta in rutas:
+        if not necesita_conversion(ruta):
+            print(f"[OK] {ruta}.csv al día")
+            continue
+        filas = binario_a_csv(ruta)
+        print(f"[CSV] {ruta}.csv ({filas} filas)")
+
+
+if __name__ == "__main__":
+    main()
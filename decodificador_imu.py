@@ -0,0 +1,77 @@
+import numpy as np
+
+TAMANO_MUESTRA      = 12  # 6 * int16
+TAMANO_FOOTER       = 4
+MUESTRAS_POR_BLOQUE = 21  # 256 = 21*12 + 4
+
+DTYPE_MUESTRA = np.dtype(">i2")  # big-endian, como lo arma llenarBloque() en el ESP32
+
+
+def muestras_en_payload(longitud):
+    """Cantidad de muestras completas que caben en un payload de `longitud` bytes."""
+    return max(longitud - TAMANO_FOOTER, 0) // TAMANO_MUESTRA
+
+
+def decodificar_bloque(payload, muestras_por_bloque=MUESTRAS_POR_BLOQUE):
+    """
+    Convierte un payload (bytes, bytearray o memoryview) en un array (N, 6) int16
+    big-endian con un solo np.frombuffer, sin copiar. Si el bloque trae menos de
+    `muestras_por_bloque` muestras se devuelve una copia rellenada con ceros.
+    """
+    n = muestras_en_payload(len(payload))
+    muestras = np.frombuffer(payload, dtype=DTYPE_MUESTRA, count=n * 6).reshape(n, 6)
+    if muestras_por_bloque is not None and n < muestras_por_bloque:
+        relleno = np.zeros((muestras_por_bloque, 6), dtype=DTYPE_MUESTRA)
+        relleno[:n] = muestras
+        return relleno
+    return muestras
+
+
+def decodificar_lote(payloads, muestras_por_bloque=MUESTRAS_POR_BLOQUE):
+    """
+    Decodifica muchos payloads en una sola llamada y devuelve un array
+    (P, muestras_por_bloque, 6). Los payloads del mismo largo se unen y se
+    reinterpretan de una vez; los más cortos se rellenan con ceros. Con
+    muestras_por_bloque=None la cantidad sale del len de cada payload, como en
+    decodificar_bloque(), y el array tiene el ancho del más largo.
+    """
+    if muestras_por_bloque is None:
+        muestras_por_bloque = max((muestras_en_payload(len(p)) for p in payloads), default=0)
+    if not payloads:
+        return np.zeros((0, muestras_por_bloque, 6), dtype=DTYPE_MUESTRA)
+
+    largo = len(payloads[0])
+    if all(len(p) == largo for p in payloads) and muestras_en_payload(largo) >= muestras_por_bloque:
+        crudo = np.frombuffer(b"".join(payloads), dtype=np.uint8).reshape(len(payloads), largo)
+        util  = crudo[:, :muestras_por_bloque * TAMANO_MUESTRA]
+        return util.view(DTYPE_MUESTRA).reshape(len(payloads), muestras_por_bloque, 6)
+
+    salida = np.zeros((len(payloads), muestras_por_bloque, 6), dtype=DTYPE_MUESTRA)
+    for i, p in enumerate(payloads):
+        n = min(muestras_en_payload(len(p)), muestras_por_bloque)
+        salida[i, :n] = np.frombuffer(p, dtype=DTYPE_MUESTRA, count=n * 6).reshape(n, 6)
+    return salida
+
+
+def decodificar_ranuras(buffer, inicio, cantidad, tamano_ranura, desplazamiento,
+                        muestras_por_bloque=MUESTRAS_POR_BLOQUE):
+    """
+    Vista (cantidad, muestras_por_bloque, 6) sobre ranuras consecutivas de un
+    anillo de recepción (ver recepcion_lotes.AnilloRecepcion), sin copiar nada.
+    `desplazamiento` es el offset del payload dentro de cada ranura (la cabecera).
+    """
+    return np.ndarray(
+        (cantidad, muestras_por_bloque, 6),
+        dtype=DTYPE_MUESTRA,
+        buffer=buffer,
+        offset=inicio * tamano_ranura + desplazamiento,
+        strides=(tamano_ranura, TAMANO_MUESTRA, 2),
+    )
+
+
+def filas_csv(secuencia_bloque, muestras):
+    """Filas [block_seq, ax..gz] listas para csv.writer.writerows, armadas en numpy."""
+    filas = np.empty((len(muestras), 7), dtype=np.int32)
+    filas[:, 0]  = secuencia_bloque
+    filas[:, 1:] = muestras
+    return filas.tolist()
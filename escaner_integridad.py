@@ -0,0 +1,212 @@
+"""
+Revisión de integridad de todas las sesiones imu_capturasN de una carpeta, en
+paralelo y con caché: junta lo que hacen revisador_filas.py (filas por
+dispositivo y diferencia entre dispositivos) y revisador_bloques.py (bloques
+en cero) y además cuenta reinicios de secuencia y tasa de pérdida.
+
+Cada dispositivo de cada sesión se analiza en un proceso del pool. El resultado
+se guarda en un caché JSON indexado por ruta, con tamaño y mtime de sus
+archivos: al volver a correr solo se analiza lo nuevo o lo que cambió.
+
+El reporte (JSON) tiene por sesión las filas de cada dispositivo, el rango entre
+dispositivos y, por dispositivo, las muestras por bloque (256 B = 21,
+1024 B = 85), los bloques en cero como corridas [seq_inicio, n_bloques], las
+posiciones de los reinicios, la tasa de pérdida y las muestras con lectura
+I2C fallida (protocolo v2).
+
+Uso: python escaner_integridad.py [carpeta] [-o reporte.json] [-j procesos] [--sin-cache]
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from archivo_imu import EXTENSION_ARCHIVO
+from revisador_bloques import detectar_bloques_ceros
+from sesion_imu import PREFIJO_SESION, DispositivoSesion, abrir_sesion, obtener_indices_sesion
+from sumideros import EXTENSION_DATOS, EXTENSION_INDICE, SUFIJO_FALLAS, SUFIJO_HUECOS, SUFIJO_RESUMEN
+
+ARCHIVO_CACHE   = ".integridad_cache.json"
+ARCHIVO_REPORTE = "integridad.json"
+VERSION_CACHE   = 3
+
+# Diferencia de filas entre dispositivos de una sesión (mismos umbrales que revisador_filas.py)
+DIF_ALERTA = 100
+DIF_GRAVE  = 200
+
+# Archivos de un dispositivo que, si cambian, invalidan su resultado
+EXTENSIONES_HUELLA = (
+    ".csv", EXTENSION_DATOS, EXTENSION_INDICE, EXTENSION_ARCHIVO, SUFIJO_HUECOS, SUFIJO_RESUMEN, SUFIJO_FALLAS,
+)
+
+
+def huella(ruta_base):
+    """[(sufijo, tamaño, mtime_ns)] de los archivos presentes del dispositivo."""
+    partes = []
+    for sufijo in EXTENSIONES_HUELLA:
+        try:
+            st = os.stat(ruta_base + sufijo)
+        except OSError:
+            continue
+        partes.append([sufijo, st.st_size, st.st_mtime_ns])
+    return partes
+
+
+def corridas(seqs):
+    """[seq, seq+1, ..., 40, 41] -> [[seq_inicio, n_bloques], ...]."""
+    seqs = np.asarray(seqs, dtype=np.int64)
+    if not len(seqs):
+        return []
+    cortes = np.flatnonzero(np.diff(seqs) != 1) + 1
+    inicios = np.r_[0, cortes]
+    largos = np.diff(np.r_[inicios, len(seqs)])
+    return [[int(seqs[i]), int(n)] for i, n in zip(inicios, largos)]
+
+
+def analizar_dispositivo(ruta_base):
+    """Resultado de integridad de un dispositivo (corre en un proceso del pool)."""
+    disp = DispositivoSesion(ruta_base)
+    bloques_cero = [seq for seq, _ in detectar_bloques_ceros(ruta_base)]
+
+    # Reinicios: el block_seq guardado vuelve atrás
+    seq = np.asarray(disp.seq_por_fila(), dtype=np.int64)
+    inicios_bloque = np.flatnonzero(np.r_[True, np.diff(seq) != 0]) if len(seq) else []
+    seq_bloques = seq[inicios_bloque]
+    largos = np.diff(np.r_[inicios_bloque, len(seq)]) if len(seq) else []
+    saltos = np.flatnonzero(np.diff(seq_bloques) < 0)
+    reinicios = [[int(seq_bloques[i]), int(seq_bloques[i + 1])] for i in saltos]
+
+    # En CSV los huecos también son filas: los bloques recibidos son los que no están en cero
+    bloques_datos = len(seq_bloques) - (0 if disp.indice_binario else len(bloques_cero))
+    total = bloques_datos + len(bloques_cero)
+    return {
+        "formato":             "binario" if disp.indice_binario else "csv",
+        "filas":               disp.filas,
+        "muestras_por_bloque": sorted(set(int(n) for n in largos)),  # más de uno en un nodo reprogramado
+        "bloques":             bloques_datos,
+        "bloques_cero":        len(bloques_cero),
+        "corridas_cero":       corridas(bloques_cero),
+        "reinicios":           reinicios,
+        "tasa_perdida":        len(bloques_cero) / total if total else 0.0,
+        "muestras_fallidas":   sum(m.bit_count() for m in disp.fallas().values()),
+    }
+
+
+def cargar_cache(ruta):
+    try:
+        with open(ruta) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get("dispositivos", {}) if cache.get("version") == VERSION_CACHE else {}
+
+
+def guardar_cache(ruta, dispositivos):
+    temporal = ruta + ".tmp"
+    with open(temporal, "w") as f:
+        json.dump({"version": VERSION_CACHE, "dispositivos": dispositivos}, f)
+    os.replace(temporal, ruta)
+
+
+def resumir_sesion(resultados):
+    """Filas por dispositivo y rango entre dispositivos, como en revisador_filas.py."""
+    filas = {n: r["filas"] for n, r in resultados.items() if isinstance(r["filas"], int)}
+    rango = max(filas.values()) - min(filas.values()) if filas else None
+    if rango is None:
+        alerta = None
+    elif rango > DIF_GRAVE:
+        alerta = f"DIF > {DIF_GRAVE}"
+    elif rango > DIF_ALERTA:
+        alerta = f"DIF > {DIF_ALERTA}"
+    else:
+        alerta = None
+    return {
+        "filas":         filas,
+        "rango_filas":   rango,
+        "alerta":        alerta,
+        "bloques_cero":  sum(r["bloques_cero"] for r in resultados.values()),
+        "reinicios":     sum(len(r["reinicios"]) for r in resultados.values()),
+        "dispositivos":  resultados,
+    }
+
+
+def escanear(base_dir=".", procesos=None, usar_cache=True, prefijo=PREFIJO_SESION):
+    """
+    Devuelve (reporte, analizados, del_cache). Solo se mandan al pool los
+    dispositivos cuya huella no coincide con la del caché.
+    """
+    ruta_cache = os.path.join(base_dir, ARCHIVO_CACHE)
+    cache = cargar_cache(ruta_cache) if usar_cache else {}
+
+    dispositivos = {}  # ruta_base -> (indice_sesion, nombre, huella)
+    for n in obtener_indices_sesion(base_dir, prefijo):
+        for nombre, disp in abrir_sesion(n, base_dir, prefijo).dispositivos().items():
+            clave = os.path.relpath(disp.ruta_base, base_dir)
+            dispositivos[clave] = (n, nombre, huella(disp.ruta_base))
+
+    pendientes = [
+        clave for clave, (_, _, h) in dispositivos.items()
+        if clave not in cache or cache[clave]["huella"] != h
+    ]
+    if pendientes:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            rutas = [os.path.join(base_dir, clave) for clave in pendientes]
+            for clave, resultado in zip(pendientes, pool.map(analizar_dispositivo, rutas, chunksize=8)):
+                cache[clave] = {"huella": dispositivos[clave][2], "resultado": resultado}
+
+    # Lo que ya no existe sale del caché
+    cache = {clave: cache[clave] for clave in dispositivos}
+    if usar_cache:
+        guardar_cache(ruta_cache, cache)
+
+    por_sesion = {}
+    for clave, (n, nombre, _) in dispositivos.items():
+        por_sesion.setdefault(n, {})[nombre] = cache[clave]["resultado"]
+
+    reporte = {
+        "carpeta":             os.path.abspath(base_dir),
+        "generado":            time.time(),
+        "sesiones":            {str(n): resumir_sesion(r) for n, r in sorted(por_sesion.items())},
+    }
+    return reporte, len(pendientes), len(dispositivos) - len(pendientes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Revisión de integridad de sesiones imu_capturasN")
+    parser.add_argument("carpeta", nargs="?", default=".")
+    parser.add_argument("-o", "--salida", default=None, help=f"reporte JSON (por defecto <carpeta>/{ARCHIVO_REPORTE})")
+    parser.add_argument("-j", "--procesos", type=int, default=None, help="procesos del pool (por defecto, uno por núcleo)")
+    parser.add_argument("--sin-cache", action="store_true", help="reanalizar todo e ignorar el caché")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    reporte, analizados, del_cache = escanear(args.carpeta, args.procesos, not args.sin_cache)
+    duracion = time.perf_counter() - t0
+
+    sesiones = reporte["sesiones"]
+    if not sesiones:
+        print(f"No se encontraron carpetas del tipo '{PREFIJO_SESION}N' en: {args.carpeta}")
+        return
+
+    for n, s in sesiones.items():
+        filas_str = ", ".join(f"{d}={f}" for d, f in s["filas"].items())
+        etiqueta = f"  *** {s['alerta']}" if s["alerta"] else ""
+        extra = ""
+        if s["bloques_cero"]:
+            extra += f"  bloques en cero={s['bloques_cero']}"
+        if s["reinicios"]:
+            extra += f"  reinicios={s['reinicios']}"
+        print(f"Sesión {n}: {filas_str}  (rango={s['rango_filas']}){etiqueta}{extra}")
+
+    salida = args.salida or os.path.join(args.carpeta, ARCHIVO_REPORTE)
+    with open(salida, "w") as f:
+        json.dump(reporte, f, indent=1)
+    print(f"\n{len(sesiones)} sesiones: {analizados} dispositivos analizados, "
+          f"{del_cache} desde el caché, en {duracion:.2f} s. Reporte en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Corrección de errores hacia adelante (FEC) para el enlace del hotspot: el
+receptor reconstruye los bloques perdidos sin pedirle nada al ESP32 (a
+diferencia del NACK). Viaja en datagramas v3 (recepcion_lotes.armar_datagrama_fec),
+en uno de dos modos:
+
+  copia    cada datagrama lleva, además de su bloque, los n bloques anteriores
+           como diferencias por eje entre muestras seguidas, comprimidas con
+           zlib: recupera ráfagas de hasta n pérdidas seguidas y cuesta ~n
+           bloques comprimidos por datagrama (las muestras crudas casi no
+           comprimen; las diferencias, 10-20 % según el ruido).
+  paridad  cada n bloques sale un datagrama extra con el XOR de los n (y de sus
+           millis()): recupera una pérdida por grupo y cuesta 1/n del tráfico.
+
+CodificadorFEC arma los datagramas como lo haría el firmware (lo usa
+simulador_flota.py --fec). RecuperadorFEC vive en cada ManejadorDispositivo
+y entrega los bloques reconstruidos mientras la ventana de reordenamiento
+todavía los espera.
+"""
+import struct
+import sys
+import zlib
+from array import array
+from collections import deque
+
+from recepcion_lotes import FORMATO_FEC, TAMANO_FEC, armar_datagrama_fec
+
+FEC_NINGUNO = 0   # solo el bloque (los de datos en modo paridad)
+FEC_COPIA   = 1
+FEC_PARIDAD = 2
+
+MODOS_FEC        = {"copia": FEC_COPIA, "paridad": FEC_PARIDAD}
+BLOQUES_DEFECTO  = {"copia": 1, "paridad": 4}   # copias por datagrama / bloques por grupo de paridad
+EJES             = 6
+TAMANO_MUESTRA   = 12
+FORMATO_COPIA    = "<I H"   # millis() y largo de cada bloque copiado
+TAMANO_COPIA     = struct.calcsize(FORMATO_COPIA)
+NIVEL_ZLIB       = 1        # el ESP32 comprime en cada bloque: nivel rápido
+HISTORIAL_PARIDAD = 64      # bloques recibidos que se guardan para reconstruir por paridad
+
+
+def _xor(a, b):
+    """XOR byte a byte (el más corto se completa con ceros)."""
+    n = max(len(a), len(b))
+    return (int.from_bytes(a, "little") ^ int.from_bytes(b, "little")).to_bytes(n, "little")
+
+
+def _muestras(bloque):
+    """Las muestras completas del bloque como array('h') en orden nativo, y el resto (footer)."""
+    fin = len(bloque) // TAMANO_MUESTRA * TAMANO_MUESTRA
+    if len(bloque) - fin < 4:
+        fin -= TAMANO_MUESTRA  # el footer de 4 bytes no es una muestra
+    valores = array("h")
+    valores.frombytes(bloque[:max(fin, 0)])
+    if sys.byteorder == "little":
+        valores.byteswap()  # el payload es big-endian
+    return valores, bytes(bloque[max(fin, 0):])
+
+
+def _a_bytes(valores, resto):
+    if sys.byteorder == "little":
+        valores.byteswap()
+    return valores.tobytes() + resto
+
+
+def diferencias(bloque):
+    """Cada valor menos el del mismo eje en la muestra anterior (int16 con vuelta), para comprimir."""
+    v, resto = _muestras(bloque)
+    d = array("h", v[:EJES])
+    d.extend(((v[i] - v[i - EJES] + 32768) & 0xFFFF) - 32768 for i in range(EJES, len(v)))
+    return _a_bytes(d, resto)
+
+
+def integrar(bloque):
+    """Inversa de diferencias()."""
+    d, resto = _muestras(bloque)
+    for i in range(EJES, len(d)):
+        d[i] = ((d[i] + d[i - EJES] + 32768) & 0xFFFF) - 32768
+    return _a_bytes(d, resto)
+
+
+class CodificadorFEC:
+    """Datagramas v3 de un dispositivo, bloque a bloque, en el modo "copia" o "paridad"."""
+
+    def __init__(self, id_disp, modo="copia", n_bloques=None):
+        if modo not in MODOS_FEC:
+            raise ValueError(f"modo FEC {modo!r} no válido (opciones: {', '.join(MODOS_FEC)})")
+        self.id_disp    = id_disp
+        self.tipo       = MODOS_FEC[modo]
+        self.n_bloques  = n_bloques or BLOQUES_DEFECTO[modo]
+        self.anteriores = deque(maxlen=self.n_bloques)  # (seq, ms, bloque) ya enviados / del grupo en curso
+
+    def datagramas(self, seq, ms, bloque):
+        """Lo que se manda por el bloque `seq`: su datagrama y, en paridad, el del grupo que cierra."""
+        anteriores = self.anteriores
+        if anteriores and anteriores[-1][0] != seq - 1:
+            anteriores.clear()  # reinicio del ESP32: la redundancia no cruza el salto
+
+        if self.tipo == FEC_COPIA:
+            datos = b""
+            if anteriores:
+                datos = zlib.compress(
+                    b"".join(struct.pack(FORMATO_COPIA, m, len(b)) + diferencias(b) for _, m, b in anteriores),
+                    NIVEL_ZLIB,
+                )
+            salida = [armar_datagrama_fec(
+                self.id_disp, seq, ms, bloque, FEC_COPIA, len(anteriores), seq - len(anteriores), datos
+            )]
+            anteriores.append((seq, ms, bloque))
+            return salida
+
+        salida = [armar_datagrama_fec(self.id_disp, seq, ms, bloque)]
+        anteriores.append((seq, ms, bloque))
+        if len(anteriores) == self.n_bloques:
+            seq_base, ms_xor, paridad = anteriores[0]
+            for _, m, b in list(anteriores)[1:]:
+                ms_xor ^= m
+                paridad = _xor(paridad, b)
+            salida.append(armar_datagrama_fec(
+                self.id_disp, seq, ms, b"", FEC_PARIDAD, self.n_bloques, seq_base,
+                struct.pack("<I", ms_xor) + paridad,
+            ))
+            anteriores.clear()
+        return salida
+
+
+class RecuperadorFEC:
+    """
+    Reconstruye con las secciones FEC que llegan los bloques que el manejador
+    todavía espera. `falta(seq)` lo decide el manejador: un bloque ya escrito,
+    retenido o rellenado como hueco no se reconstruye.
+    """
+
+    def __init__(self):
+        self.recibidos = {}    # seq -> (ms, bloque) de los bloques de datos en modo paridad
+        self.mas_nueva = None  # seq más alta guardada
+
+    def recuperar(self, seq, ms, bloque, seccion, falta):
+        """[(seq, ms, bloque)] reconstruidos a partir del datagrama v3 (seq, ms, bloque, seccion)."""
+        if len(seccion) < TAMANO_FEC:
+            return []
+        tipo, n, largo, seq_base = struct.unpack_from(FORMATO_FEC, seccion)
+        datos = seccion[TAMANO_FEC:TAMANO_FEC + largo]
+        if tipo == FEC_NINGUNO:
+            self._guardar(seq, ms, bloque)
+            return []
+        if tipo == FEC_COPIA:
+            return self._de_copias(seq_base, n, datos, falta)
+        if tipo == FEC_PARIDAD:
+            return self._de_paridad(seq_base, n, datos, falta)
+        return []
+
+    def reiniciar(self):
+        """Olvida lo guardado (el manejador detectó un reinicio de la secuencia)."""
+        self.recibidos.clear()
+        self.mas_nueva = None
+
+    def _guardar(self, seq, ms, bloque):
+        """
+        Guarda un bloque de datos para la paridad. Un bloque algo más viejo que el
+        más nuevo es reordenamiento y se guarda igual; solo un salto hacia atrás
+        de más de HISTORIAL_PARIDAD es un reinicio del ESP32.
+        """
+        recibidos = self.recibidos
+        if self.mas_nueva is not None and self.mas_nueva - seq > HISTORIAL_PARIDAD:
+            self.reiniciar()  # reinicio del ESP32 que el manejador todavía no vio
+        recibidos[seq] = (ms, bytes(bloque))
+        if self.mas_nueva is None or seq > self.mas_nueva:
+            self.mas_nueva = seq
+        if len(recibidos) > HISTORIAL_PARIDAD:
+            # Se descartan los de seq más vieja, no los que llegaron primero
+            for s in [s for s in recibidos if self.mas_nueva - s >= HISTORIAL_PARIDAD]:
+                del recibidos[s]
+
+    def _de_copias(self, seq_base, n, datos, falta):
+        faltan = {s for s in range(seq_base, seq_base + n) if falta(s)}
+        if not faltan:
+            return []  # lo normal: no se descomprime nada
+        try:
+            crudo = zlib.decompress(datos)
+        except zlib.error:
+            return []
+        bloques, pos = [], 0
+        for s in range(seq_base, seq_base + n):
+            if pos + TAMANO_COPIA > len(crudo):
+                break
+            m, largo = struct.unpack_from(FORMATO_COPIA, crudo, pos)
+            pos += TAMANO_COPIA
+            if s in faltan:
+                bloques.append((s, m, integrar(crudo[pos:pos + largo])))
+            pos += largo
+        return bloques
+
+    def _de_paridad(self, seq_base, n, datos, falta):
+        grupo = range(seq_base, seq_base + n)
+        faltan = [s for s in grupo if s not in self.recibidos]
+        if len(faltan) != 1 or not falta(faltan[0]) or len(datos) < 4:
+            return []  # nada que reconstruir, o más de una pérdida en el grupo
+        ms_xor = struct.unpack_from("<I", datos)[0]
+        bloque = bytes(datos[4:])
+        for s in grupo:
+            if s != faltan[0]:
+                m, b = self.recibidos[s]
+                ms_xor ^= m
+                bloque = _xor(bloque, b)
+        return [(faltan[0], ms_xor, bloque)]
@@ -1,6 +1,9 @@
-import os
-import csv
+import sys
 import matplotlib.pyplot as plt
+import numpy as np
+
+from catalogo_sesiones import indice_fisico
+from sesion_imu import abrir_sesion, EJES, FACTOR_ACEL, FACTOR_GIRO
 
 ID_A_NOMBRE = {
     1: "muslo_derecho",
@@ -12,41 +15,36 @@ ID_A_NOMBRE = {
 PREFIJO_SESION = "imu_capturas"
 INDICE_SESION = 5
 
-FACTOR_ACEL = 1.0/4096.0   
-FACTOR_GIRO = 1.0/65.5   
-
-
-def ruta_csv_dispositivo(nombre_base: str, indice_sesion: int) -> str:
-
-    carpeta_sesion = f"{PREFIJO_SESION}{indice_sesion}"
-    nombre_disp_con_indice = f"{nombre_base}{indice_sesion}"
-    carpeta_disp = os.path.join(carpeta_sesion, nombre_disp_con_indice)
-    ruta_csv = os.path.join(carpeta_disp, f"{nombre_disp_con_indice}.csv")
-    return ruta_csv
+# Modo en vivo (python graficador_por_variable.py vivo): lee los anillos de
+# publicacion_shm.py que publica receptor_imu.py con --publicar ("publicar": true en su JSON)
+FRECUENCIA_VIVO = 1000.0  # Hz de muestreo de los dispositivos
+VENTANA_VIVO    = 10.0    # segundos visibles por dispositivo
+FPS_MAXIMO      = 20      # redibujados por segundo como máximo
+PUNTOS_VIVO     = 500     # intervalos de decimación min/max por línea (2 puntos c/u)
 
 
 def cargar_datos_sesion(indice_sesion: int):
-
+    """
+    {nombre: {eje: array escalado, "t": array de tiempos (si hay)}} de la sesión,
+    leídos con sesion_imu (memoria mapeada; los CSV se parsean una sola vez).
+    El número de sesión se resuelve con el catálogo si existe (catalogo_sesiones.py).
+    """
     datos = {}
-    ejes = ["ax", "ay", "az", "gx", "gy", "gz"]
+    fisico = indice_fisico(indice_sesion, prefijo=PREFIJO_SESION)
+    if fisico is None:
+        return datos
+    sesion = abrir_sesion(fisico, prefijo=PREFIJO_SESION)
 
     for _, nombre in ID_A_NOMBRE.items():
-        ruta = ruta_csv_dispositivo(nombre, indice_sesion)
-        if not os.path.exists(ruta):
-            continue  
-
-        print(f"Cargando datos de: {ruta}")
-        with open(ruta, newline="") as f:
-            reader = csv.DictReader(f)
-            datos[nombre] = {eje: [] for eje in ejes}
-
-            for fila in reader:
-                datos[nombre]["ax"].append(float(fila["ax"]) * FACTOR_ACEL)
-                datos[nombre]["ay"].append(float(fila["ay"]) * FACTOR_ACEL)
-                datos[nombre]["az"].append(float(fila["az"]) * FACTOR_ACEL)
-                datos[nombre]["gx"].append(float(fila["gx"]) * FACTOR_GIRO)
-                datos[nombre]["gy"].append(float(fila["gy"]) * FACTOR_GIRO)
-                datos[nombre]["gz"].append(float(fila["gz"]) * FACTOR_GIRO)
+        disp = sesion[nombre]
+        if not disp.existe():
+            continue
+
+        print(f"Cargando datos de: {disp.ruta_base}")
+        datos[nombre] = {eje: disp.eje(eje) for eje in EJES}
+        tiempos = disp.tiempos()
+        if tiempos is not None:
+            datos[nombre]["t"] = tiempos
 
     return datos
 
@@ -57,19 +55,25 @@ def graficar_sesion(indice_sesion: int):
         print(f"No se encontraron datos para la sesión {indice_sesion}")
         return
 
-    ejes = ["ax", "ay", "az", "gx", "gy", "gz"]
+    # Con marcas de tiempo en todos los dispositivos se grafica en segundos, alineados
+    alineado = all("t" in señales for señales in datos.values())
+    if alineado:
+        t_ref = np.nanmin([np.nanmin(señales["t"]) for señales in datos.values() if len(señales["t"])])
 
-    for eje in ejes:
+    for eje in EJES:
         plt.figure()
         for nombre_disp, señales in datos.items():
             y = señales[eje]
-            if not y:
+            if not len(y):
                 continue
-            x = range(len(y))
+            if alineado:
+                x = señales["t"] - t_ref
+            else:
+                x = np.arange(len(y))
             plt.plot(x, y, label=nombre_disp)
 
         plt.title(f"Sesión {indice_sesion} - {eje.upper()}")
-        plt.xlabel("Muestra")
+        plt.xlabel("Tiempo (s)" if alineado else "Muestra")
 
         if eje.startswith("a"):
             plt.ylabel("Aceleración (unidades crudas)")
@@ -83,5 +87,103 @@ def graficar_sesion(indice_sesion: int):
     plt.show()
 
 
+class BufferCircular:
+    """Últimas `capacidad` muestras (6 ejes, ya escaladas) de un dispositivo, en memoria fija."""
+
+    def __init__(self, capacidad: int):
+        self.datos = np.zeros((capacidad, 6), dtype=np.float32)
+        self.capacidad = capacidad
+        self.escritas = 0
+
+    def agregar(self, muestras):
+        muestras = muestras[-self.capacidad:]
+        n = len(muestras)
+        inicio = self.escritas % self.capacidad
+        primera = min(n, self.capacidad - inicio)
+        self.datos[inicio:inicio + primera] = muestras[:primera]
+        self.datos[:n - primera] = muestras[primera:]
+        self.escritas += n
+
+    def ordenado(self):
+        """Las muestras en orden cronológico (las que faltan para llenar la ventana quedan en 0)."""
+        return np.roll(self.datos, -(self.escritas % self.capacidad), axis=0)
+
+
+def decimar_minmax(y, n_intervalos: int):
+    """Min y max alternados de cada intervalo: conserva los picos con 2 puntos por intervalo."""
+    por_intervalo = len(y) // n_intervalos
+    bloques = y[:por_intervalo * n_intervalos].reshape(n_intervalos, por_intervalo, *y.shape[1:])
+    salida = np.empty((2 * n_intervalos, *y.shape[1:]), dtype=y.dtype)
+    salida[0::2] = bloques.min(axis=1)
+    salida[1::2] = bloques.max(axis=1)
+    return salida
+
+
+def graficar_vivo():
+    """
+    Una figura con los 6 ejes y una línea por dispositivo, redibujada a FPS_MAXIMO
+    con blitting. Cada cuadro toma solo los bloques nuevos de la memoria compartida,
+    así que el gráfico nunca se atrasa respecto del receptor.
+    """
+    from matplotlib.animation import FuncAnimation
+    from publicacion_shm import SuscriptorIMU
+
+    capacidad = int(VENTANA_VIVO * FRECUENCIA_VIVO)
+    capacidad -= capacidad % PUNTOS_VIVO
+    escala = np.array([FACTOR_ACEL] * 3 + [FACTOR_GIRO] * 3, dtype=np.float32)
+    x = np.repeat(np.linspace(-VENTANA_VIVO, 0, PUNTOS_VIVO), 2)
+
+    buffers = {id_disp: BufferCircular(capacidad) for id_disp in ID_A_NOMBRE}
+    suscriptores = {}
+
+    fig, ejes_graf = plt.subplots(2, 3, sharex=True, figsize=(14, 7))
+    lineas = {}
+    for i, (eje, ax) in enumerate(zip(EJES, ejes_graf.flat)):
+        # Límites fijos (rango completo de int16) para poder reutilizar el fondo al hacer blit
+        limite = 32768 * escala[i]
+        ax.set_ylim(-limite, limite)
+        ax.set_xlim(-VENTANA_VIVO, 0)
+        ax.set_title(eje.upper())
+        ax.grid(True)
+        for id_disp, nombre in ID_A_NOMBRE.items():
+            (lineas[id_disp, i],) = ax.plot(x, np.zeros_like(x), label=nombre, animated=True, lw=0.8)
+    ejes_graf[0, 0].legend(loc="upper left", fontsize="small")
+    for ax in ejes_graf[1]:
+        ax.set_xlabel("Tiempo (s)")
+    fig.suptitle("En vivo")
+    fig.tight_layout()
+
+    def actualizar(_):
+        for id_disp, buffer in buffers.items():
+            suscriptor = suscriptores.get(id_disp)
+            if suscriptor is None:
+                try:
+                    suscriptor = suscriptores[id_disp] = SuscriptorIMU(id_disp)
+                except FileNotFoundError:
+                    continue  # el dispositivo todavía no publicó nada
+            meta, muestras = suscriptor.nuevos()
+            if not len(meta):
+                continue
+            n = int(meta["n_muestras"].min())
+            buffer.agregar(muestras[:, :n].reshape(-1, 6) * escala)
+            decimado = decimar_minmax(buffer.ordenado(), PUNTOS_VIVO)
+            for i in range(6):
+                lineas[id_disp, i].set_ydata(decimado[:, i])
+        return list(lineas.values())
+
+    animacion = FuncAnimation(
+        fig, actualizar, interval=1000 / FPS_MAXIMO, blit=True, cache_frame_data=False
+    )
+    try:
+        plt.show()
+    finally:
+        for suscriptor in suscriptores.values():
+            suscriptor.cerrar()
+    return animacion
+
+
 if __name__ == "__main__":
-    graficar_sesion(INDICE_SESION)
+    if len(sys.argv) > 1 and sys.argv[1] == "vivo":
+        graficar_vivo()
+    else:
+        graficar_sesion(int(sys.argv[1]) if len(sys.argv) > 1 else INDICE_SESION)
@@ -0,0 +1,425 @@
+import os
+import time
+from collections import deque
+
+from fec_imu import RecuperadorFEC
+from metricas import ETAPA_DECODIFICACION, ETAPA_ESCRITURA, ETAPA_ESPERA
+from reloj_dispositivo import RelojDispositivo
+from sumideros import abrir_sumidero, HUECO_CIERRE, HUECO_CORRUPTO, HUECO_PERDIDA
+
+PREFIJO_SESION      = "imu_capturas"
+MUESTRAS_POR_BLOQUE = 21   # 256 = 21*12 + 4; solo hasta conocer el len real del dispositivo
+
+# Ventana de reordenamiento por dispositivo (0 bloques = rellenar de inmediato, como antes)
+VENTANA_BLOQUES  = 8      # bloques retenidos como máximo esperando un hueco
+VENTANA_TIEMPO   = 0.2    # segundos que se espera un bloque faltante
+MAXIMO_ATRASO    = 64     # seq hacia atrás que aún se consideran tardías y no un reset
+MAXIMO_ATRASO_MS = 2000   # idem en millis() del ESP32
+
+# Retransmisión selectiva (NACK), solo si el manejador recibe `solicitar`
+INTENTOS_NACK    = 3      # pedidos por bloque faltante (el primero y dos reintentos)
+INTERVALO_NACK   = 0.05   # s de espera antes del primer pedido y entre pedidos del mismo bloque
+MAXIMO_NACK      = 32     # de un hueco más grande se piden solo los bloques más nuevos
+
+# Barrido del receptor sobre todos los manejadores (ver expirar_manejadores)
+PERIODO_EXPIRACION = 0.05  # s entre barridos, llegue o no tráfico
+
+
+def ruta_dispositivo(nombre, indice_sesion, prefijo_sesion=PREFIJO_SESION):
+    """Ruta sin extensión del archivo de un dispositivo, ej: imu_capturas1/brazo_izquierdo1/brazo_izquierdo1."""
+    raiz = f"{prefijo_sesion}{indice_sesion}"
+    nombre_disp_con_indice = f"{nombre}{indice_sesion}"
+    return os.path.join(raiz, nombre_disp_con_indice, nombre_disp_con_indice)
+
+
+class ManejadorDispositivo:
+    """
+    Estado de un dispositivo: su sumidero de la sesión actual, la última seq y
+    los contadores. Reemplaza a los diccionarios por id_disp de los receptores;
+    cada receptor crea uno por dev_id al llegar su primer bloque y lo pasa de
+    sesión en sesión con cambiar_sesion().
+
+    Los bloques que llegan adelantados (seq > ultima_seq + 1) se retienen en una
+    ventana de reordenamiento acotada por cantidad (ventana_bloques) y por tiempo
+    (ventana_tiempo). Si el hueco se completa a tiempo se escriben en orden; solo
+    cuando la ventana vence se registran como hueco los bloques que faltan. La
+    ventana se evalúa al llegar cada bloque del dispositivo y al cerrar.
+
+    Cada bloque se escribe con la hora de su primera muestra y el intervalo
+    entre muestras en hora del PC, según un RelojDispositivo que ajusta el
+    millis() de la cabecera contra la hora de llegada.
+
+    Las muestras por bloque salen del len de cada cabecera (lo que devuelva
+    `decodificar`), así que en una misma sesión puede haber nodos de 256 B y
+    de 1024 B; muestras_por_bloque sigue al último bloque del dispositivo y es
+    el tamaño con que se registran sus huecos.
+
+    Los bloques v2 cuyo CRC no cierra se avisan con registrar_corrupto(): se
+    cuentan aparte y, si su seq cae en el hueco que dejan, el hueco se registra
+    con motivo "corrupto" en vez de "perdida". El mapa de fallas I2C de cada
+    bloque v2 viaja con el bloque hasta el sumidero (escribir_fallas).
+
+    Con `solicitar` (id_disp, [seq]) el manejador pide la retransmisión de los
+    bloques que faltan si siguen faltando INTERVALO_NACK después de detectar el
+    hueco (lo reordenado suele llegar antes y no se pide), y repite el pedido
+    cada INTERVALO_NACK mientras la ventana lo siga esperando. Lo que llega a
+    tiempo entra en su lugar como cualquier bloque reordenado: se cuenta en
+    `recuperados` si es la retransmisión (BIT_RETRANSMISION en la cabecera) y en
+    `tardios_nack` si es el original demorado de un bloque ya pedido. Si la
+    ventana vence, en `irrecuperables` (además de `perdidas`).
+
+    Los datagramas v3 (FEC, ver fec_imu.py) pasan además por procesar_fec(),
+    que reconstruye con su redundancia los bloques que faltan y los procesa
+    como si hubieran llegado; se cuentan en `recuperados_fec`.
+    """
+
+    def __init__(self, id_disp, nombre, indice_sesion, decodificar,
+                 prefijo_sesion=PREFIJO_SESION, tipo_sumidero="binario",
+                 muestras_por_bloque=MUESTRAS_POR_BLOQUE,
+                 ventana_bloques=VENTANA_BLOQUES, ventana_tiempo=VENTANA_TIEMPO,
+                 al_emitir=None, sumidero=None, metricas=None, solicitar=None):
+        self.id_disp             = id_disp
+        self.nombre              = nombre
+        self.indice_sesion       = indice_sesion
+        self.decodificar         = decodificar  # payload -> muestras (N, 6), N según el len del payload
+        self.muestras_por_bloque = muestras_por_bloque  # hasta el primer bloque; después, el del último
+        self.ventana_bloques     = ventana_bloques
+        self.ventana_tiempo      = ventana_tiempo
+        self.prefijo_sesion      = prefijo_sesion
+        self.tipo_sumidero       = tipo_sumidero
+        # (id_disp, seq, muestras, t_muestra0, dt, t_recepcion, ms); ver combinar_observadores
+        self.al_emitir           = al_emitir
+        self.metricas            = metricas   # metricas.Metricas compartida por el receptor, o None
+        self.solicitar           = solicitar  # (id_disp, [seq]) -> manda el NACK; None = sin retransmisión
+
+        self.ultima_seq     = None  # última seq escrita (real o rellenada)
+        self.ultimo_ms      = None  # millis() del bloque más nuevo recibido
+        self.pendientes     = {}    # seq -> (muestras, t_recepcion, ms, fallas) retenidos en la ventana
+        self.seq_corruptas  = set() # seq de bloques corruptos que todavía pueden caer en un hueco
+        self.solicitadas    = {}    # seq -> [t del último pedido, pedidos] de bloques en espera de retransmisión
+        self.fec            = None  # RecuperadorFEC, desde el primer datagrama v3
+        self.reloj          = RelojDispositivo()
+        self.rellenados     = deque(maxlen=MAXIMO_ATRASO)  # últimas seq registradas como hueco
+
+        self.paquetes       = 0     # paquetes recibidos y escritos
+        self.perdidas       = 0     # bloques registrados como hueco al vencer la ventana
+        self.reordenados    = 0     # bloques que llegaron fuera de orden pero a tiempo
+        self.tardios        = 0     # bloques que llegaron después de ser rellenados
+        self.duplicados     = 0
+        self.reinicios      = 0
+        self.corruptos      = 0     # bloques v2 que llegaron con CRC o largo inválido
+        self.muestras_fallidas = 0  # muestras v2 marcadas como lectura I2C fallida
+        self.solicitados    = 0     # bloques pedidos por NACK
+        self.recuperados    = 0     # pedidos cuya retransmisión llegó dentro de la ventana
+        self.tardios_nack   = 0     # pedidos cuyo original llegó (demorado) antes que la retransmisión
+        self.irrecuperables = 0     # pedidos que no llegaron antes de que venciera la ventana
+        self.recuperados_fec = 0    # bloques reconstruidos con la redundancia FEC
+        self.filas_escritas = 0
+
+        self.sumidero = sumidero if sumidero is not None else self._abrir_sumidero(indice_sesion)
+        print(f"[+] (sesión {indice_sesion}) Grabando en {self.sumidero.ruta}")
+
+    def _abrir_sumidero(self, indice_sesion):
+        ruta = ruta_dispositivo(self.nombre, indice_sesion, self.prefijo_sesion)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        return abrir_sumidero(self.tipo_sumidero, ruta)
+
+    def cambiar_sesion(self, indice_sesion, sumidero=None, cerrar=None):
+        """
+        Pasa a grabar en la sesión indice_sesion entre dos bloques. A diferencia de
+        cerrar() y crear otro manejador, conserva ultima_seq, la ventana de
+        reordenamiento, el reloj y los contadores: un bloque perdido justo en el
+        borde se registra como hueco en la sesión nueva en vez de perderse la
+        cuenta. `sumidero` puede venir ya abierto (PreaperturaSesiones) y `cerrar`
+        recibe el sumidero viejo para cerrarlo fuera de este hilo.
+        """
+        if sumidero is None:
+            sumidero = self._abrir_sumidero(indice_sesion)
+        viejo = self.sumidero
+        self.sumidero, self.indice_sesion = sumidero, indice_sesion
+        if cerrar is not None:
+            cerrar(viejo)
+        else:
+            viejo.cerrar()
+        print(f"[+] (sesión {indice_sesion}) Grabando en {self.sumidero.ruta}")
+
+    def procesar(self, seq, payload, t_recepcion=0.0, ms=None, fallas=0, retransmitido=False):
+        """
+        Ubica el bloque en la secuencia: lo escribe, lo retiene o lo descarta si es
+        tardío. `fallas` es el mapa de muestras con lectura I2C fallida (v2);
+        `retransmitido`, que el bloque es la respuesta a un NACK.
+        """
+        if self.ultima_seq is not None and seq <= self.ultima_seq:
+            if self._es_atrasado(seq, ms):
+                if seq in self.rellenados:
+                    self.tardios += 1
+                else:
+                    self.duplicados += 1
+                self.expirar(t_recepcion)
+                return
+            # Detectar reset de secuencia (p. ej., reinicio del ESP32).
+            print(
+                f"[!] id{self.id_disp}: secuencia reiniciada "
+                f"(ultima_seq={self.ultima_seq} -> seq={seq}). "
+                f"No se contabilizan pérdidas en este salto."
+            )
+            self.vaciar_pendientes(t_recepcion)
+            self.ultima_seq = None
+            self.ultimo_ms  = None
+            self.reloj.reiniciar()
+            self.seq_corruptas.clear()
+            self.solicitadas.clear()
+            if self.fec is not None:
+                self.fec.reiniciar()
+            self.reinicios += 1
+
+        if ms is not None:
+            if self.ultimo_ms is None or ms > self.ultimo_ms:
+                self.ultimo_ms = ms
+            self.reloj.agregar(seq, ms, t_recepcion)
+
+        # Latencias por etapa, solo en 1 de cada `metricas.muestreo` paquetes
+        medir = self.metricas is not None and self.metricas.toca_medir()
+        if medir:
+            t0 = time.perf_counter()
+            self.metricas.observar(ETAPA_ESPERA, time.time() - t_recepcion)
+
+        muestras = self.decodificar(payload)
+        self.muestras_por_bloque = len(muestras)
+
+        if medir:
+            t1 = time.perf_counter()
+            self.metricas.observar(ETAPA_DECODIFICACION, t1 - t0)
+
+        if self.solicitadas and seq not in self.pendientes:
+            pedido = self.solicitadas.pop(seq, None)
+            if pedido is not None and pedido[1]:
+                if retransmitido:
+                    self.recuperados += 1
+                else:
+                    self.tardios_nack += 1
+
+        if self.ultima_seq is None or seq == self.ultima_seq + 1:
+            if self.pendientes:
+                self.reordenados += 1  # completa el hueco que retenía la ventana
+            self._emitir(seq, muestras, t_recepcion, ms, fallas)
+            self._emitir_consecutivos()
+            if medir:
+                self.metricas.observar(ETAPA_ESCRITURA, time.perf_counter() - t1)
+        elif seq in self.pendientes:
+            self.duplicados += 1
+        else:
+            if self.solicitar is not None:
+                self._pedir_faltantes(seq, t_recepcion)
+            if self.pendientes and seq < max(self.pendientes):
+                self.reordenados += 1
+            # La vista puede apuntar al anillo de recepción: se copia antes de retenerla
+            self.pendientes[seq] = (muestras.copy(), t_recepcion, ms, fallas)
+
+        self.expirar(t_recepcion)
+
+    def falta(self, seq):
+        """El bloque seq todavía se espera: no se escribió, no está retenido ni se dio por perdido."""
+        return self.ultima_seq is not None and seq > self.ultima_seq and seq not in self.pendientes
+
+    def procesar_fec(self, seq, ms, payload, seccion, t_recepcion=0.0):
+        """Reconstruye con la sección FEC de un datagrama v3 los bloques que faltan y los procesa."""
+        if self.fec is None:
+            self.fec = RecuperadorFEC()
+        for s, m, bloque in self.fec.recuperar(seq, ms, payload, seccion, self.falta):
+            self.recuperados_fec += 1
+            self.solicitadas.pop(s, None)  # no cuenta como recuperado por NACK
+            self.procesar(s, bloque, t_recepcion, m)
+
+    def registrar_corrupto(self, seq, ms=None):
+        """
+        Cuenta un bloque que llegó dañado. Su cabecera puede estar dañada también:
+        la seq solo se recuerda si cae dentro de lo que la ventana todavía espera.
+        """
+        self.corruptos += 1
+        if self.ultima_seq is not None and 0 < seq - self.ultima_seq <= MAXIMO_ATRASO:
+            self.seq_corruptas.add(seq)
+
+    def _pedir_faltantes(self, seq, ahora):
+        """
+        Anota los bloques entre el más nuevo ya visto y seq (se llama antes de
+        retener seq); el pedido sale en _enviar_pedidos si siguen faltando.
+        """
+        tope = max(self.pendientes) if self.pendientes else self.ultima_seq
+        if seq <= tope + 1:
+            return  # completa un hueco ya anotado
+        for s in range(max(tope + 1, seq - MAXIMO_NACK), seq):
+            self.solicitadas[s] = [ahora, 0]
+
+    def _enviar_pedidos(self, ahora):
+        """Pide lo que sigue faltando INTERVALO_NACK después de anotarlo o del último pedido."""
+        enviar = []
+        for s, pedido in self.solicitadas.items():
+            if pedido[1] < INTENTOS_NACK and ahora - pedido[0] >= INTERVALO_NACK:
+                if not pedido[1]:
+                    self.solicitados += 1
+                pedido[0] = ahora
+                pedido[1] += 1
+                enviar.append(s)
+        if enviar:
+            self.solicitar(self.id_disp, enviar)
+
+    def _es_atrasado(self, seq, ms):
+        """Un bloque viejo es tardío/duplicado si es reciente en seq y en millis(); si no, es un reset."""
+        if self.ultima_seq - seq > MAXIMO_ATRASO:
+            return False
+        if ms is None or self.ultimo_ms is None:
+            return True
+        return 0 <= self.ultimo_ms - ms <= MAXIMO_ATRASO_MS
+
+    def _emitir(self, seq, muestras, t_recepcion, ms=None, fallas=0):
+        if ms is not None:
+            t_muestra0, dt = self.reloj.marcas_bloque(ms, len(muestras))
+        else:
+            ms, t_muestra0, dt = 0, t_recepcion, 0.0
+        # Los observadores (publicación en vivo, alineador) van antes del disco
+        if self.al_emitir is not None:
+            self.al_emitir(self.id_disp, seq, muestras, t_muestra0, dt, t_recepcion, ms)
+        self.escribir_filas_bloque(seq, muestras, t_recepcion, ms, t_muestra0, dt)
+        if fallas:
+            self.sumidero.escribir_fallas(seq, fallas)
+            self.muestras_fallidas += fallas.bit_count()
+        self.ultima_seq = seq
+        self.seq_corruptas.discard(seq)  # llegó una copia sana
+        self.paquetes  += 1
+        self.vaciar_si_corresponde()
+
+        # Estado cada 256 paquetes
+        if (self.paquetes % 256) == 0:
+            print(
+                f"id{self.id_disp} {self.nombre} "
+                f"paqs={self.paquetes} perd={self.perdidas} reord={self.reordenados} "
+                f"tard={self.tardios} deriva={self.reloj.deriva_ppm():+.0f}ppm ultima_seq={seq}"
+            )
+
+    def _emitir_consecutivos(self):
+        """Escribe los bloques retenidos que ya siguen en orden a ultima_seq."""
+        while self.pendientes:
+            item = self.pendientes.pop(self.ultima_seq + 1, None)
+            if item is None:
+                return
+            self._emitir(self.ultima_seq + 1, *item)
+
+    def _rellenar_hasta(self, seq, t_recepcion, motivo=HUECO_PERDIDA):
+        """
+        Registra como hueco los bloques desde ultima_seq + 1 hasta seq - 1. Los que
+        llegaron corruptos van en tramos propios con motivo HUECO_CORRUPTO y no
+        suman a `perdidas` (ya están en `corruptos`).
+        """
+        inicio = self.ultima_seq + 1
+        if seq > inicio:
+            corruptas = sorted(s for s in self.seq_corruptas if inicio <= s < seq) if self.seq_corruptas else []
+            desde = inicio
+            for s in corruptas:
+                if s > desde:
+                    self.escribir_hueco(desde, s - desde, motivo, t_recepcion)
+                self.escribir_hueco(s, 1, HUECO_CORRUPTO, t_recepcion)
+                desde = s + 1
+            if seq > desde:
+                self.escribir_hueco(desde, seq - desde, motivo, t_recepcion)
+            self.rellenados.extend(range(max(inicio, seq - MAXIMO_ATRASO), seq))
+            self.perdidas += seq - inicio - len(corruptas)
+        if self.seq_corruptas:
+            self.seq_corruptas = {s for s in self.seq_corruptas if s >= seq}
+        if self.solicitadas:
+            vencidas = [s for s in self.solicitadas if s < seq]
+            for s in vencidas:
+                if self.solicitadas.pop(s)[1]:
+                    self.irrecuperables += 1
+        self.ultima_seq = seq - 1
+
+    def expirar(self, ahora):
+        """Da por perdidos los huecos cuya ventana venció (por cantidad o por tiempo)."""
+        if self.solicitadas:
+            self._enviar_pedidos(ahora)
+        while self.pendientes:
+            seq_min = min(self.pendientes)
+            t_min   = min(item[1] for item in self.pendientes.values())
+            if len(self.pendientes) <= self.ventana_bloques and ahora - t_min < self.ventana_tiempo:
+                return
+            self._rellenar_hasta(seq_min, ahora)
+            self._emitir_consecutivos()
+
+    def esperando(self):
+        """Hay bloques retenidos o pedidos por NACK: expirar() tiene algo que vencer o repetir."""
+        return bool(self.pendientes or self.solicitadas)
+
+    def vaciar_pendientes(self, ahora=0.0):
+        """Escribe todo lo retenido, rellenando los huecos que queden (cierre o reset)."""
+        while self.pendientes:
+            self._rellenar_hasta(min(self.pendientes), ahora, HUECO_CIERRE)
+            self._emitir_consecutivos()
+
+    def escribir_filas_bloque(self, secuencia_bloque, muestras, t_host=0.0, ms=0, t_muestra0=0.0, dt=0.0):
+        """Escribe un bloque recibido (lista de tuplas o array (N, 6)) con sus marcas de tiempo."""
+        self.filas_escritas += self.sumidero.escribir_bloque(
+            secuencia_bloque, muestras, t_host, ms, t_muestra0, dt
+        )
+
+    def escribir_hueco(self, seq_inicio, n_bloques, motivo, t_host=0.0):
+        """Registra n_bloques perdidos desde seq_inicio (el sumidero decide cómo representarlos)."""
+        self.filas_escritas += self.sumidero.escribir_hueco(
+            seq_inicio, n_bloques, self.muestras_por_bloque, motivo, t_host
+        )
+
+    def vaciar_si_corresponde(self):
+        """Flush periódico para asegurar persistencia."""
+        if (self.paquetes % 100) == 0:
+            self.sumidero.vaciar()
+
+    def cerrar(self):
+        try:
+            self.vaciar_pendientes(time.time())
+        except Exception:
+            pass
+        try:
+            self.sumidero.cerrar()
+        except Exception:
+            pass
+
+    def resumen(self):
+        nack = ""
+        if self.solicitar is not None:
+            nack = f"recup={self.recuperados} irrec={self.irrecuperables} tardnack={self.tardios_nack} "
+        if self.fec is not None:
+            nack += f"fec={self.recuperados_fec} "
+        return (
+            f"id{self.id_disp}:{self.nombre} paqs={self.paquetes} "
+            f"perd={self.perdidas} corr={self.corruptos} reord={self.reordenados} tard={self.tardios} "
+            f"{nack}fallas={self.muestras_fallidas} filas={self.filas_escritas}"
+        )
+
+
+def combinar_observadores(*observadores):
+    """Un solo al_emitir que llama en orden a todos los observadores dados (None si no hay)."""
+    activos = [o for o in observadores if o is not None]
+    if len(activos) <= 1:
+        return activos[0] if activos else None
+
+    def al_emitir(*bloque):
+        for observador in activos:
+            observador(*bloque)
+    return al_emitir
+
+
+def expirar_manejadores(manejadores, ahora):
+    """
+    expirar() de todos los manejadores: procesar() solo vence la ventana del
+    dispositivo que manda, así que el receptor llama a esto cada
+    PERIODO_EXPIRACION para que el límite de VENTANA_TIEMPO valga también para
+    un dispositivo que dejó de mandar.
+    """
+    for manejador in list(manejadores.values()):
+        manejador.expirar(ahora)
+
+
+def reportar_estado(manejadores, indice_sesion, extra=""):
+    """Imprime una línea con los contadores de todos los dispositivos de la sesión."""
+    resumen = " | ".join(m.resumen() for _, m in sorted(list(manejadores.items())))
+    if resumen:
+        print(f"[{time.strftime('%H:%M:%S')}] (sesión {indice_sesion}) {resumen}{extra}")
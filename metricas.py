@@ -0,0 +1,213 @@
+"""
+Métricas en vivo del receptor, servidas en texto Prometheus por HTTP. Están
+apagadas por defecto: se activan con receptor_imu.py --metricas
+(http://127.0.0.1:9108/metrics), --puerto-metricas o "puerto_metricas" en la
+configuración.
+
+Para que se puedan dejar siempre prendidas, el camino caliente solo toca
+enteros preasignados:
+  - los contadores por dispositivo ya existen en ManejadorDispositivo y se leen
+    recién al atender cada pedido (recolectores registrados con `agregar_recolector`);
+  - las latencias por etapa se miden en 1 de cada `muestreo` paquetes y se
+    acumulan en histogramas de cubetas fijas;
+  - profundidad de cola, drops del kernel y bytes escritos se calculan al servir.
+"""
+import bisect
+import threading
+import time
+
+PUERTO_METRICAS = 9108
+MUESTREO_TIEMPOS = 16   # se mide la latencia de 1 de cada N paquetes
+
+# Cubetas (segundos) de los histogramas de latencia: 10 µs .. 1 s
+LIMITES_LATENCIA = (
+    1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0,
+)
+
+# Etapas del camino de un paquete
+ETAPA_ESPERA         = "espera"          # desde que se drenó del socket hasta que lo toma un escritor
+ETAPA_DECODIFICACION = "decodificacion"
+ETAPA_ESCRITURA      = "escritura"       # sumidero (y alineador, si está)
+
+
+def drops_kernel(puerto):
+    """Suma de la columna drops de /proc/net/udp para los sockets en `puerto` (None fuera de Linux)."""
+    try:
+        with open("/proc/net/udp") as f:
+            next(f)
+            total = 0
+            for linea in f:
+                campos = linea.split()
+                if int(campos[1].split(":")[1], 16) == puerto:
+                    total += int(campos[-1])
+            return total
+    except OSError:
+        return None
+
+
+class Histograma:
+    """Histograma acumulativo de cubetas fijas (sin memoria que crezca)."""
+
+    def __init__(self, limites=LIMITES_LATENCIA):
+        self.limites = tuple(limites)
+        self.cubetas = [0] * (len(self.limites) + 1)  # la última es +Inf
+        self.suma    = 0.0
+        self.cuenta  = 0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma   += valor
+        self.cuenta += 1
+
+    def texto(self, nombre, etiquetas=""):
+        sep = "," if etiquetas else ""
+        lineas, acumulado = [], 0
+        for limite, n in zip(self.limites + (float("inf"),), self.cubetas):
+            acumulado += n
+            le = "+Inf" if limite == float("inf") else repr(limite)
+            lineas.append(f'{nombre}_bucket{{{etiquetas}{sep}le="{le}"}} {acumulado}')
+        sufijo = f"{{{etiquetas}}}" if etiquetas else ""
+        lineas.append(f"{nombre}_sum{sufijo} {self.suma}")
+        lineas.append(f"{nombre}_count{sufijo} {self.cuenta}")
+        return lineas
+
+
+class Metricas:
+    """Histogramas por etapa, muestreo de tiempos y recolectores que se leen al servir."""
+
+    def __init__(self, muestreo=MUESTREO_TIEMPOS):
+        self.muestreo    = muestreo
+        self._contador   = 0
+        self.etapas      = {
+            e: Histograma() for e in (ETAPA_ESPERA, ETAPA_DECODIFICACION, ETAPA_ESCRITURA)
+        }
+        self.recolectores = []  # funciones () -> lista de líneas de texto Prometheus
+        self.inicio      = time.time()
+        self._servidor   = None
+
+    def toca_medir(self):
+        """True para 1 de cada `muestreo` llamadas (carrera entre hilos inofensiva)."""
+        self._contador += 1
+        return self._contador % self.muestreo == 0
+
+    def observar(self, etapa, segundos):
+        self.etapas[etapa].observar(segundos)
+
+    def agregar_recolector(self, funcion):
+        self.recolectores.append(funcion)
+
+    def texto(self):
+        lineas = ["# TYPE imu_latencia_segundos histogram"]
+        for etapa, histograma in self.etapas.items():
+            lineas.extend(histograma.texto("imu_latencia_segundos", f'etapa="{etapa}"'))
+        lineas.append("# TYPE imu_tiempo_activo_segundos gauge")
+        lineas.append(f"imu_tiempo_activo_segundos {time.time() - self.inicio:.3f}")
+        for recolector in self.recolectores:
+            try:
+                lineas.extend(recolector())
+            except Exception as e:  # una métrica rota no debe tirar el endpoint
+                lineas.append(f"# error en recolector: {e!r}")
+        return "\n".join(lineas) + "\n"
+
+    def servir(self, puerto=PUERTO_METRICAS, ip="127.0.0.1"):
+        """Atiende GET /metrics en un hilo de fondo."""
+        # http.server tarda en importarse: solo lo paga el receptor que sirve métricas
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metricas = self
+
+        class _Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.texto().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((ip, puerto), _Manejador)
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, name="imu-metricas", daemon=True).start()
+        print(f"Métricas en http://{ip}:{puerto}/metrics")
+
+    def detener(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
+
+
+def recolector_manejadores(obtener_manejadores):
+    """Contadores por dispositivo y bytes de la sesión en curso, leídos de los ManejadorDispositivo."""
+    contadores = (
+        ("paquetes", "imu_paquetes_total"),
+        ("perdidas", "imu_perdidos_total"),
+        ("corruptos", "imu_corruptos_total"),
+        ("muestras_fallidas", "imu_muestras_fallidas_total"),
+        ("solicitados", "imu_nack_solicitados_total"),
+        ("recuperados", "imu_nack_recuperados_total"),
+        ("irrecuperables", "imu_nack_irrecuperables_total"),
+        ("tardios_nack", "imu_nack_tardios_total"),
+        ("recuperados_fec", "imu_fec_recuperados_total"),
+        ("reordenados", "imu_reordenados_total"),
+        ("tardios", "imu_tardios_total"),
+        ("duplicados", "imu_duplicados_total"),
+        ("reinicios", "imu_reinicios_total"),
+        ("filas_escritas", "imu_filas_escritas_total"),
+    )
+
+    def recolectar():
+        manejadores = sorted(list(obtener_manejadores().items()))
+        lineas = []
+        for atributo, nombre in contadores:
+            lineas.append(f"# TYPE {nombre} counter")
+            for d, m in manejadores:
+                lineas.append(f'{nombre}{{dispositivo="{m.nombre}",id="{d}"}} {getattr(m, atributo)}')
+        lineas.append("# TYPE imu_bytes_sesion gauge")
+        for d, m in manejadores:
+            lineas.append(
+                f'imu_bytes_sesion{{dispositivo="{m.nombre}",id="{d}",sesion="{m.indice_sesion}"}} '
+                f"{m.sumidero.bytes_escritos()}"
+            )
+        lineas.append("# TYPE imu_pendientes_reorden gauge")
+        for d, m in manejadores:
+            lineas.append(f'imu_pendientes_reorden{{dispositivo="{m.nombre}",id="{d}"}} {len(m.pendientes)}')
+        return lineas
+
+    return recolectar
+
+
+def recolector_pipeline(pipeline):
+    """Profundidad de las colas de PipelineEscritura y datagramas encolados / descartados por cola llena."""
+
+    def recolectar():
+        e = pipeline.estado()
+        return [
+            "# TYPE imu_cola_profundidad gauge",
+            f"imu_cola_profundidad {e['cola']}",
+            "# TYPE imu_cola_profundidad_maxima gauge",
+            f"imu_cola_profundidad_maxima {e['cola_max']}",
+            "# TYPE imu_datagramas_encolados_total counter",
+            f"imu_datagramas_encolados_total {e['encolados']}",
+            "# TYPE imu_datagramas_descartados_total counter",
+            f"imu_datagramas_descartados_total {e['descartados']}",
+        ]
+
+    return recolectar
+
+
+def recolector_kernel(puerto):
+    """Datagramas descartados por el kernel en el socket de recepción."""
+
+    def recolectar():
+        drops = drops_kernel(puerto)
+        if drops is None:
+            return []
+        return ["# TYPE imu_drops_kernel_total counter", f"imu_drops_kernel_total {drops}"]
+
+    return recolectar
@@ -0,0 +1,131 @@
+import queue
+import threading
+import traceback
+
+PROFUNDIDAD_COLA = 256  # lotes en espera por trabajador antes de descartar
+_FIN = None             # centinela para detener a los trabajadores
+
+
+class PipelineEscritura:
+    """
+    Productor/consumidor entre el drenado del socket y la escritura a disco.
+
+    El hilo que drena el socket solo llama a encolar(); uno o más hilos
+    trabajadores llaman a `procesar(datos, t_recepcion)` por cada datagrama, o
+    con por_lote=True a `procesar(datagramas, t_recepcion)` una vez por lote
+    (para validar el lote entero de una pasada).
+    Los datagramas se reparten por dev_id (byte 5 de la cabecera IMU2) para que
+    cada dispositivo sea atendido siempre por el mismo trabajador y su estado no
+    se comparta entre hilos. Si la cola de un trabajador está llena el lote se
+    descarta y se cuenta: esas son pérdidas del receptor, no de la red.
+
+    Con `al_pulso(i, ahora)`, pulso() lo hace correr en cada trabajador i entre
+    sus lotes, para tareas periódicas sobre el estado de sus dispositivos (p.
+    ej. vencer ventanas de reordenamiento sin tráfico).
+    """
+
+    def __init__(self, procesar, num_trabajadores=1, profundidad=PROFUNDIDAD_COLA, por_lote=False,
+                 al_pulso=None):
+        self.procesar         = procesar
+        self.por_lote         = por_lote
+        self.al_pulso         = al_pulso
+        self.num_trabajadores = num_trabajadores
+        self.colas  = [queue.Queue(maxsize=profundidad) for _ in range(num_trabajadores)]
+        self.hilos  = []
+
+        # Contadores por trabajador (cada uno lo escribe un solo hilo)
+        self.encolados       = [0] * num_trabajadores  # datagramas aceptados
+        self.descartados     = [0] * num_trabajadores  # datagramas tirados por cola llena
+        self.procesados      = [0] * num_trabajadores
+        self.profundidad_max = [0] * num_trabajadores  # lotes en cola, máximo observado
+
+    def iniciar(self):
+        for i in range(self.num_trabajadores):
+            hilo = threading.Thread(
+                target=self._trabajador, args=(i,), name=f"escritor-{i}", daemon=True
+            )
+            hilo.start()
+            self.hilos.append(hilo)
+
+    def encolar(self, lote, t_recepcion):
+        """
+        Encola un lote de datagramas sin bloquear. Los datagramas se copian a
+        bytes: las vistas del anillo de recepción se reutilizan enseguida.
+        """
+        if self.num_trabajadores == 1:
+            self._encolar_en(0, [bytes(d) for d in lote], t_recepcion)
+            return
+
+        repartos = [[] for _ in range(self.num_trabajadores)]
+        for datos in lote:
+            id_disp = datos[5] if len(datos) > 5 else 0
+            repartos[id_disp % self.num_trabajadores].append(bytes(datos))
+        for i, datagramas in enumerate(repartos):
+            if datagramas:
+                self._encolar_en(i, datagramas, t_recepcion)
+
+    def _encolar_en(self, i, datagramas, t_recepcion):
+        cola = self.colas[i]
+        try:
+            cola.put_nowait((t_recepcion, datagramas))
+        except queue.Full:
+            self.descartados[i] += len(datagramas)
+            return
+        self.encolados[i] += len(datagramas)
+        profundidad = cola.qsize()
+        if profundidad > self.profundidad_max[i]:
+            self.profundidad_max[i] = profundidad
+
+    def pulso(self, ahora):
+        """Encola al_pulso en cada trabajador; si su cola está llena se saltea (ya tiene trabajo)."""
+        if self.al_pulso is None:
+            return
+        for cola in self.colas:
+            try:
+                cola.put_nowait((ahora, None))
+            except queue.Full:
+                pass
+
+    def _trabajador(self, i):
+        cola = self.colas[i]
+        while True:
+            item = cola.get()
+            if item is _FIN:
+                break
+            t_recepcion, datagramas = item
+            if datagramas is None:
+                try:
+                    self.al_pulso(i, t_recepcion)
+                except Exception:
+                    traceback.print_exc()
+                continue
+            if self.por_lote:
+                try:
+                    self.procesar(datagramas, t_recepcion)
+                except Exception:
+                    traceback.print_exc()
+            else:
+                for datos in datagramas:
+                    try:
+                        self.procesar(datos, t_recepcion)
+                    except Exception:
+                        traceback.print_exc()
+            self.procesados[i] += len(datagramas)
+
+    def detener(self):
+        """Espera a que se vacíen las colas y termina los trabajadores."""
+        for cola in self.colas:
+            cola.put(_FIN)
+        for hilo in self.hilos:
+            hilo.join()
+        self.hilos.clear()
+
+    def estado(self):
+        """Resumen de colas y contadores para los reportes periódicos."""
+        return {
+            "cola":        sum(c.qsize() for c in self.colas),
+            "cola_max":    max(self.profundidad_max),
+            "encolados":   sum(self.encolados),
+            "procesados":  sum(self.procesados),
+            "descartados": sum(self.descartados),
+        }
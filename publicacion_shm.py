@@ -0,0 +1,263 @@
+"""
+Publicación en vivo de los bloques decodificados para consumidores locales
+(tableros, detección de marcha, etc.) sin pasar por los CSV.
+
+Cada dispositivo tiene un anillo en memoria compartida (multiprocessing.shared_memory,
+nombre "<prefijo><id_disp>") con los últimos `capacidad` bloques:
+
+  cabecera  "<4s H H I I Q"  marca b"IMUR", versión, muestras por bloque,
+                             capacidad, id_disp, bloques publicados (total)
+  metadatos capacidad x DTYPE_META (seq, ms, n_muestras, t_recepcion,
+                             t_muestra0, dt, t_publicacion)
+  muestras  capacidad x muestras_por_bloque x 6 int16 (orden nativo)
+
+El publicador escribe la ranura publicados % capacidad y recién después
+incrementa el contador, así que nunca espera a nadie: un suscriptor lento
+simplemente pierde los bloques más viejos. Los suscriptores copian las ranuras
+que piden y, después de copiar, validan contra el contador (vigente()) que el
+publicador no las haya pisado mientras las leían: las pisadas se descartan.
+
+Uso (suscriptor de ejemplo, mide la latencia llegada -> suscriptor):
+    python publicacion_shm.py [id_disp] [segundos]
+"""
+import struct
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+PREFIJO_SHM       = "imu_bloques_"
+CAPACIDAD_BLOQUES = 1024   # ~21 s a 1 kHz con 21 muestras por bloque
+MARCA_ANILLO      = b"IMUR"
+VERSION_ANILLO    = 1
+FORMATO_CAB_ANILLO = "<4s H H I I Q"
+TAMANO_CAB_ANILLO  = 64   # la cabecera ocupa 24 bytes; el resto queda reservado y alineado
+OFFSET_PUBLICADOS  = struct.calcsize("<4s H H I I")
+
+DTYPE_META = np.dtype([
+    ("seq",           "<u4"),
+    ("ms",            "<u4"),
+    ("n_muestras",    "<u4"),
+    ("_relleno",      "<u4"),
+    ("t_recepcion",   "<f8"),   # hora del PC en que se drenó el datagrama
+    ("t_muestra0",    "<f8"),   # hora alineada de la primera muestra (reloj_dispositivo)
+    ("dt",            "<f8"),
+    ("t_publicacion", "<f8"),
+])
+
+
+def _tamano_total(capacidad, muestras_por_bloque):
+    return TAMANO_CAB_ANILLO + capacidad * DTYPE_META.itemsize + capacidad * muestras_por_bloque * 12
+
+
+def _vistas(buf, capacidad, muestras_por_bloque):
+    """(contador de publicados, metadatos, muestras) como vistas numpy sobre `buf`."""
+    publicados = np.ndarray((1,), dtype="<u8", buffer=buf, offset=OFFSET_PUBLICADOS)
+    meta = np.ndarray((capacidad,), dtype=DTYPE_META, buffer=buf, offset=TAMANO_CAB_ANILLO)
+    muestras = np.ndarray(
+        (capacidad, muestras_por_bloque, 6), dtype=np.int16, buffer=buf,
+        offset=TAMANO_CAB_ANILLO + capacidad * DTYPE_META.itemsize,
+    )
+    return publicados, meta, muestras
+
+
+class AnilloPublicacion:
+    """Lado escritor del anillo de un dispositivo (lo crea y lo borra al cerrar)."""
+
+    def __init__(self, id_disp, muestras_por_bloque=21, capacidad=CAPACIDAD_BLOQUES, prefijo=PREFIJO_SHM):
+        self.nombre = f"{prefijo}{id_disp}"
+        tamano = _tamano_total(capacidad, muestras_por_bloque)
+        try:
+            self.shm = shared_memory.SharedMemory(self.nombre, create=True, size=tamano)
+        except FileExistsError:
+            # Restos de un receptor anterior que no cerró bien
+            viejo = shared_memory.SharedMemory(self.nombre)
+            viejo.close()
+            viejo.unlink()
+            self.shm = shared_memory.SharedMemory(self.nombre, create=True, size=tamano)
+        struct.pack_into(
+            FORMATO_CAB_ANILLO, self.shm.buf, 0,
+            MARCA_ANILLO, VERSION_ANILLO, muestras_por_bloque, capacidad, id_disp, 0,
+        )
+        self.capacidad = capacidad
+        self.muestras_por_bloque = muestras_por_bloque
+        self._publicados, self._meta, self._muestras = _vistas(self.shm.buf, capacidad, muestras_por_bloque)
+        self.publicados = 0
+        self.truncados  = 0  # bloques con más muestras que la ranura (se publican las primeras)
+
+    def publicar(self, seq, muestras, ms=0, t_recepcion=0.0, t_muestra0=0.0, dt=0.0):
+        ranura = self.publicados % self.capacidad
+        n = len(muestras)
+        if n > self.muestras_por_bloque:
+            if not self.truncados:
+                print(f"[!] '{self.nombre}': bloque de {n} muestras en ranuras de "
+                      f"{self.muestras_por_bloque}; se publican truncados")
+            self.truncados += 1
+            n = self.muestras_por_bloque
+        self._muestras[ranura, :n] = muestras[:n]
+        self._meta[ranura] = (seq, ms, n, 0, t_recepcion, t_muestra0, dt, time.time())
+        self.publicados += 1
+        self._publicados[0] = self.publicados  # publica la ranura recién escrita
+
+    def cerrar(self):
+        del self._publicados, self._meta, self._muestras
+        self.shm.close()
+        self.shm.unlink()
+
+
+class PublicadorIMU:
+    """
+    Un AnilloPublicacion por dispositivo, creado con su primer bloque. Se engancha
+    al receptor como observador de ManejadorDispositivo (al_emitir).
+
+    Las ranuras se dimensionan con `muestras_por_bloque`, el bloque más grande
+    que se espera (el receptor lo saca de bytes_por_bloque), porque un mismo
+    dispositivo puede cambiar de largo de bloque. Lo que no entra se trunca y
+    se cuenta en truncados().
+    """
+
+    def __init__(self, muestras_por_bloque=21, capacidad=CAPACIDAD_BLOQUES, prefijo=PREFIJO_SHM):
+        self.muestras_por_bloque = muestras_por_bloque  # máximo; None = el del primer bloque de cada dispositivo
+        self.capacidad = capacidad
+        self.prefijo   = prefijo
+        self.anillos   = {}  # id_disp -> AnilloPublicacion
+
+    def publicar_bloque(self, id_disp, seq, muestras, t_muestra0=0.0, dt=0.0, t_recepcion=0.0, ms=0):
+        anillo = self.anillos.get(id_disp)
+        if anillo is None:
+            anillo = self.anillos[id_disp] = AnilloPublicacion(
+                id_disp, self.muestras_por_bloque or len(muestras), self.capacidad, self.prefijo
+            )
+            print(f"[+] Publicando id{id_disp} en memoria compartida '{anillo.nombre}'")
+        anillo.publicar(seq, muestras, ms, t_recepcion, t_muestra0, dt)
+
+    def truncados(self):
+        """Bloques publicados truncados, sumando todos los dispositivos."""
+        return sum(anillo.truncados for anillo in self.anillos.values())
+
+    def cerrar(self):
+        for anillo in self.anillos.values():
+            anillo.cerrar()
+        self.anillos.clear()
+
+
+class SuscriptorIMU:
+    """Lector de un anillo publicado; varios suscriptores pueden leer el mismo a la vez."""
+
+    def __init__(self, id_disp, prefijo=PREFIJO_SHM):
+        self.shm = shared_memory.SharedMemory(f"{prefijo}{id_disp}")
+        _dejar_de_rastrear(self.shm)
+        marca, version, m, capacidad, self.id_disp, _ = struct.unpack_from(FORMATO_CAB_ANILLO, self.shm.buf, 0)
+        if marca != MARCA_ANILLO or version != VERSION_ANILLO:
+            raise ValueError(f"{self.shm.name}: no es un anillo IMUR v{VERSION_ANILLO}")
+        self.capacidad, self.muestras_por_bloque = capacidad, m
+        self._publicados, self.meta, self.muestras = _vistas(self.shm.buf, capacidad, m)
+        self.leidos = self.publicados()  # arranca desde lo que se publique de ahora en más
+        self.pisados = 0  # bloques descartados porque el publicador los pisó mientras se copiaban
+
+    def publicados(self):
+        return int(self._publicados[0])
+
+    def ultimos(self, n_bloques):
+        """
+        (metadatos, muestras) de los últimos n_bloques en orden, copiados y
+        validados (ver _leer); pueden ser menos si el publicador pisó los más
+        viejos mientras se copiaban.
+        """
+        fin = self.publicados()
+        n = min(n_bloques, fin, self.capacidad - 1)  # la ranura restante es la que se está escribiendo
+        return self._leer(fin - n, fin)
+
+    def ultimos_segundos(self, segundos, frecuencia):
+        return self.ultimos(int(np.ceil(segundos * frecuencia / self.muestras_por_bloque)))
+
+    def nuevos(self):
+        """Bloques publicados desde la última llamada (los que ya se pisaron se saltean)."""
+        fin = self.publicados()
+        inicio = max(self.leidos, fin - self.capacidad + 1)
+        self.leidos = fin
+        return self._leer(inicio, fin)
+
+    def esperar_nuevos(self, timeout=1.0, sondeo=0.0002):
+        """Como nuevos(), pero espera (sondeando el contador) hasta que haya algo o venza timeout."""
+        limite = time.perf_counter() + timeout
+        while self.publicados() == self.leidos and time.perf_counter() < limite:
+            time.sleep(sondeo)
+        return self.nuevos()
+
+    def _leer(self, inicio, fin):
+        """
+        Copia los bloques absolutos [inicio, fin) y después descarta del principio
+        los que ya no están vigentes: el publicador pudo pisarlos durante la copia.
+        """
+        meta, muestras = self._copiar(inicio, fin)
+        desde = inicio
+        while desde < fin and not self.vigente(desde):
+            desde += 1
+        if desde > inicio:
+            self.pisados += desde - inicio
+            meta, muestras = meta[desde - inicio:], muestras[desde - inicio:]
+        return meta, muestras
+
+    def _copiar(self, inicio, fin):
+        a, b = inicio % self.capacidad, fin % self.capacidad
+        if fin - inicio == 0:
+            return self.meta[:0].copy(), self.muestras[:0].copy()
+        if a < b or b == 0:
+            b = b or self.capacidad
+            return self.meta[a:b].copy(), self.muestras[a:b].copy()
+        # Cruza el final del anillo
+        return (np.concatenate([self.meta[a:], self.meta[:b]]),
+                np.concatenate([self.muestras[a:], self.muestras[:b]]))
+
+    def vigente(self, inicio):
+        """
+        True si la ranura del bloque absoluto `inicio` no fue pisada: el publicador
+        escribe el bloque `publicados` (en la ranura de publicados - capacidad)
+        antes de incrementar el contador, así que esa ranura tampoco es confiable.
+        """
+        return self.publicados() - inicio < self.capacidad
+
+    def cerrar(self):
+        del self._publicados, self.meta, self.muestras
+        self.shm.close()
+
+
+def _dejar_de_rastrear(shm):
+    """Evita que el resource_tracker del suscriptor borre el segmento al salir (es del publicador)."""
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def main():
+    id_disp  = int(sys.argv[1]) if len(sys.argv) > 1 else 1
+    duracion = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    suscriptor = SuscriptorIMU(id_disp)
+    print(f"Suscripto a '{suscriptor.shm.name}' ({suscriptor.capacidad} bloques)")
+    latencias, bloques = [], 0
+    fin = time.time() + duracion
+    try:
+        while time.time() < fin:
+            meta, _ = suscriptor.esperar_nuevos(0.5)
+            ahora = time.time()
+            if len(meta):
+                latencias.extend(ahora - meta["t_recepcion"])
+                bloques += len(meta)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        suscriptor.cerrar()
+    if latencias:
+        p = np.percentile(np.array(latencias) * 1e6, [50, 90, 99])
+        print(f"{bloques} bloques; latencia llegada -> suscriptor: "
+              f"p50={p[0]:.0f} µs p90={p[1]:.0f} µs p99={p[2]:.0f} µs")
+    else:
+        print("No llegaron bloques.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+import ctypes
+import errno
+import select
+import socket
+import struct
+import sys
+import zlib
+
+MARCA_MAGICA      = b"IMU2"
+FORMATO_CABECERA  = "<4s B B H I I I"  # magic(4), ver(1), dev_id(1), rsv(2), seq(u32), ms(u32), len(u32)
+TAMANO_CABECERA   = struct.calcsize(FORMATO_CABECERA)
+
+# Versiones del protocolo (se aceptan las dos a la vez)
+#   v1: payload = n muestras de 12 B + footer de 4 B en cero; rsv = 0
+#   v2: payload = n muestras de 12 B + mapa de fallas (1 bit por muestra, ceil(n/8) B)
+#       + CRC32 (zlib) de cabecera y payload hasta antes del CRC; rsv = n muestras.
+#       El bit i del mapa indica que la lectura I2C de la muestra i falló (va en cero).
+#   v3 (FEC): payload = bloque como en v1 (rsv bytes; 0 en un datagrama solo de paridad)
+#       + sección FEC "<B B H I" (tipo, n_bloques, largo de los datos, seq_base) + datos.
+#       La sección la arma y la interpreta fec_imu.py.
+VERSION_V1     = 1
+VERSION_V2     = 2
+VERSION_FEC    = 3
+TAMANO_MUESTRA = 12
+TAMANO_CRC     = 4
+FORMATO_FEC    = "<B B H I"
+BIT_RETRANSMISION = 0x80  # bit alto de ver: el bloque se reenvía por un NACK (ver armar_nacks)
+TAMANO_FEC     = struct.calcsize(FORMATO_FEC)
+
+# Pedido de retransmisión (NACK) del receptor al ESP32, a la dirección de origen de sus bloques:
+#   cabecera "<4s B B H" = marca "NACK", versión 1, dev_id, cantidad de tramos
+#   + tramos "<I H" = (seq_inicio, n_bloques) de lo que falta
+MARCA_NACK      = b"NACK"
+FORMATO_NACK    = "<4s B B H"
+FORMATO_TRAMO   = "<I H"
+TAMANO_NACK     = struct.calcsize(FORMATO_NACK)
+TAMANO_TRAMO    = struct.calcsize(FORMATO_TRAMO)
+MAXIMO_TRAMOS   = 64     # tramos por datagrama NACK
+TAMANO_SOCKADDR = 16     # sockaddr_in (los sockets son AF_INET)
+
+NUM_RANURAS    = 1024   # datagramas que caben en el anillo
+TAMANO_RANURA  = 2048   # bytes por ranura (cabecera 20 + bloque 256 sobra)
+MAXIMO_LOTE    = 64     # datagramas por llamada a drenar()
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [
+        ("iov_base", ctypes.c_void_p),
+        ("iov_len", ctypes.c_size_t),
+    ]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_hdr", _MsgHdr),
+        ("msg_len", ctypes.c_uint),
+    ]
+
+
+def _cargar_recvmmsg():
+    """Devuelve la función recvmmsg de libc (solo Linux) o None si no está disponible."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        funcion = libc.recvmmsg
+    except (OSError, AttributeError):
+        return None
+    funcion.argtypes = [
+        ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p,
+    ]
+    funcion.restype = ctypes.c_int
+    return funcion
+
+
+_recvmmsg = _cargar_recvmmsg()
+
+
+class AnilloRecepcion:
+    """
+    Anillo preasignado de ranuras de tamaño fijo sobre un único bytearray.
+    Cada llamada a drenar() recibe varios datagramas seguidos (recvmmsg en Linux,
+    recv_into en el resto) y devuelve memoryviews a las ranuras, sin copiar.
+    Una ranura se reutiliza cuando el anillo da la vuelta: quien consuma las
+    vistas debe terminar con ellas antes de NUM_RANURAS datagramas más.
+
+    Con con_origen=True también se guarda de dónde vino cada datagrama:
+    después de drenar(), `origenes` tiene las (ip, puerto) en el mismo orden
+    que las vistas (para mandar NACKs al ESP32 que corresponde).
+    """
+
+    def __init__(self, sock, num_ranuras=NUM_RANURAS, tamano_ranura=TAMANO_RANURA,
+                 maximo_lote=MAXIMO_LOTE, usar_recvmmsg=True, con_origen=False):
+        self.sock          = sock
+        self.num_ranuras   = num_ranuras
+        self.tamano_ranura = tamano_ranura
+        self.maximo_lote   = min(maximo_lote, num_ranuras)
+        self.cabeza        = 0  # próxima ranura a llenar
+        self.con_origen    = con_origen
+        self.origenes      = []  # (ip, puerto) de cada datagrama del último drenar()
+        self.nombres       = bytearray(num_ranuras * TAMANO_SOCKADDR) if con_origen else None
+
+        self.buffer  = bytearray(num_ranuras * tamano_ranura)
+        self.vista   = memoryview(self.buffer)
+        self.ranuras = [
+            self.vista[i * tamano_ranura:(i + 1) * tamano_ranura] for i in range(num_ranuras)
+        ]
+
+        # El socket queda no bloqueante: la espera se hace con select() en drenar().
+        self.sock.setblocking(False)
+
+        self._recvmmsg = _recvmmsg if usar_recvmmsg else None
+        if self._recvmmsg is not None:
+            self._preparar_mensajes()
+
+    @property
+    def modo(self):
+        return "recvmmsg" if self._recvmmsg is not None else "recv_into"
+
+    def _preparar_mensajes(self):
+        """Arma una vez los mmsghdr/iovec apuntando a cada ranura del bytearray."""
+        base = ctypes.addressof((ctypes.c_char * len(self.buffer)).from_buffer(self.buffer))
+        if self.con_origen:
+            base_nombres = ctypes.addressof((ctypes.c_char * len(self.nombres)).from_buffer(self.nombres))
+        self._iovecs    = (_IoVec * self.num_ranuras)()
+        self._mensajes  = (_MMsgHdr * self.num_ranuras)()
+        for i in range(self.num_ranuras):
+            self._iovecs[i].iov_base = base + i * self.tamano_ranura
+            self._iovecs[i].iov_len  = self.tamano_ranura
+            hdr = self._mensajes[i].msg_hdr
+            hdr.msg_iov    = ctypes.pointer(self._iovecs[i])
+            hdr.msg_iovlen = 1
+            if self.con_origen:
+                # El kernel deja msg_namelen en 16 para AF_INET: no hace falta reponerlo
+                hdr.msg_name    = base_nombres + i * TAMANO_SOCKADDR
+                hdr.msg_namelen = TAMANO_SOCKADDR
+        self._tamano_mmsghdr = ctypes.sizeof(_MMsgHdr)
+
+    def drenar(self, timeout=None):
+        """
+        Espera hasta `timeout` segundos a que haya datos y recibe todos los
+        datagramas disponibles (hasta maximo_lote o el final del anillo).
+        Devuelve una lista de memoryview (vacía si venció el timeout).
+        """
+        listos, _, _ = select.select([self.sock], [], [], timeout)
+        if not listos:
+            return []
+
+        inicio   = self.cabeza
+        cantidad = min(self.maximo_lote, self.num_ranuras - inicio)
+
+        if self._recvmmsg is not None:
+            longitudes = self._drenar_recvmmsg(inicio, cantidad)
+        else:
+            longitudes = self._drenar_recv_into(inicio, cantidad)
+
+        self.cabeza = (inicio + len(longitudes)) % self.num_ranuras
+        ranuras = self.ranuras
+        return [ranuras[inicio + k][:n] for k, n in enumerate(longitudes)]
+
+    def _drenar_recvmmsg(self, inicio, cantidad):
+        n = self._recvmmsg(
+            self.sock.fileno(),
+            ctypes.cast(ctypes.byref(self._mensajes, inicio * self._tamano_mmsghdr),
+                        ctypes.POINTER(_MMsgHdr)),
+            cantidad, 0, None,
+        )
+        if n < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(err, "recvmmsg: " + errno.errorcode.get(err, "?"))
+        mensajes = self._mensajes
+        if self.con_origen:
+            nombres = self.nombres
+            self.origenes = [
+                (socket.inet_ntoa(nombres[j + 4:j + 8]), int.from_bytes(nombres[j + 2:j + 4], "big"))
+                for j in range(inicio * TAMANO_SOCKADDR, (inicio + n) * TAMANO_SOCKADDR, TAMANO_SOCKADDR)
+            ]
+        return [mensajes[inicio + k].msg_len for k in range(n)]
+
+    def _drenar_recv_into(self, inicio, cantidad):
+        longitudes = []
+        ranuras    = self.ranuras
+        if self.con_origen:
+            self.origenes = origenes = []
+            recvfrom_into = self.sock.recvfrom_into
+            for k in range(cantidad):
+                try:
+                    n, origen = recvfrom_into(ranuras[inicio + k])
+                except (BlockingIOError, InterruptedError):
+                    break
+                longitudes.append(n)
+                origenes.append(origen)
+            return longitudes
+        recv_into = self.sock.recv_into
+        for k in range(cantidad):
+            try:
+                longitudes.append(recv_into(ranuras[inicio + k]))
+            except (BlockingIOError, InterruptedError):
+                break
+        return longitudes
+
+
+def tamano_payload_v2(n_muestras):
+    """Bytes de payload de un bloque v2 con n_muestras (21 -> 259, 85 -> 1035)."""
+    return n_muestras * TAMANO_MUESTRA + (n_muestras + 7) // 8 + TAMANO_CRC
+
+
+def armar_datagrama_v2(id_disp, seq, ms, muestras, fallas=0):
+    """
+    Datagrama v2 completo, como lo arma el firmware: `muestras` son n * 12 bytes
+    (6 x int16 big-endian por muestra) y `fallas` el mapa como entero (bit i = muestra i).
+    """
+    n = len(muestras) // TAMANO_MUESTRA
+    cuerpo = struct.pack(
+        FORMATO_CABECERA, MARCA_MAGICA, VERSION_V2, id_disp, n, seq, ms, tamano_payload_v2(n)
+    ) + muestras + fallas.to_bytes((n + 7) // 8, "little")
+    return cuerpo + struct.pack("<I", zlib.crc32(cuerpo))
+
+
+def armar_datagrama_fec(id_disp, seq, ms, bloque, tipo=0, n_bloques=0, seq_base=0, datos=b""):
+    """Datagrama v3: `bloque` (formato v1, puede ser b"") seguido de la sección FEC."""
+    seccion = struct.pack(FORMATO_FEC, tipo, n_bloques, len(datos), seq_base) + datos
+    return struct.pack(
+        FORMATO_CABECERA, MARCA_MAGICA, VERSION_FEC, id_disp, len(bloque), seq, ms, len(bloque) + len(seccion)
+    ) + bloque + seccion
+
+
+def _payload_v2(vista, n):
+    """
+    (payload, fallas) de un bloque v2 cuyo CRC y largo ya cerraron. El payload
+    son las n muestras más los 4 bytes siguientes, igual que un bloque v1
+    (muestras + footer), para que los decodificadores no cambien.
+    """
+    inicio_mapa = TAMANO_CABECERA + n * TAMANO_MUESTRA
+    fallas = int.from_bytes(vista[inicio_mapa:len(vista) - TAMANO_CRC], "little")
+    return vista[TAMANO_CABECERA:inicio_mapa + 4], fallas
+
+
+def _v2_integro(vista, n, longitud):
+    """El largo anunciado coincide con n muestras y el CRC32 del final cierra."""
+    if longitud != tamano_payload_v2(n) or len(vista) - TAMANO_CABECERA != longitud:
+        return False
+    fin = len(vista) - TAMANO_CRC
+    return zlib.crc32(vista[:fin]) == struct.unpack_from("<I", vista, fin)[0]
+
+
+def desempaquetar_cabecera(vista):
+    """
+    Lee la cabecera IMU2 directamente desde la vista (sin copiar el datagrama).
+    Devuelve (id_disp, seq, ms, payload) o None si el datagrama no es válido
+    (en v2, también si no cierra el CRC). Para distinguir los bloques corruptos
+    de la basura y tener el mapa de fallas, usar validar_lote().
+    """
+    if len(vista) < TAMANO_CABECERA:
+        return None
+    marca, ver, id_disp, rsv, seq, ms, longitud = struct.unpack_from(FORMATO_CABECERA, vista)
+    if marca != MARCA_MAGICA or longitud <= 0:
+        return None
+    ver &= ~BIT_RETRANSMISION
+    if ver == VERSION_V2:
+        if not _v2_integro(vista, rsv, longitud):
+            return None
+        payload, _ = _payload_v2(vista, rsv)
+        return id_disp, seq, ms, payload
+    if ver == VERSION_FEC:
+        if len(vista) - TAMANO_CABECERA != longitud or not 0 < rsv <= longitud - TAMANO_FEC:
+            return None
+        return id_disp, seq, ms, vista[TAMANO_CABECERA:TAMANO_CABECERA + rsv]
+    if ver != VERSION_V1 or len(vista) - TAMANO_CABECERA != longitud:
+        return None
+    return id_disp, seq, ms, vista[TAMANO_CABECERA:]
+
+
+def validar_lote(lote):
+    """
+    Valida de una pasada un lote de datagramas v1 y v2 (bytes o memoryview,
+    sin copiarlos; el CRC32 se calcula sobre la vista). Devuelve (bloques, corruptos, fec):
+      bloques:   [(id_disp, seq, ms, payload, fallas, retransmitido)] válidos; fallas = 0
+                 en v1 y v3; retransmitido si la cabecera trae BIT_RETRANSMISION
+      corruptos: [(id_disp, seq, ms)] v2 con CRC, largo o cantidad de muestras que
+                 no cierran; la cabecera puede estar dañada, así que es orientativa.
+      fec:       [(id_disp, seq, ms, payload, seccion)] de cada datagrama v3, en
+                 orden (payload vacío en los de solo paridad), para fec_imu.py.
+    Lo que no es IMU2 (marca, versión o largo v1 inválidos) se ignora como antes.
+    """
+    bloques, corruptos, fec = [], [], []
+    agregar, agregar_corrupto, agregar_fec = bloques.append, corruptos.append, fec.append
+    unpack_from, crc32 = struct.unpack_from, zlib.crc32
+    for vista in lote:
+        largo = len(vista)
+        if largo < TAMANO_CABECERA:
+            continue
+        marca, ver, id_disp, rsv, seq, ms, longitud = unpack_from(FORMATO_CABECERA, vista)
+        if marca != MARCA_MAGICA or longitud <= 0:
+            continue
+        retransmitido = ver >= BIT_RETRANSMISION
+        if retransmitido:
+            ver -= BIT_RETRANSMISION
+        if ver == VERSION_V1:
+            if largo - TAMANO_CABECERA == longitud:
+                agregar((id_disp, seq, ms, vista[TAMANO_CABECERA:], 0, retransmitido))
+        elif ver == VERSION_V2:
+            fin = largo - TAMANO_CRC
+            if (longitud == tamano_payload_v2(rsv) and largo - TAMANO_CABECERA == longitud
+                    and crc32(vista[:fin]) == unpack_from("<I", vista, fin)[0]):
+                agregar((id_disp, seq, ms) + _payload_v2(vista, rsv) + (retransmitido,))
+            else:
+                agregar_corrupto((id_disp, seq, ms))
+        elif ver == VERSION_FEC:
+            if largo - TAMANO_CABECERA == longitud and rsv <= longitud - TAMANO_FEC:
+                fin_bloque = TAMANO_CABECERA + rsv
+                payload = vista[TAMANO_CABECERA:fin_bloque]
+                if rsv:
+                    agregar((id_disp, seq, ms, payload, 0, retransmitido))
+                agregar_fec((id_disp, seq, ms, payload, vista[fin_bloque:]))
+    return bloques, corruptos, fec
+
+
+def tramos_de(seqs):
+    """[7, 8, 9, 12] -> [(7, 3), (12, 1)] (las seq en cualquier orden)."""
+    tramos = []
+    for seq in sorted(seqs):
+        if tramos and seq == tramos[-1][0] + tramos[-1][1]:
+            tramos[-1][1] += 1
+        elif not tramos or seq > tramos[-1][0] + tramos[-1][1]:
+            tramos.append([seq, 1])
+    return [tuple(t) for t in tramos]
+
+
+def marcar_retransmision(datagrama):
+    """
+    El mismo datagrama IMU2 con BIT_RETRANSMISION en ver, como lo reenvía el
+    emisor al recibir un NACK (en v2 se recalcula el CRC, que cubre la cabecera).
+    """
+    marcado = bytearray(datagrama)
+    marcado[4] |= BIT_RETRANSMISION
+    if marcado[4] & ~BIT_RETRANSMISION == VERSION_V2:
+        fin = len(marcado) - TAMANO_CRC
+        struct.pack_into("<I", marcado, fin, zlib.crc32(memoryview(marcado)[:fin]))
+    return bytes(marcado)
+
+
+def armar_nacks(id_disp, seqs):
+    """Datagramas NACK que piden las `seqs` de id_disp (uno cada MAXIMO_TRAMOS tramos)."""
+    tramos = tramos_de(seqs)
+    return [
+        struct.pack(FORMATO_NACK, MARCA_NACK, 1, id_disp, len(grupo))
+        + b"".join(struct.pack(FORMATO_TRAMO, *t) for t in grupo)
+        for grupo in (tramos[i:i + MAXIMO_TRAMOS] for i in range(0, len(tramos), MAXIMO_TRAMOS))
+    ]
+
+
+def leer_nack(datos):
+    """(id_disp, [(seq_inicio, n_bloques)]) de un datagrama NACK, o None si no lo es."""
+    if len(datos) < TAMANO_NACK:
+        return None
+    marca, ver, id_disp, n = struct.unpack_from(FORMATO_NACK, datos)
+    if marca != MARCA_NACK or ver != 1 or len(datos) != TAMANO_NACK + n * TAMANO_TRAMO:
+        return None
+    return id_disp, [struct.unpack_from(FORMATO_TRAMO, datos, TAMANO_NACK + i * TAMANO_TRAMO) for i in range(n)]
+
+
+def crear_socket(ip, puerto, rcvbuf=1_000_000):
+    """Socket UDP con buffer de recepción grande, igual que en los receptores."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    s.bind((ip, puerto))
+    return s
@@ -0,0 +1,202 @@
+"""
+Receptor IMU2 sobre asyncio (loop.create_datagram_endpoint), alternativa al
+bucle bloqueante de receptor_imu.py para embeberlo en un
+servicio async. Cada dev_id tiene su ManejadorDispositivo; la rotación de
+sesión, el reporte periódico y la expiración de las ventanas de
+reordenamiento corren como tareas con temporizador en vez de revisarse en
+cada paquete.
+
+La configuración es la de receptor_imu.py (CONFIG_DEFECTO, el mismo JSON de
+--config y las mismas claves como argumentos); de ella se usan ip, puerto,
+dispositivos, bytes/muestras por bloque, sesiones, sumidero y periodo_reporte.
+Los datagramas se validan igual (CRC32 y mapa de fallas en v2) y las
+secciones FEC de v3 reconstruyen los bloques perdidos.
+
+Uso: python receptor_async.py [--config receptor_1khz.json]
+"""
+import argparse
+import asyncio
+import time
+
+from manejador_dispositivo import (
+    ManejadorDispositivo, expirar_manejadores, reportar_estado, PERIODO_EXPIRACION,
+)
+from recepcion_lotes import crear_socket, validar_lote
+from receptor_imu import cargar_configuracion, configuracion, muestras_en_bloque
+from rotacion_sesion import PreaperturaSesiones
+
+
+class ProtocoloIMU(asyncio.DatagramProtocol):
+    """Entrega cada datagrama recibido al receptor, con la hora de llegada."""
+
+    def __init__(self, receptor):
+        self.receptor = receptor
+
+    def datagram_received(self, datos, direccion):
+        self.receptor.procesar_datagrama(datos, time.time())
+
+    def error_received(self, exc):
+        print(f"[!] Error de socket: {exc}")
+
+
+class ReceptorAsync:
+    """Estado de sesión y manejadores por dispositivo de un receptor asyncio."""
+
+    def __init__(self, config=None, decodificar=None, al_emitir=None, metricas=None, **cambios):
+        self.config = c = configuracion(config, **cambios)
+        self.id_a_nombre         = c["dispositivos"]
+        self.indice_sesion       = c["sesion_inicial"]
+        self.duracion_sesion     = c["duracion_sesion"]
+        self.prefijo_sesion      = c["prefijo_sesion"]
+        self.tipo_sumidero       = c["sumidero"]
+        self.muestras_por_bloque = c["muestras_por_bloque"]  # None = el de cada cabecera
+        self.periodo_reporte     = c["periodo_reporte"]
+        self.al_emitir           = al_emitir  # p. ej. AlineadorMultidispositivo.agregar_bloque
+        self.metricas            = metricas   # metricas.Metricas; se sirve aparte con .servir()
+
+        if decodificar is None:
+            from decodificador_imu import decodificar_bloque
+            muestras_por_bloque = self.muestras_por_bloque
+
+            def decodificar(payload):
+                return decodificar_bloque(payload, muestras_por_bloque)
+        self.decodificar = decodificar
+
+        self.manejadores = {}  # id_disp -> ManejadorDispositivo
+        self.corruptos_sin_dispositivo = 0  # corruptos cuyo dev_id no tiene manejador todavía
+        self.preapertura = PreaperturaSesiones(self.tipo_sumidero, self.prefijo_sesion)
+        self.transporte  = None
+        self._tareas     = []
+
+    def manejador_para(self, id_disp):
+        manejador = self.manejadores.get(id_disp)
+        if manejador is not None and manejador.indice_sesion != self.indice_sesion:
+            manejador.cambiar_sesion(
+                self.indice_sesion, self.preapertura.tomar(self.indice_sesion, id_disp),
+                self.preapertura.cerrar_en_fondo,
+            )
+        if manejador is None:
+            nombre = self.id_a_nombre.get(id_disp, f"id{id_disp}")
+            manejador = ManejadorDispositivo(
+                id_disp, nombre, self.indice_sesion, self.decodificar,
+                prefijo_sesion=self.prefijo_sesion,
+                tipo_sumidero=self.tipo_sumidero,
+                muestras_por_bloque=self.muestras_por_bloque or muestras_en_bloque(self.config["bytes_por_bloque"]),
+                al_emitir=self.al_emitir,
+                sumidero=self.preapertura.tomar(self.indice_sesion, id_disp),
+                metricas=self.metricas,
+            )
+            self.manejadores[id_disp] = manejador
+            self.preapertura.preparar(self.indice_sesion + 1, {id_disp: nombre})
+        return manejador
+
+    def procesar_datagrama(self, datos, t_recepcion=0.0):
+        """Valida el datagrama como receptor_imu (v1/v2/v3, CRC32) y lo pasa a su manejador."""
+        bloques, corruptos, fec = validar_lote((datos,))
+        for id_disp, seq, ms in corruptos:
+            manejador = self.manejadores.get(id_disp)
+            if manejador is not None:
+                manejador.registrar_corrupto(seq, ms)
+            else:
+                self.corruptos_sin_dispositivo += 1
+        for id_disp, seq, ms, payload, fallas, retransmitido in bloques:
+            self.manejador_para(id_disp).procesar(seq, payload, t_recepcion, ms, fallas, retransmitido)
+        for id_disp, seq, ms, payload, seccion in fec:
+            manejador = self.manejadores.get(id_disp)
+            if manejador is not None:
+                manejador.procesar_fec(seq, ms, payload, seccion, t_recepcion)
+
+    def rotar_sesion(self):
+        """
+        Avanza a la siguiente sesión y encarga la apertura de la próxima. Cada
+        dispositivo pasa a los sumideros ya preabiertos con su próximo bloque
+        (ver manejador_para), sin perder su secuencia.
+        """
+        if self.manejadores:
+            print(f"--- Cerrando sesión {self.indice_sesion} ---")
+        self.indice_sesion += 1
+        self.preapertura.preparar(
+            self.indice_sesion + 1, {d: m.nombre for d, m in self.manejadores.items()}
+        )
+        self.preapertura.descartar_anteriores(self.indice_sesion)
+        print(f"--- Nueva sesión {self.indice_sesion} "
+              f"(carpeta raíz: {self.prefijo_sesion}{self.indice_sesion}) ---")
+
+    def cerrar(self):
+        for manejador in self.manejadores.values():
+            manejador.cerrar()
+        self.manejadores.clear()
+
+    async def _tarea_rotacion(self):
+        while True:
+            await asyncio.sleep(self.duracion_sesion)
+            self.rotar_sesion()
+
+    async def _tarea_expiracion(self):
+        while True:
+            await asyncio.sleep(PERIODO_EXPIRACION)
+            expirar_manejadores(self.manejadores, time.time())
+
+    async def _tarea_reporte(self):
+        while True:
+            await asyncio.sleep(self.periodo_reporte)
+            actuales = {
+                d: m for d, m in self.manejadores.items() if m.indice_sesion == self.indice_sesion
+            }
+            reportar_estado(actuales, self.indice_sesion)
+
+    async def iniciar(self, ip=None, puerto=None):
+        """Abre el endpoint UDP (por defecto, ip y puerto de la configuración) y lanza las tareas."""
+        ip = ip or self.config["ip"]
+        puerto = puerto or self.config["puerto"]
+        loop = asyncio.get_running_loop()
+        sock = crear_socket(ip, puerto)
+        self.transporte, _ = await loop.create_datagram_endpoint(
+            lambda: ProtocoloIMU(self), sock=sock
+        )
+        self._tareas = [
+            asyncio.create_task(self._tarea_rotacion()),
+            asyncio.create_task(self._tarea_expiracion()),
+            asyncio.create_task(self._tarea_reporte()),
+        ]
+        print(f"Escuchando en {ip}:{puerto} ... (asyncio)")
+
+    async def detener(self):
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas = []
+        if self.transporte is not None:
+            self.transporte.close()
+            self.transporte = None
+        self.cerrar()
+        self.preapertura.detener()
+
+    async def correr(self, ip=None, puerto=None):
+        """Recibe hasta que la tarea se cancele."""
+        await self.iniciar(ip, puerto)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.detener()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Receptor IMU2 sobre asyncio")
+    parser.add_argument("--config", help="archivo JSON con la configuración de receptor_imu.py")
+    args = parser.parse_args(argv)
+    try:
+        config = cargar_configuracion(args.config) if args.config else configuracion()
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    receptor = ReceptorAsync(config)
+    try:
+        asyncio.run(receptor.correr())
+    except KeyboardInterrupt:
+        print("\nInterrumpido por usuario.")
+    print("Cerrado.")
+
+
+if __name__ == "__main__":
+    main()
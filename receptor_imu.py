@@ -0,0 +1,520 @@
+"""
+Receptor IMU2 configurable: un solo receptor para todas las flotas, en vez de
+una copia de Comunicacion_UDP_buff256_*.py por cada frecuencia.
+
+La configuración sale de CONFIG_DEFECTO, pisada por un archivo JSON (--config)
+y después por las opciones de la línea de comandos. Desde Python:
+
+    from receptor_imu import Receptor
+    receptor = Receptor(puerto=50001, sumidero="binario", dispositivos={1: "pecho"})
+    receptor.correr()          # hasta Ctrl-C o receptor.detener() desde otro hilo
+
+Las piezas opcionales (decodificador numpy, alineador, memoria compartida,
+métricas) se importan recién al iniciar y solo si están activadas.
+
+Uso: python receptor_imu.py [--config receptor_1khz.json] [--puerto 50000]
+         [--dispositivo 1=pecho ...] [--bytes-por-bloque 256] [--muestras-por-bloque 21]
+         [--duracion-sesion 3] [--sesion-inicial 1] [--sumidero binario|csv] ...
+"""
+import argparse
+import json
+import socket
+import struct
+import threading
+import time
+
+from manejador_dispositivo import (
+    PERIODO_EXPIRACION, ManejadorDispositivo, combinar_observadores, expirar_manejadores,
+)
+from manejador_dispositivo import reportar_estado as reportar_estado_manejadores
+from pipeline_escritura import PipelineEscritura
+from recepcion_lotes import (
+    AnilloRecepcion, MARCA_MAGICA, TAMANO_CABECERA, TAMANO_RANURA, armar_nacks, crear_socket, validar_lote,
+)
+from rotacion_sesion import PreaperturaSesiones
+
+TAMANO_MUESTRA    = 12   # 6 * int16 big-endian
+TAMANO_FOOTER     = 4
+TIMEOUT_RECEPCION = 2.0  # s máximos bloqueado esperando datos (también para notar detener())
+
+CONFIG_DEFECTO = {
+    "ip":                  "0.0.0.0",
+    "puerto":              50000,
+    "dispositivos": {      # dev_id -> nombre base de carpeta/archivo (sin número)
+        1: "brazo_izquierdo",
+        2: "brazo_derecho",
+        3: "pierna_izquierda",
+        4: "pierna_derecha",
+    },
+    "bytes_por_bloque":    256,    # payload más grande esperado (muestras * 12 + footer; con FEC, más la redundancia)
+    "muestras_por_bloque": None,   # None = según el len de cada cabecera; N = mínimo, rellenando con ceros
+    "prefijo_sesion":      "imu_capturas",
+    "duracion_sesion":     3.0,    # segundos por sesión
+    "sesion_inicial":      1,
+    "sumidero":            "binario",  # "binario" (.imu + índice .idx, huecos sin filas) o "csv" (clásico)
+    "modo_recepcion":      "lotes",    # "lotes" (recvmmsg/recv_into sobre anillo) o "simple" (recvfrom)
+    "decodificador":       "numpy",    # "numpy" (np.frombuffer por bloque) o "struct"
+    "modo_escritura":      "hilos",    # "hilos" (escritores con cola) o "directo"
+    "escritores":          1,          # hilos escritores (los dispositivos se reparten por dev_id)
+    "profundidad_cola":    256,        # lotes en cola por escritor antes de descartar
+    "alinear":             False,      # además, grilla común de todos los dispositivos (imu_alineado/)
+    "publicar":            False,      # cada bloque en memoria compartida (publicacion_shm.py)
+    "nack":                False,      # pedir al ESP32 que retransmita los bloques que faltan
+    "puerto_metricas":     None,       # Prometheus en http://127.0.0.1:PUERTO/metrics (None = apagado; --metricas)
+    "periodo_reporte":     5.0,        # segundos entre líneas de estado en consola
+}
+
+OPCIONES = {
+    "sumidero":       ("binario", "csv"),
+    "modo_recepcion": ("lotes", "simple"),
+    "decodificador":  ("numpy", "struct"),
+    "modo_escritura": ("hilos", "directo"),
+}
+
+
+def muestras_en_bloque(bytes_por_bloque):
+    """Muestras completas en un payload de `bytes_por_bloque` bytes (256 -> 21)."""
+    return max(bytes_por_bloque - TAMANO_FOOTER, 0) // TAMANO_MUESTRA
+
+
+def configuracion(base=None, **cambios):
+    """
+    CONFIG_DEFECTO pisado por `base` (dict, p. ej. de un JSON) y por `cambios`.
+    Las claves de "dispositivos" pasan a int (en JSON llegan como texto). Una
+    clave u opción desconocida es ValueError.
+    """
+    config = dict(CONFIG_DEFECTO)
+    for origen in (base or {}, cambios):
+        desconocidas = set(origen) - set(CONFIG_DEFECTO)
+        if desconocidas:
+            raise ValueError(f"Opciones de configuración desconocidas: {', '.join(sorted(desconocidas))}")
+        config.update(origen)
+
+    config["dispositivos"] = {int(d): nombre for d, nombre in config["dispositivos"].items()}
+    for clave, validas in OPCIONES.items():
+        if config[clave] not in validas:
+            raise ValueError(f"{clave}={config[clave]!r} no es válido (opciones: {', '.join(validas)})")
+    if muestras_en_bloque(config["bytes_por_bloque"]) <= 0:
+        raise ValueError(f"bytes_por_bloque={config['bytes_por_bloque']} no alcanza para una muestra")
+    return config
+
+
+def cargar_configuracion(ruta, **cambios):
+    """configuracion() a partir de un archivo JSON con cualquier subconjunto de CONFIG_DEFECTO."""
+    with open(ruta, encoding="utf-8") as f:
+        return configuracion(json.load(f), **cambios)
+
+
+def decodificar_struct(payload, muestras_por_bloque=None):
+    """
+    Convierte el payload en lista de tuplas (ax,ay,az,gx,gy,gz), una muestra de
+    12 bytes a la vez. Con muestras_por_bloque se rellena con ceros hasta ese mínimo.
+    """
+    n = muestras_en_bloque(len(payload))
+    muestras = [struct.unpack_from(">6h", payload, i * TAMANO_MUESTRA) for i in range(n)]
+    if muestras_por_bloque is not None and len(muestras) < muestras_por_bloque:
+        muestras.extend([(0, 0, 0, 0, 0, 0)] * (muestras_por_bloque - len(muestras)))
+    return muestras
+
+
+class Receptor:
+    """
+    Receptor IMU2 de un proceso: socket (por lotes o simple), un
+    ManejadorDispositivo por dev_id, rotación de sesiones con sumideros
+    preabiertos y, según la configuración, hilos escritores, alineador,
+    publicación en memoria compartida y métricas.
+
+    Los observadores agregados con agregar_observador() antes de iniciar()
+    reciben cada bloque emitido, igual que al_emitir de ManejadorDispositivo.
+
+    Cada bloque se decodifica según el len de su cabecera, así que una misma
+    flota puede mezclar nodos de 256 B y de 1024 B; bytes_por_bloque solo
+    dimensiona el anillo de recepción. Los lotes se validan enteros con
+    validar_lote() (v1 y v2 a la vez); los bloques v2 corruptos se cuentan en
+    su dispositivo y no se escriben.
+
+    Con nack=True se anota de qué dirección manda cada dev_id y, cuando su
+    manejador detecta un hueco, se le devuelve un NACK con los tramos que
+    faltan (recepcion_lotes.armar_nacks); lo retransmitido entra por el socket
+    como cualquier bloque y se acomoda en la ventana de reordenamiento.
+
+    Los datagramas v3 (FEC) no necesitan configuración: su bloque se procesa
+    como los demás y su redundancia la usa el manejador para reconstruir
+    pérdidas sin ida y vuelta (fec_imu.py).
+    """
+
+    def __init__(self, config=None, **cambios):
+        self.config = configuracion(config, **cambios)
+        c = self.config
+        self.id_a_nombre         = c["dispositivos"]
+        self.muestras_por_bloque = c["muestras_por_bloque"]  # None = el de cada cabecera
+        self.indice_sesion       = c["sesion_inicial"]
+        self.tiempo_inicio_sesion = time.time()
+
+        self.manejadores = {}  # id_disp -> ManejadorDispositivo
+        self.preapertura = None
+        self.observadores = []
+        self.decodificar = self.socket = self.anillo = self.pipeline = None
+        self.alineador = self.escritor_alineado = self.publicador = self.metricas = None
+        self.al_emitir = None
+        self.corruptos_sin_dispositivo = 0  # corruptos cuyo dev_id no es de ningún dispositivo activo
+        self.origenes      = {}  # id_disp -> (ip, puerto) de donde manda (solo con nack)
+        self.nacks_enviados = 0
+        self.bytes_nack     = 0
+        self._detenido = threading.Event()
+        self._ultimo_reporte = time.time()
+        self._ultima_expiracion = time.time()
+        self._ultimo_lote = False  # la vuelta anterior recibió algo (puede seguir en la cola de escritura)
+
+    # ---- Armado ----
+
+    def agregar_observador(self, funcion):
+        """funcion(id_disp, seq, muestras, ...) por cada bloque emitido (llamar antes de iniciar())."""
+        self.observadores.append(funcion)
+
+    def _crear_decodificador(self):
+        muestras_por_bloque = self.muestras_por_bloque
+        if self.config["decodificador"] == "numpy":
+            from decodificador_imu import decodificar_bloque
+
+            def decodificar(payload):
+                # (N, 6) int16 con N según el len del payload (o rellenado hasta el mínimo configurado)
+                return decodificar_bloque(payload, muestras_por_bloque)
+        else:
+            def decodificar(payload):
+                return decodificar_struct(payload, muestras_por_bloque)
+        return decodificar
+
+    def iniciar(self):
+        """Abre el socket y arranca las piezas activadas en la configuración."""
+        c = self.config
+        self.decodificar = self._crear_decodificador()
+        self.preapertura = PreaperturaSesiones(c["sumidero"], c["prefijo_sesion"])
+        self.tiempo_inicio_sesion = time.time()
+
+        self.socket = crear_socket(c["ip"], c["puerto"], rcvbuf=1_000_000)  # buffer grande
+        self.socket.settimeout(TIMEOUT_RECEPCION)
+        print(f"Escuchando en {c['ip']}:{c['puerto']} ... (Hotspot)")
+
+        # En modo "lotes" se drenan varios datagramas por syscall a un anillo preasignado
+        if c["modo_recepcion"] == "lotes":
+            tamano_ranura = max(TAMANO_RANURA, TAMANO_CABECERA + c["bytes_por_bloque"])
+            self.anillo = AnilloRecepcion(self.socket, tamano_ranura=tamano_ranura, con_origen=c["nack"])
+            print(f"Recepción por lotes ({self.anillo.modo}, {self.anillo.num_ranuras} ranuras)")
+
+        # Alineación en línea de todos los dispositivos a una grilla común
+        if c["alinear"]:
+            from alineador import AlineadorMultidispositivo, EscritorAlineado
+            ids = sorted(self.id_a_nombre)
+            self.escritor_alineado = EscritorAlineado([self.id_a_nombre[d] for d in ids])
+            self.alineador = AlineadorMultidispositivo(ids, al_cuadro=self.escritor_alineado)
+            print(f"[+] Cuadros alineados en {self.escritor_alineado.ruta}")
+
+        # Publicación en vivo para consumidores locales: anillo en memoria compartida por dispositivo
+        if c["publicar"]:
+            from publicacion_shm import PublicadorIMU
+            # Ranuras del bloque más grande esperado: un nodo puede cambiar de largo en medio de la sesión
+            self.publicador = PublicadorIMU(
+                max(self.muestras_por_bloque or 0, muestras_en_bloque(c["bytes_por_bloque"]))
+            )
+
+        self.al_emitir = combinar_observadores(
+            self.publicador.publicar_bloque if self.publicador is not None else None,
+            self.alineador.agregar_bloque if self.alineador is not None else None,
+            *self.observadores,
+        )
+
+        # En modo "hilos" este hilo solo drena el socket; decodificar y escribir va en los escritores
+        if c["modo_escritura"] == "hilos":
+            self.pipeline = PipelineEscritura(
+                self.procesar_lote, c["escritores"], c["profundidad_cola"], por_lote=True,
+                al_pulso=self.expirar_de_trabajador,
+            )
+            self.pipeline.iniciar()
+            print(f"Escritura en {c['escritores']} hilo(s), cola de {c['profundidad_cola']} lotes")
+
+        # Métricas en vivo: contadores por dispositivo, latencias muestreadas, colas y drops del kernel
+        if c["puerto_metricas"] is not None:
+            from metricas import Metricas, recolector_kernel, recolector_manejadores, recolector_pipeline
+            self.metricas = Metricas()
+            self.metricas.agregar_recolector(recolector_manejadores(lambda: self.manejadores))
+            self.metricas.agregar_recolector(recolector_kernel(c["puerto"]))
+            if self.pipeline is not None:
+                self.metricas.agregar_recolector(recolector_pipeline(self.pipeline))
+            try:
+                self.metricas.servir(c["puerto_metricas"])
+            except OSError as e:
+                print(f"[!] No se pudo abrir el puerto de métricas {c['puerto_metricas']}: {e}")
+
+    # ---- Sesiones y dispositivos ----
+
+    def raiz_sesion_actual(self):
+        """Nombre de carpeta raíz de la sesión actual, como por ejemplo imu_capturas1."""
+        return f"{self.config['prefijo_sesion']}{self.indice_sesion}"
+
+    def abrir_manejador(self, id_disp):
+        """Crea el manejador del dispositivo con el sumidero de la sesión actual y prepara el de la siguiente."""
+        nombre = self.id_a_nombre.get(id_disp, f"id{id_disp}")  # ej: 'brazo_izquierdo'
+        manejador = ManejadorDispositivo(
+            id_disp, nombre, self.indice_sesion, self.decodificar,
+            prefijo_sesion=self.config["prefijo_sesion"],
+            tipo_sumidero=self.config["sumidero"],
+            muestras_por_bloque=self.muestras_por_bloque or muestras_en_bloque(self.config["bytes_por_bloque"]),
+            al_emitir=self.al_emitir,
+            sumidero=self.preapertura.tomar(self.indice_sesion, id_disp),
+            metricas=self.metricas,
+            solicitar=self.solicitar_retransmision if self.config["nack"] else None,
+        )
+        self.manejadores[id_disp] = manejador
+        self.preapertura.preparar(self.indice_sesion + 1, {id_disp: nombre})
+        return manejador
+
+    def rotar_sesion(self):
+        """
+        Avanza a la siguiente sesión. Cada dispositivo pasa a los archivos de la
+        sesión nueva antes de escribir su próximo bloque (ver procesar_datagrama),
+        con los sumideros ya abiertos en segundo plano, y sigue con su misma
+        secuencia. Acá solo se encarga la apertura de la sesión que viene después.
+        """
+        if self.manejadores:
+            print(f"--- Cerrando sesión {self.indice_sesion} ---")
+
+        self.indice_sesion += 1
+        self.tiempo_inicio_sesion = time.time()
+        self.preapertura.preparar(
+            self.indice_sesion + 1, {d: m.nombre for d, m in list(self.manejadores.items())}
+        )
+        self.preapertura.descartar_anteriores(self.indice_sesion)
+        print(f"--- Nueva sesión {self.indice_sesion} (carpeta raíz: {self.raiz_sesion_actual()}) ---")
+
+    def verificar_cambio_sesion(self):
+        """Si pasaron duracion_sesion segundos, pasa a la sesión siguiente."""
+        if time.time() - self.tiempo_inicio_sesion >= self.config["duracion_sesion"]:
+            self.rotar_sesion()
+
+    def procesar_lote(self, datagramas, t_recepcion=0.0):
+        """
+        Valida el lote entero (cabecera, largo y, en v2, CRC32), rellena huecos y
+        escribe cada bloque. Los datagramas pueden ser bytes o memoryview.
+        """
+        bloques, corruptos, fec = validar_lote(datagramas)
+
+        for id_disp, seq, ms in corruptos:
+            manejador = self.manejadores.get(id_disp)
+            if manejador is not None:
+                manejador.registrar_corrupto(seq, ms)
+            else:
+                self.corruptos_sin_dispositivo += 1
+
+        for id_disp, seq, ms, payload, fallas, retransmitido in bloques:
+            manejador = self.manejadores.get(id_disp)
+
+            # Si cambió la sesión, cambiar de archivos en este borde de bloque sin perder la secuencia
+            if manejador is not None and manejador.indice_sesion != self.indice_sesion:
+                manejador.cambiar_sesion(
+                    self.indice_sesion, self.preapertura.tomar(self.indice_sesion, id_disp),
+                    self.preapertura.cerrar_en_fondo,
+                )
+
+            # Asegurar sumidero abierto para la sesión actual
+            if manejador is None:
+                manejador = self.abrir_manejador(id_disp)
+
+            manejador.procesar(seq, payload, t_recepcion, ms, fallas, retransmitido)
+
+        # Redundancia FEC después de los bloques del lote: solo reconstruye lo que sigue faltando
+        for id_disp, seq, ms, payload, seccion in fec:
+            manejador = self.manejadores.get(id_disp)
+            if manejador is not None:
+                manejador.procesar_fec(seq, ms, payload, seccion, t_recepcion)
+
+    def anotar_origenes(self, lote, origenes):
+        """Recuerda la dirección de cada dev_id que manda bloques IMU2 (a donde van sus NACKs)."""
+        for datos, origen in zip(lote, origenes):
+            if len(datos) >= TAMANO_CABECERA and datos[:4] == MARCA_MAGICA:
+                self.origenes[datos[5]] = origen
+
+    def solicitar_retransmision(self, id_disp, seqs):
+        """Manda a id_disp los NACK que piden `seqs` (corre en el hilo de su manejador)."""
+        origen = self.origenes.get(id_disp)
+        if origen is None:
+            return
+        for datos in armar_nacks(id_disp, seqs):
+            try:
+                self.socket.sendto(datos, origen)
+            except OSError:
+                continue
+            self.nacks_enviados += 1
+            self.bytes_nack     += len(datos)
+
+    def expirar_de_trabajador(self, trabajador, ahora):
+        """expirar() de los manejadores que atiende el hilo escritor `trabajador` (corre en ese hilo)."""
+        n = self.config["escritores"]
+        expirar_manejadores(
+            {d: m for d, m in list(self.manejadores.items()) if d % n == trabajador}, ahora
+        )
+
+    def procesar_datagrama(self, datos, t_recepcion=0.0):
+        """procesar_lote() de un solo datagrama."""
+        self.procesar_lote((datos,), t_recepcion)
+
+    def reportar_estado(self):
+        """Imprime el resumen de contadores por dispositivo de la sesión actual."""
+        extra = ""
+        if self.pipeline is not None:
+            e = self.pipeline.estado()
+            extra = f" || cola={e['cola']} (máx {e['cola_max']}) descartados_receptor={e['descartados']}"
+        if self.alineador is not None:
+            extra += f" || alineados={self.alineador.cuadros_emitidos}"
+        if self.publicador is not None and self.publicador.truncados():
+            extra += f" || publicados truncados={self.publicador.truncados()}"
+        if self.corruptos_sin_dispositivo:
+            extra += f" || corruptos sin dispositivo={self.corruptos_sin_dispositivo}"
+        if self.config["nack"]:
+            extra += f" || nacks={self.nacks_enviados} ({self.bytes_nack} B)"
+        # Los dispositivos que aún no mandan bloques en la sesión nueva no se reportan
+        actuales = {d: m for d, m in list(self.manejadores.items()) if m.indice_sesion == self.indice_sesion}
+        reportar_estado_manejadores(actuales, self.indice_sesion, extra)
+
+    # ---- Bucle ----
+
+    def recibir(self, timeout=TIMEOUT_RECEPCION):
+        """Lote de datagramas disponibles (lista vacía si no llegó nada en `timeout`)."""
+        if self.anillo is not None:
+            lote = self.anillo.drenar(timeout)
+            if self.config["nack"]:
+                self.anotar_origenes(lote, self.anillo.origenes)
+            return lote
+        self.socket.settimeout(timeout)
+        try:
+            datos, origen = self.socket.recvfrom(max(4096, TAMANO_CABECERA + self.config["bytes_por_bloque"]))
+        except socket.timeout:
+            return []
+        if self.config["nack"]:
+            self.anotar_origenes((datos,), (origen,))
+        return [datos]
+
+    def paso(self):
+        """Una vuelta del bucle: rotación, recepción, reporte y expiración periódicos y despacho del lote."""
+        # Cada iteración revisamos si hay que cambiar de sesión
+        self.verificar_cambio_sesion()
+        # Con bloques retenidos no se puede esperar TIMEOUT_RECEPCION: la ventana vence antes
+        esperando = self._ultimo_lote or any(m.esperando() for m in list(self.manejadores.values()))
+        lote = self.recibir(PERIODO_EXPIRACION if esperando else TIMEOUT_RECEPCION)
+        self._ultimo_lote = bool(lote)
+
+        # Reporte periódico, con o sin tráfico
+        t_recepcion = time.time()
+        if t_recepcion - self._ultimo_reporte >= self.config["periodo_reporte"]:
+            self.reportar_estado()
+            self._ultimo_reporte = t_recepcion
+
+        # Ventanas y NACKs de todos los dispositivos, también de los que dejaron de mandar
+        if t_recepcion - self._ultima_expiracion >= PERIODO_EXPIRACION:
+            self._ultima_expiracion = t_recepcion
+            if self.pipeline is not None:
+                self.pipeline.pulso(t_recepcion)
+            else:
+                expirar_manejadores(self.manejadores, t_recepcion)
+
+        if not lote:
+            return
+        if self.pipeline is not None:
+            self.pipeline.encolar(lote, t_recepcion)
+        else:
+            self.procesar_lote(lote, t_recepcion)
+
+    def correr(self):
+        """Recibe hasta detener() o Ctrl-C y cierra todo."""
+        if self.socket is None:
+            self.iniciar()
+        try:
+            while not self._detenido.is_set():
+                self.paso()
+        except KeyboardInterrupt:
+            print("\nInterrumpido por usuario.")
+        finally:
+            self.cerrar()
+
+    def detener(self):
+        """Pide terminar el bucle de correr() (se nota en a lo sumo TIMEOUT_RECEPCION)."""
+        self._detenido.set()
+
+    def cerrar(self):
+        if self.pipeline is not None:
+            self.pipeline.detener()
+            self.reportar_estado()
+            self.pipeline = None
+        for manejador in list(self.manejadores.values()):
+            manejador.cerrar()
+        if self.preapertura is not None:
+            self.preapertura.detener()
+        if self.metricas is not None:
+            self.metricas.detener()
+        if self.escritor_alineado is not None:
+            self.escritor_alineado.cerrar()
+        if self.publicador is not None:
+            self.publicador.cerrar()
+        if self.socket is not None:
+            self.socket.close()
+        print("Cerrado.")
+
+
+def _dispositivo(texto):
+    """'1=pecho' -> (1, 'pecho')."""
+    id_disp, sep, nombre = texto.partition("=")
+    if not sep or not nombre:
+        raise argparse.ArgumentTypeError(f"se esperaba ID=NOMBRE, no {texto!r}")
+    return int(id_disp), nombre
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Receptor IMU2 por UDP")
+    parser.add_argument("--config", help="archivo JSON con cualquier subconjunto de las opciones")
+    parser.add_argument("--ip")
+    parser.add_argument("--puerto", type=int)
+    parser.add_argument("--dispositivo", type=_dispositivo, action="append",
+                        help="ID=NOMBRE (repetible; reemplaza el mapa de dispositivos)")
+    parser.add_argument("--bytes-por-bloque", type=int)
+    parser.add_argument("--muestras-por-bloque", type=int)
+    parser.add_argument("--prefijo-sesion")
+    parser.add_argument("--duracion-sesion", type=float)
+    parser.add_argument("--sesion-inicial", type=int)
+    parser.add_argument("--sumidero", choices=OPCIONES["sumidero"])
+    parser.add_argument("--modo-recepcion", choices=OPCIONES["modo_recepcion"])
+    parser.add_argument("--decodificador", choices=OPCIONES["decodificador"])
+    parser.add_argument("--modo-escritura", choices=OPCIONES["modo_escritura"])
+    parser.add_argument("--escritores", type=int)
+    parser.add_argument("--alinear", action="store_true", default=None)
+    parser.add_argument("--publicar", action="store_true", default=None)
+    parser.add_argument("--nack", action="store_true", default=None,
+                        help="pedir retransmisión de los bloques perdidos al ESP32")
+    parser.add_argument("--metricas", action="store_true",
+                        help="servir métricas Prometheus (en el puerto 9108 si no se da --puerto-metricas)")
+    parser.add_argument("--puerto-metricas", type=int, help="servir métricas en este puerto (implica --metricas)")
+    parser.add_argument("--mostrar-config", action="store_true", help="imprimir la configuración final y salir")
+    args = parser.parse_args(argv)
+
+    cambios = {
+        clave: valor for clave, valor in vars(args).items()
+        if clave in CONFIG_DEFECTO and valor is not None
+    }
+    if args.dispositivo:
+        cambios["dispositivos"] = dict(args.dispositivo)
+    if args.metricas and "puerto_metricas" not in cambios:
+        from metricas import PUERTO_METRICAS
+        cambios["puerto_metricas"] = PUERTO_METRICAS
+    try:
+        config = cargar_configuracion(args.config, **cambios) if args.config else configuracion(**cambios)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    if args.mostrar_config:
+        print(json.dumps(config, indent=4, ensure_ascii=False))
+        return
+
+    Receptor(config).correr()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Receptor IMU2 repartido en N procesos, para flotas de ESP32 que no caben en
+un solo proceso por el GIL. Cada trabajador es dueño de los dev_id con
+id_disp % N == índice y escribe sus propias sesiones con el mismo esquema de
+carpetas que los receptores de un proceso (imu_capturasN/<disp>N/<disp>N.csv).
+
+Modos:
+  - "reuseport":   todos los trabajadores hacen bind al puerto 50000 con
+                   SO_REUSEPORT (Linux) y el kernel reparte por origen. Si a un
+                   trabajador le llega un dev_id ajeno lo reenvía al dueño por
+                   su puerto interno de loopback.
+  - "despachador": el proceso padre recibe en 50000 y reenvía cada datagrama
+                   al puerto interno del dueño según el byte dev_id.
+
+El padre junta los contadores de cada trabajador y muestra un reporte único.
+
+La configuración es la de receptor_imu.py (CONFIG_DEFECTO, el mismo JSON de
+--config); de ella se usan ip, puerto, dispositivos, bytes/muestras por
+bloque, sesiones, sumidero y periodo_reporte. Los datagramas se validan
+igual (CRC32 y mapa de fallas en v2) y las secciones FEC de v3 reconstruyen
+los bloques perdidos; la redundancia viaja con el mismo dev_id, así que la
+procesa el mismo trabajador dueño del dispositivo.
+
+Uso: python receptor_multiproceso.py [trabajadores] [reuseport|despachador] [--config receptor_1khz.json]
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import select
+import socket
+import time
+
+from manejador_dispositivo import ManejadorDispositivo, expirar_manejadores, PERIODO_EXPIRACION
+from recepcion_lotes import TAMANO_CABECERA, AnilloRecepcion, crear_socket, validar_lote
+from receptor_imu import cargar_configuracion, configuracion, muestras_en_bloque
+from rotacion_sesion import PreaperturaSesiones
+
+PUERTO_INTERNO = 50100  # trabajador i escucha en 127.0.0.1:(PUERTO_INTERNO + i)
+
+NUM_TRABAJADORES  = 2
+PERIODO_CONTADORES = 1.0  # cada cuánto un trabajador publica sus contadores
+
+
+def trabajador_de(id_disp, num_trabajadores):
+    return id_disp % num_trabajadores
+
+
+def indice_sesion_en(t, config):
+    """Sesión que corresponde al instante t; todos los procesos usan el mismo t0."""
+    return config["indice_inicial"] + int((t - config["t0"]) // config["duracion_sesion"])
+
+
+def crear_socket_compartido(ip, puerto):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1_000_000)
+    s.bind((ip, puerto))
+    return s
+
+
+def trabajador(indice, config, cola_contadores, parar):
+    """Proceso trabajador: recibe, procesa sus dev_id y reenvía los ajenos."""
+    from decodificador_imu import decodificar_bloque
+
+    num = config["num_trabajadores"]
+    muestras_por_bloque = config["muestras_por_bloque"]
+
+    def decodificar(payload):
+        return decodificar_bloque(payload, muestras_por_bloque)
+
+    interno = crear_socket("127.0.0.1", config["puerto_interno"] + indice, rcvbuf=4_000_000)
+    anillos = {interno: AnilloRecepcion(interno)}
+    if config["modo"] == "reuseport":
+        compartido = crear_socket_compartido(config["ip"], config["puerto"])
+        anillos[compartido] = AnilloRecepcion(compartido)
+    destinos = [("127.0.0.1", config["puerto_interno"] + i) for i in range(num)]
+
+    manejadores      = {}
+    preapertura      = PreaperturaSesiones(config["sumidero"], config["prefijo_sesion"])
+    indice_sesion    = indice_sesion_en(time.time(), config)
+    reenviados       = 0
+    ultimo_contador  = 0.0
+    ultima_expiracion = 0.0
+
+    def manejador_de(id_disp):
+        """El manejador del dispositivo en la sesión actual (lo crea o le cambia los archivos)."""
+        manejador = manejadores.get(id_disp)
+        if manejador is not None and manejador.indice_sesion != indice_sesion:
+            manejador.cambiar_sesion(
+                indice_sesion, preapertura.tomar(indice_sesion, id_disp),
+                preapertura.cerrar_en_fondo,
+            )
+        if manejador is None:
+            nombre = config["id_a_nombre"].get(id_disp, f"id{id_disp}")
+            manejador = ManejadorDispositivo(
+                id_disp, nombre, indice_sesion, decodificar,
+                prefijo_sesion=config["prefijo_sesion"],
+                tipo_sumidero=config["sumidero"],
+                muestras_por_bloque=muestras_por_bloque or muestras_en_bloque(config["bytes_por_bloque"]),
+                sumidero=preapertura.tomar(indice_sesion, id_disp),
+            )
+            manejadores[id_disp] = manejador
+            preapertura.preparar(indice_sesion + 1, {id_disp: nombre})
+        return manejador
+
+    try:
+        while not parar.is_set():
+            # Con bloques retenidos se despierta a tiempo para vencer su ventana aunque no llegue nada
+            esperando = any(m.esperando() for m in manejadores.values())
+            listos, _, _ = select.select(list(anillos), [], [], PERIODO_EXPIRACION if esperando else 0.5)
+            ahora = time.time()
+
+            # Rotación alineada entre procesos: misma sesión para el mismo instante.
+            # Cada manejador cambia de archivos con su próximo bloque, sin perder la secuencia.
+            sesion = indice_sesion_en(ahora, config)
+            if sesion != indice_sesion:
+                indice_sesion = sesion
+                preapertura.preparar(indice_sesion + 1, {d: m.nombre for d, m in manejadores.items()})
+                preapertura.descartar_anteriores(indice_sesion)
+
+            for sock in listos:
+                # Los ajenos se reenvían por el byte dev_id; los propios se validan juntos (CRC en v2)
+                propios = []
+                for vista in anillos[sock].drenar(0):
+                    if len(vista) < TAMANO_CABECERA:
+                        continue
+                    dueno = trabajador_de(vista[5], num)
+                    if dueno != indice:
+                        interno.sendto(vista, destinos[dueno])
+                        reenviados += 1
+                    else:
+                        propios.append(vista)
+                bloques, corruptos, fec = validar_lote(propios)
+                for id_disp, seq, ms in corruptos:
+                    if id_disp in manejadores:
+                        manejadores[id_disp].registrar_corrupto(seq, ms)
+                for id_disp, seq, ms, payload, fallas, retransmitido in bloques:
+                    manejador_de(id_disp).procesar(seq, payload, ahora, ms, fallas, retransmitido)
+                for id_disp, seq, ms, payload, seccion in fec:
+                    if id_disp in manejadores:
+                        manejadores[id_disp].procesar_fec(seq, ms, payload, seccion, ahora)
+
+            if ahora - ultima_expiracion >= PERIODO_EXPIRACION:
+                expirar_manejadores(manejadores, ahora)
+                ultima_expiracion = ahora
+
+            if ahora - ultimo_contador >= PERIODO_CONTADORES:
+                publicar_contadores(cola_contadores, indice, indice_sesion, manejadores, reenviados)
+                ultimo_contador = ahora
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publicar_contadores(cola_contadores, indice, indice_sesion, manejadores, reenviados)
+        for m in manejadores.values():
+            m.cerrar()
+        preapertura.detener()
+        for sock in anillos:
+            sock.close()
+
+
+def publicar_contadores(cola, indice, indice_sesion, manejadores, reenviados):
+    contadores = {
+        d: (m.nombre, m.paquetes, m.perdidas, m.corruptos, m.reordenados, m.tardios, m.filas_escritas)
+        for d, m in manejadores.items() if m.indice_sesion == indice_sesion
+    }
+    try:
+        cola.put_nowait((indice, indice_sesion, contadores, reenviados))
+    except queue.Full:
+        pass
+
+
+def reporte_combinado(ultimos):
+    """Una línea con los contadores de todos los trabajadores (última publicación de cada uno)."""
+    if not ultimos:
+        return
+    sesion = max(s for s, _, _ in ultimos.values())
+    partes = []
+    for indice in sorted(ultimos):
+        s, contadores, _ = ultimos[indice]
+        if s != sesion:
+            continue
+        for d, (nombre, paqs, perd, corr, reord, tard, filas) in sorted(contadores.items()):
+            partes.append(
+                f"id{d}:{nombre}@w{indice} paqs={paqs} perd={perd} corr={corr} "
+                f"reord={reord} tard={tard} filas={filas}"
+            )
+    reenviados = sum(r for _, _, r in ultimos.values())
+    if partes:
+        print(f"[{time.strftime('%H:%M:%S')}] (sesión {sesion}) "
+              + " | ".join(partes) + f" || reenviados={reenviados}")
+
+
+def correr(num_trabajadores=NUM_TRABAJADORES, modo="reuseport", config=None,
+           puerto_interno=PUERTO_INTERNO, **cambios):
+    """
+    Lanza los trabajadores con la configuración de receptor_imu.py (`config`,
+    pisada por `cambios`) y reporta hasta Ctrl-C.
+    """
+    c = configuracion(config, **cambios)
+    if modo == "reuseport" and not hasattr(socket, "SO_REUSEPORT"):
+        print("[!] SO_REUSEPORT no disponible en esta plataforma; se usa el despachador.")
+        modo = "despachador"
+    ip, puerto = c["ip"], c["puerto"]
+
+    config = {
+        "num_trabajadores":    num_trabajadores,
+        "modo":                modo,
+        "ip":                  ip,
+        "puerto":              puerto,
+        "puerto_interno":      puerto_interno,
+        "id_a_nombre":         c["dispositivos"],
+        "duracion_sesion":     c["duracion_sesion"],
+        "indice_inicial":      c["sesion_inicial"],
+        "t0":                  time.time(),
+        "sumidero":            c["sumidero"],
+        "prefijo_sesion":      c["prefijo_sesion"],
+        "muestras_por_bloque": c["muestras_por_bloque"],
+        "bytes_por_bloque":    c["bytes_por_bloque"],
+    }
+
+    cola_contadores = mp.Queue(maxsize=1024)
+    parar = mp.Event()
+    procesos = [
+        mp.Process(target=trabajador, args=(i, config, cola_contadores, parar), name=f"imu-w{i}")
+        for i in range(num_trabajadores)
+    ]
+    for p in procesos:
+        p.start()
+
+    despachador = None
+    if modo == "despachador":
+        despachador = AnilloRecepcion(crear_socket(ip, puerto))
+        salida = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        destinos = [("127.0.0.1", puerto_interno + i) for i in range(num_trabajadores)]
+    print(f"Escuchando en {ip}:{puerto} con {num_trabajadores} procesos ({modo})")
+
+    ultimos = {}  # trabajador -> (sesión, contadores, reenviados)
+    ultimo_reporte = time.time()
+    try:
+        while True:
+            if despachador is not None:
+                for vista in despachador.drenar(0.2):
+                    if len(vista) > 5:
+                        salida.sendto(vista, destinos[trabajador_de(vista[5], num_trabajadores)])
+            else:
+                time.sleep(0.2)
+
+            while True:
+                try:
+                    indice, sesion, contadores, reenviados = cola_contadores.get_nowait()
+                except queue.Empty:
+                    break
+                ultimos[indice] = (sesion, contadores, reenviados)
+
+            if time.time() - ultimo_reporte >= c["periodo_reporte"]:
+                reporte_combinado(ultimos)
+                ultimo_reporte = time.time()
+    except KeyboardInterrupt:
+        print("\nInterrumpido por usuario.")
+    finally:
+        parar.set()
+        for p in procesos:
+            p.join(timeout=5)
+        while True:
+            try:
+                indice, sesion, contadores, reenviados = cola_contadores.get_nowait()
+            except queue.Empty:
+                break
+            ultimos[indice] = (sesion, contadores, reenviados)
+        reporte_combinado(ultimos)
+        if despachador is not None:
+            despachador.sock.close()
+            salida.close()
+        print("Cerrado.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Receptor IMU2 repartido en varios procesos")
+    parser.add_argument("trabajadores", nargs="?", type=int, default=NUM_TRABAJADORES)
+    parser.add_argument("modo", nargs="?", choices=("reuseport", "despachador"), default="reuseport")
+    parser.add_argument("--config", help="archivo JSON con la configuración de receptor_imu.py")
+    args = parser.parse_args(argv)
+    try:
+        config = cargar_configuracion(args.config) if args.config else configuracion()
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    correr(args.trabajadores, args.modo, config)
+
+
+if __name__ == "__main__":
+    main()
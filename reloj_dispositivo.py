@@ -0,0 +1,112 @@
+from collections import deque
+
+VENTANA_RELOJ    = 512    # bloques en la ventana deslizante de la regresión
+SEGUNDOS_POR_MS  = 1e-3   # pendiente nominal (reloj del ESP32 sin deriva)
+
+
+class RelojDispositivo:
+    """
+    Modelo en línea t_host = a + b * ms entre el millis() del ESP32 (campo `ms`
+    de la cabecera IMU2) y la hora de recepción en el PC, ajustado por mínimos
+    cuadrados sobre los últimos `ventana` bloques. Las sumas se actualizan al
+    entrar y salir cada punto, así que agregar() es O(1); cada `ventana` puntos
+    se recalculan desde cero para no acumular error de redondeo.
+
+    La pendiente b mide la deriva del reloj del dispositivo frente al del PC y
+    la ordenada absorbe el retardo medio de la red, que es común a todos los
+    nodos conectados al mismo hotspot.
+    """
+
+    def __init__(self, ventana=VENTANA_RELOJ):
+        self.ventana = ventana
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Descarta el modelo (p. ej. tras un reinicio del ESP32, cuando millis() vuelve a 0)."""
+        self.puntos = deque()  # (seq, ms, t_host)
+        self.ms0 = None        # origen de x y de y para conservar precisión
+        self.t0  = None
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        self._desde_recalculo = 0
+
+    def agregar(self, seq, ms, t_host):
+        if self.ms0 is None:
+            self.ms0, self.t0 = ms, t_host
+        x, y = float(ms - self.ms0), t_host - self.t0
+        self.puntos.append((seq, ms, t_host))
+        self._sx  += x
+        self._sy  += y
+        self._sxx += x * x
+        self._sxy += x * y
+
+        if len(self.puntos) > self.ventana:
+            _, ms_viejo, t_viejo = self.puntos.popleft()
+            xv, yv = float(ms_viejo - self.ms0), t_viejo - self.t0
+            self._sx  -= xv
+            self._sy  -= yv
+            self._sxx -= xv * xv
+            self._sxy -= xv * yv
+
+        self._desde_recalculo += 1
+        if self._desde_recalculo >= self.ventana:
+            self._recalcular()
+
+    def _recalcular(self):
+        """Rehace las sumas con el origen en el punto más viejo de la ventana."""
+        _, self.ms0, self.t0 = self.puntos[0]
+        self._sx = self._sy = self._sxx = self._sxy = 0.0
+        for _, ms, t_host in self.puntos:
+            x, y = float(ms - self.ms0), t_host - self.t0
+            self._sx  += x
+            self._sy  += y
+            self._sxx += x * x
+            self._sxy += x * y
+        self._desde_recalculo = 0
+
+    def coeficientes(self):
+        """(a, b) del modelo relativo a (ms0, t0); con menos de 2 puntos b es la nominal."""
+        n = len(self.puntos)
+        if n < 2:
+            return (self._sy / n if n else 0.0), SEGUNDOS_POR_MS
+        varianza = n * self._sxx - self._sx * self._sx
+        if varianza <= 0:
+            return self._sy / n - SEGUNDOS_POR_MS * self._sx / n, SEGUNDOS_POR_MS
+        b = (n * self._sxy - self._sx * self._sy) / varianza
+        a = (self._sy - b * self._sx) / n
+        return a, b
+
+    def host_de(self, ms):
+        """Hora del PC (segundos epoch) que corresponde a un millis() del dispositivo."""
+        if self.ms0 is None:
+            return 0.0
+        a, b = self.coeficientes()
+        return self.t0 + a + b * (ms - self.ms0)
+
+    def periodo_bloque_ms(self):
+        """Milisegundos de dispositivo por bloque, según los extremos de la ventana."""
+        if len(self.puntos) < 2:
+            return None
+        seq_a, ms_a, _ = self.puntos[0]
+        seq_b, ms_b, _ = self.puntos[-1]
+        if seq_b <= seq_a:
+            return None
+        return (ms_b - ms_a) / (seq_b - seq_a)
+
+    def marcas_bloque(self, ms, n_muestras):
+        """
+        (t_muestra0, dt) en hora del PC para las n_muestras de un bloque enviado en
+        `ms`: la última muestra se toma en el instante de envío y las anteriores
+        se reparten hacia atrás con el período de bloque estimado.
+        """
+        t_ultima = self.host_de(ms)
+        periodo = self.periodo_bloque_ms()
+        if periodo is None or n_muestras == 0:
+            return t_ultima, 0.0
+        _, b = self.coeficientes()
+        dt = b * periodo / n_muestras
+        return t_ultima - (n_muestras - 1) * dt, dt
+
+    def deriva_ppm(self):
+        """Deriva del reloj del dispositivo respecto del PC, en partes por millón."""
+        _, b = self.coeficientes()
+        return (b / SEGUNDOS_POR_MS - 1.0) * 1e6
@@ -1,101 +1,90 @@
 import os
-import re
-import csv
+
+import numpy as np
+
+from catalogo_sesiones import sesiones_disponibles
+from sesion_imu import DispositivoSesion, cargar_csv
+from sumideros import leer_huecos, leer_resumen
 
 
 BASE_DIR = r"C:\Users\sotog\Desktop\TESIS"
 
 PREFIJO_SESION = "imu_capturas"
-MUESTRAS_POR_BLOQUE = 21  
+MUESTRAS_POR_BLOQUE = 21  # bloques de 256 B; solo si el archivo no dice otra cosa
 
 DISPOSITIVOS = ["muslo_derecho", "pecho", "muslo_izquierdo", "cintura"]
 
-PATRON_SESION = re.compile(rf"^{PREFIJO_SESION}(\d+)$")
-
-
 
 def encontrar_sesiones(base_dir):
-    sesiones = []
-    for nombre in os.listdir(base_dir):
-        m = PATRON_SESION.match(nombre)
-        if m:
-            n = int(m.group(1))
-            sesiones.append((n, nombre))
-    sesiones.sort(key=lambda x: x[0])
-    return sesiones
-
-
-def detectar_bloques_ceros_en_csv(ruta_csv):
-
-    bloques_ceros = []
+    """[(número de sesión, índice de carpeta, nombre de carpeta)], vía el catálogo si existe."""
+    return [
+        (n, fisico, f"{PREFIJO_SESION}{fisico}")
+        for n, fisico in sesiones_disponibles(base_dir, PREFIJO_SESION)
+    ]
+
+
+def filas_por_bloque(ruta_sin_extension):
+    """
+    Filas por bloque del dispositivo según lo que dejó el receptor: el
+    _resumen.json (sus filas incluyen las de los huecos, así que dividen justo
+    entre bloques escritos y perdidos) o, si no hay, MUESTRAS_POR_BLOQUE.
+    """
+    resumen = leer_resumen(ruta_sin_extension)
+    if resumen is not None:
+        bloques = resumen["bloques"] + resumen["bloques_perdidos"]
+        if bloques and resumen["filas"] % bloques == 0:
+            return resumen["filas"] // bloques
+    return MUESTRAS_POR_BLOQUE
+
+
+def bloques_ceros(seq, valores, muestras_por_bloque=MUESTRAS_POR_BLOQUE):
+    """
+    (block_seq, filas) de cada bloque completo y todo en cero. `seq` son los
+    block_seq fila a fila y `valores` los 6 ejes. Un bloque es completo si tiene
+    exactamente `muestras_por_bloque` filas (21 para nodos de 256 B, 85 para
+    los de 1024 B), como en el detector original.
+    """
+    seq = np.asarray(seq)
+    if not len(seq):
+        return []
+    # Un bloque es cada corrida de filas consecutivas con el mismo block_seq
+    inicios = np.r_[0, np.flatnonzero(np.diff(seq)) + 1]
+    largos = np.diff(np.r_[inicios, len(seq)])
+    filas_con_datos = np.add.reduceat(np.asarray(valores).any(axis=1), inicios, dtype=np.int64)
+    en_cero = (largos == muestras_por_bloque) & (filas_con_datos == 0)
+    return list(zip(seq[inicios[en_cero]].tolist(), largos[en_cero].tolist()))
+
+
+def detectar_bloques_ceros_en_csv(ruta_csv, muestras_por_bloque=MUESTRAS_POR_BLOQUE):
 
     if not os.path.isfile(ruta_csv):
-        return bloques_ceros
-
-    with open(ruta_csv, newline="") as f:
-        reader = csv.reader(f)
-        first_row = True
-
-        current_seq = None
-        any_non_zero = False
-        filas_en_bloque = 0
-
-        def cerrar_bloque():
-            nonlocal current_seq, any_non_zero, filas_en_bloque, bloques_ceros
-            if current_seq is None:
-                return
-            if (not any_non_zero) and (filas_en_bloque == MUESTRAS_POR_BLOQUE):
-                bloques_ceros.append((current_seq, filas_en_bloque))
-
-        for row in reader:
-            if not row:
-                continue
-
-            if first_row:
-                first_row = False
-                try:
-                    int(row[0])
-                except ValueError:
-                    continue
-
-            try:
-                seq = int(row[0])
-            except ValueError:
-                continue
-
-            valores = row[1:7]
-            all_zero_this_row = True
-            for v in valores:
-                try:
-                    if int(v) != 0:
-                        all_zero_this_row = False
-                        break
-                except ValueError:
-                    try:
-                        if float(v) != 0.0:
-                            all_zero_this_row = False
-                            break
-                    except ValueError:
-                        all_zero_this_row = False
-                        break
-
-            if current_seq is None:
-                current_seq = seq
-                filas_en_bloque = 1
-                any_non_zero = not all_zero_this_row
-            elif seq == current_seq:
-                filas_en_bloque += 1
-                if not all_zero_this_row:
-                    any_non_zero = True
-            else:
-                cerrar_bloque()
-                current_seq = seq
-                filas_en_bloque = 1
-                any_non_zero = not all_zero_this_row
-
-        cerrar_bloque()
-
-    return bloques_ceros
+        return []
+
+    tabla = cargar_csv(ruta_csv)
+    return bloques_ceros(tabla["seq"], tabla["valores"], muestras_por_bloque)
+
+
+def detectar_bloques_ceros(ruta_sin_extension):
+    """
+    Bloques perdidos de un dispositivo como lista de (block_seq, filas). Si el
+    receptor dejó índice de huecos (.idx o _huecos.csv) se lee solo eso; si no,
+    se escanea el CSV completo buscando bloques en cero.
+    """
+    filas_defecto = filas_por_bloque(ruta_sin_extension)
+    huecos = leer_huecos(ruta_sin_extension)
+    if huecos is not None:
+        return [
+            (seq, filas or filas_defecto)
+            for seq_inicio, n_bloques, _, filas in huecos
+            for seq in range(seq_inicio, seq_inicio + n_bloques)
+        ]
+    if os.path.isfile(ruta_sin_extension + ".csv"):
+        return detectar_bloques_ceros_en_csv(ruta_sin_extension + ".csv", filas_defecto)
+    # Sesión archivada (.imuz) sin índice de huecos
+    disp = DispositivoSesion(ruta_sin_extension)
+    if not disp.existe():
+        return []
+    return bloques_ceros(disp.seq_por_fila(), disp.muestras(), filas_defecto)
 
 
 def revisar_sesion(base_dir, n_sesion, nombre_carpeta):
@@ -106,13 +95,13 @@ def revisar_sesion(base_dir, n_sesion, nombre_carpeta):
     for disp in DISPOSITIVOS:
         subcarpeta = f"{disp}{n_sesion}"
         ruta_sub = os.path.join(ruta_sesion, subcarpeta)
-        ruta_csv = os.path.join(ruta_sub, f"{subcarpeta}.csv")
+        ruta_base = os.path.join(ruta_sub, subcarpeta)
 
-        if not os.path.isfile(ruta_csv):
+        if not DispositivoSesion(ruta_base).existe():
 
             continue
 
-        bloques_ceros = detectar_bloques_ceros_en_csv(ruta_csv)
+        bloques_ceros = detectar_bloques_ceros(ruta_base)
         if bloques_ceros:
             resultado[disp] = bloques_ceros
 
@@ -129,16 +118,16 @@ def main():
 
     sesiones_con_ceros = []
 
-    for n_sesion, nombre_carpeta in sesiones:
-        info = revisar_sesion(BASE_DIR, n_sesion, nombre_carpeta)
+    for n_sesion, fisico, nombre_carpeta in sesiones:
+        info = revisar_sesion(BASE_DIR, fisico, nombre_carpeta)
         if not info:
             print(f"Sesión {n_sesion} ({nombre_carpeta}): OK, sin bloques de ceros.")
         else:
-            sesiones_con_ceros.append((n_sesion, info))
+            sesiones_con_ceros.append((n_sesion, fisico, nombre_carpeta, info))
             print(f"Sesión {n_sesion} ({nombre_carpeta}): con bloques de ceros")
             for disp, bloques in info.items():
                 seqs = [b[0] for b in bloques]
-                print(f"  - {disp}{n_sesion}: {len(bloques)} bloques de ceros.")
+                print(f"  - {disp}{fisico}: {len(bloques)} bloques de ceros.")
                 if len(seqs) > 10:
                     print(f"      block_seq (ejemplo): {seqs[:10]} ...")
                 else:
@@ -149,9 +138,9 @@ def main():
         print("Ninguna sesión tiene bloques de ceros (relleno por pérdidas).")
     else:
         print("Sesiones con al menos un bloque de ceros:")
-        for n_sesion, info in sesiones_con_ceros:
+        for n_sesion, _, nombre_carpeta, info in sesiones_con_ceros:
             dispositivos = ", ".join(sorted(info.keys()))
-            print(f"  - imu_capturas{n_sesion} (dispositivos: {dispositivos})")
+            print(f"  - Sesión {n_sesion}: {nombre_carpeta} (dispositivos: {dispositivos})")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
-import os
-import csv
+from catalogo_sesiones import sesiones_disponibles
+from sesion_imu import abrir_sesion
 
 PREFIJO_SESION = "imu_capturas"
 
@@ -10,45 +10,20 @@ ID_A_NOMBRE = {
     4: "cintura",
 }
 
-def contar_filas_csv(ruta_csv: str):
-
-    if not os.path.exists(ruta_csv):
-        return None
-
-    with open(ruta_csv, newline="") as f:
-        reader = csv.reader(f)
-        filas = list(reader)
-
-    if not filas:
-        return 0
-
-    return max(len(filas) - 1, 0)
-
-
-def obtener_indices_sesion():
-
-    indices = []
-    for nombre in os.listdir("."):
-        if nombre.startswith(PREFIJO_SESION):
-            sufijo = nombre[len(PREFIJO_SESION):]
-            if sufijo.isdigit():
-                indices.append(int(sufijo))
-    return sorted(indices)
-
-
-def ruta_csv_dispositivo(nombre_base: str, indice_sesion: int) -> str:
-
-    carpeta_sesion = f"{PREFIJO_SESION}{indice_sesion}"
-    nombre_con_indice = f"{nombre_base}{indice_sesion}"
-    carpeta_disp = os.path.join(carpeta_sesion, nombre_con_indice)
-    ruta_csv = os.path.join(carpeta_disp, f"{nombre_con_indice}.csv")
-    return ruta_csv
+def contar_filas(indice_sesion: int, nombre_base: str):
+    """
+    Filas del dispositivo en la sesión (CSV o binario), o None si no hay datos.
+    Sale del _resumen.json o del índice sin recorrer las filas; solo las
+    sesiones viejas sin metadatos cuentan saltos de línea del CSV.
+    """
+    disp = abrir_sesion(indice_sesion, prefijo=PREFIJO_SESION)[nombre_base]
+    return disp.filas if disp.existe() else None
 
 
 def main():
-    indices_sesion = obtener_indices_sesion()
+    sesiones = sesiones_disponibles(prefijo=PREFIJO_SESION)
 
-    if not indices_sesion:
+    if not sesiones:
         print("No se encontraron carpetas de sesión tipo 'imu_capturasN'.")
         return
 
@@ -57,12 +32,11 @@ def main():
     ))
     print()
 
-    for n in indices_sesion:
+    for n, fisico in sesiones:
         filas_por_disp = []
 
         for dev_id, nombre_base in ID_A_NOMBRE.items():
-            ruta = ruta_csv_dispositivo(nombre_base, n)
-            filas = contar_filas_csv(ruta)
+            filas = contar_filas(fisico, nombre_base)
             filas_por_disp.append(filas)
 
         filas_str = ", ".join("NA" if f is None else str(f) for f in filas_por_disp)
@@ -0,0 +1,91 @@
+"""
+Rotación de sesión sin huecos: los sumideros de la sesión siguiente se crean
+(carpetas, archivos y encabezados) en un hilo de fondo mientras la sesión
+actual sigue grabando, y los de la sesión que termina también se cierran en
+ese hilo. El receptor solo intercambia el sumidero del ManejadorDispositivo
+entre dos bloques (ManejadorDispositivo.cambiar_sesion), así que la secuencia
+y los contadores de pérdidas siguen de una sesión a la otra.
+"""
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from manejador_dispositivo import ruta_dispositivo, PREFIJO_SESION
+from sumideros import abrir_sumidero
+
+
+class PreaperturaSesiones:
+    """Abre por adelantado los sumideros (indice_sesion, id_disp) y los entrega al rotar."""
+
+    def __init__(self, tipo_sumidero="binario", prefijo_sesion=PREFIJO_SESION):
+        self.tipo_sumidero  = tipo_sumidero
+        self.prefijo_sesion = prefijo_sesion
+        self._fondo   = ThreadPoolExecutor(max_workers=1, thread_name_prefix="imu-rotacion")
+        self._futuros = {}  # (indice_sesion, id_disp) -> Future de (sumidero, carpeta creada o None)
+        self._lock    = threading.Lock()
+
+    def _abrir(self, indice_sesion, nombre):
+        ruta = ruta_dispositivo(nombre, indice_sesion, self.prefijo_sesion)
+        carpeta = os.path.dirname(ruta)
+        creada = None if os.path.isdir(carpeta) else carpeta
+        os.makedirs(carpeta, exist_ok=True)
+        return abrir_sumidero(self.tipo_sumidero, ruta), creada
+
+    def preparar(self, indice_sesion, dispositivos):
+        """Encola la apertura de la sesión indice_sesion para {id_disp: nombre}."""
+        with self._lock:
+            for id_disp, nombre in dispositivos.items():
+                clave = (indice_sesion, id_disp)
+                if clave not in self._futuros:
+                    self._futuros[clave] = self._fondo.submit(self._abrir, indice_sesion, nombre)
+
+    def tomar(self, indice_sesion, id_disp):
+        """
+        Sumidero ya abierto para (indice_sesion, id_disp), o None si no se preparó.
+        Si la apertura todavía está en curso se espera a que termine.
+        """
+        with self._lock:
+            futuro = self._futuros.pop((indice_sesion, id_disp), None)
+        if futuro is None:
+            return None
+        try:
+            sumidero, _ = futuro.result()
+        except OSError as e:
+            print(f"[!] No se pudo preabrir la sesión {indice_sesion} de id{id_disp}: {e}")
+            return None
+        return sumidero
+
+    def cerrar_en_fondo(self, sumidero):
+        """Cierra un sumidero (flush + close) fuera del hilo que escribe."""
+        self._fondo.submit(sumidero.cerrar)
+
+    def descartar_anteriores(self, indice_sesion):
+        """
+        Descarta lo preparado para sesiones anteriores a indice_sesion que nadie
+        tomó (un dispositivo que dejó de transmitir): cierra el sumidero y borra
+        la carpeta vacía que se había creado.
+        """
+        with self._lock:
+            viejas = [clave for clave in self._futuros if clave[0] < indice_sesion]
+            futuros = [self._futuros.pop(clave) for clave in viejas]
+        for futuro in futuros:
+            self._fondo.submit(self._descartar, futuro)
+
+    def _descartar(self, futuro):
+        try:
+            sumidero, creada = futuro.result()
+        except OSError:
+            return
+        sumidero.cerrar()
+        if creada is not None:
+            shutil.rmtree(creada, ignore_errors=True)
+            try:
+                os.rmdir(os.path.dirname(creada))  # la raíz de sesión, solo si quedó vacía
+            except OSError:
+                pass
+
+    def detener(self):
+        """Descarta lo no tomado y espera a que terminen los cierres pendientes."""
+        self.descartar_anteriores(float("inf"))
+        self._fondo.shutdown(wait=True)
@@ -0,0 +1,376 @@
+"""
+Acceso perezoso a las sesiones grabadas (imu_capturasN/<disp>N/<disp>N.*),
+compartido por graficador_por_variable.py, revisador_filas.py y revisador_bloques.py.
+
+    sesion = abrir_sesion(5)                   # no lee nada todavía
+    pecho = sesion["pecho"]
+    pecho.filas                                # del _resumen.json, sin recorrer datos
+    pecho.huecos()                             # del .idx o _huecos.csv
+    pecho.fallas()                             # lecturas I2C fallidas (protocolo v2)
+    pecho.muestras()                           # (N, 6) int16 en memoria mapeada
+    pecho.aceleracion(), pecho.giro()          # escalados recién al pedirlos
+
+Los .imu del sumidero binario se mapean directo. Los CSV se parsean una sola
+vez a un <disp>N.cache.npy al lado del CSV (seq + 6 int16 por fila) que las
+lecturas siguientes mapean sin parsear; se regenera si el CSV es más nuevo.
+Las sesiones archivadas con archivo_imu.py (.imuz) se descomprimen en memoria.
+"""
+import csv
+import os
+import re
+import struct
+import warnings
+
+import numpy as np
+
+from archivo_imu import EXTENSION_ARCHIVO, ArchivoIMU
+from sumideros import (
+    COLUMNAS, EXTENSION_DATOS, EXTENSION_INDICE, FORMATO_CAB_DATOS, MARCA_DATOS, SUFIJO_TIEMPOS,
+    TAMANO_CAB_DATOS, TAMANO_REGISTRO, TIPO_DATOS, VERSION_BINARIO,
+    existe_binario, leer_fallas, leer_huecos, leer_indice, leer_resumen,
+)
+
+PREFIJO_SESION = "imu_capturas"
+FACTOR_ACEL    = 1.0 / 4096.0   # ±8 g
+FACTOR_GIRO    = 1.0 / 65.5     # ±500 °/s
+EJES           = ["ax", "ay", "az", "gx", "gy", "gz"]
+SUFIJO_CACHE   = ".cache.npy"
+
+DTYPE_FILA = np.dtype([("seq", "<u4"), ("valores", "<i2", (6,))])
+VALOR_NO_NUMERICO = -32768  # celda no numérica en un CSV (cuenta como distinta de cero)
+
+
+def obtener_indices_sesion(base_dir=".", prefijo=PREFIJO_SESION):
+    """Índices N de las carpetas <prefijo>N en base_dir, ordenados."""
+    patron = re.compile(rf"^{re.escape(prefijo)}(\d+)$")
+    indices = []
+    for nombre in os.listdir(base_dir):
+        m = patron.match(nombre)
+        if m and os.path.isdir(os.path.join(base_dir, nombre)):
+            indices.append(int(m.group(1)))
+    return sorted(indices)
+
+
+def ruta_base_dispositivo(nombre, indice_sesion, base_dir=".", prefijo=PREFIJO_SESION):
+    """Ruta sin extensión, ej: imu_capturas5/pecho5/pecho5."""
+    con_indice = f"{nombre}{indice_sesion}"
+    return os.path.join(base_dir, f"{prefijo}{indice_sesion}", con_indice, con_indice)
+
+
+class DispositivoSesion:
+    """Los datos de un dispositivo en una sesión; cada cosa se lee recién cuando se pide."""
+
+    def __init__(self, ruta_base):
+        self.ruta_base = ruta_base
+        self.binario   = existe_binario(ruta_base)
+        # Las sesiones binarias conservan el .idx aunque el .imu se haya archivado
+        self.indice_binario = os.path.isfile(ruta_base + EXTENSION_INDICE)
+        self._filas    = None
+        self._huecos   = False  # False = todavía no consultado (None es "sin metadatos")
+        self._tabla    = None
+
+    @property
+    def ruta_csv(self):
+        return self.ruta_base + ".csv"
+
+    @property
+    def ruta_archivo(self):
+        return self.ruta_base + EXTENSION_ARCHIVO
+
+    @property
+    def ruta_datos(self):
+        """El archivo con las muestras: .imu, .csv o, si se archivó, .imuz."""
+        if self.binario:
+            return self.ruta_base + EXTENSION_DATOS
+        if not os.path.isfile(self.ruta_csv) and os.path.isfile(self.ruta_archivo):
+            return self.ruta_archivo
+        return self.ruta_csv
+
+    def existe(self):
+        return self.binario or os.path.isfile(self.ruta_csv) or os.path.isfile(self.ruta_archivo)
+
+    # ---- Metadatos (sin recorrer las filas) ----
+
+    @property
+    def filas(self):
+        """Filas del CSV clásico (incluidas las filas en cero de los huecos)."""
+        if self._filas is None:
+            self._filas = self._contar_filas()
+        return self._filas
+
+    def _contar_filas(self):
+        resumen = leer_resumen(self.ruta_base)
+        if resumen is not None:
+            return resumen["filas"]
+        if self.indice_binario:
+            return sum(e.n_bloques * e.n_filas for e in leer_indice(self.ruta_base + EXTENSION_INDICE))
+        if not os.path.isfile(self.ruta_csv):
+            if not os.path.isfile(self.ruta_archivo):
+                return None
+            archivo = ArchivoIMU(self.ruta_archivo)
+            archivo.cerrar()
+            return archivo.filas
+        # Sin resumen (sesión vieja o en curso): contar saltos de línea en bloques de bytes
+        with open(self.ruta_csv, "rb") as f:
+            saltos, ultimo = 0, b"\n"
+            for trozo in iter(lambda: f.read(1 << 20), b""):
+                saltos += trozo.count(b"\n")
+                ultimo = trozo[-1:]
+        if ultimo != b"\n":
+            saltos += 1  # última línea sin salto final
+        return max(saltos - 1, 0)
+
+    def huecos(self):
+        """[(seq_inicio, n_bloques, motivo, filas_por_bloque)] del índice, o None si el receptor no dejó metadatos."""
+        if self._huecos is False:
+            self._huecos = leer_huecos(self.ruta_base)
+        return self._huecos
+
+    def fallas(self):
+        """{block_seq: mapa de bits} de las muestras en cero por lectura I2C fallida (bit i = muestra i)."""
+        return leer_fallas(self.ruta_base)
+
+    # ---- Datos en memoria mapeada ----
+
+    def muestras(self):
+        """
+        (N, 6) int16 sin copiar. Para CSV son todas sus filas (los huecos como
+        filas en cero); para binario solo los bloques recibidos.
+        """
+        if self.binario:
+            return _mapear_binario(self.ruta_base + EXTENSION_DATOS)
+        return self._cargar_tabla()["valores"]
+
+    def seq_por_fila(self):
+        """block_seq de cada fila de muestras()."""
+        if self.binario:
+            entradas = [e for e in leer_indice(self.ruta_base + EXTENSION_INDICE) if e.tipo == TIPO_DATOS]
+            return np.repeat(
+                np.array([e.block_seq for e in entradas], dtype=np.uint32),
+                [e.n_filas for e in entradas],
+            )
+        return self._cargar_tabla()["seq"]
+
+    def _cargar_tabla(self):
+        """Tabla DTYPE_FILA del CSV (vía su caché) o, si se archivó, del .imuz descomprimido."""
+        if self._tabla is None:
+            if os.path.isfile(self.ruta_csv) or not os.path.isfile(self.ruta_archivo):
+                self._tabla = cargar_csv(self.ruta_csv)
+            else:
+                archivo = ArchivoIMU(self.ruta_archivo)
+                try:
+                    seq, valores = archivo.tabla()
+                finally:
+                    archivo.cerrar()
+                self._tabla = np.empty(len(seq), dtype=DTYPE_FILA)
+                self._tabla["seq"], self._tabla["valores"] = seq, valores
+        return self._tabla
+
+    def tiempos(self):
+        """
+        Hora alineada al PC de cada fila de muestras() (NaN en filas de huecos), o None.
+        Las marcas se asignan a los bloques en orden de archivo, no por block_seq:
+        después de un reinicio del ESP32 la misma seq aparece más de una vez.
+        """
+        seq = np.asarray(self.seq_por_fila(), dtype=np.int64)
+        if self.indice_binario:
+            datos = [e for e in leer_indice(self.ruta_base + EXTENSION_INDICE) if e.tipo == TIPO_DATOS]
+            largo = np.array([e.n_filas for e in datos], dtype=np.int64)
+            if largo.sum() == len(seq):
+                # Una entrada por bloque escrito, en el mismo orden que las filas
+                k = np.arange(len(seq)) - np.repeat(np.cumsum(largo) - largo, largo)
+                t0 = np.repeat(np.array([e.t_muestra0 for e in datos]), largo)
+                return t0 + k * np.repeat(np.array([e.dt for e in datos]), largo)
+            marcas = [(e.block_seq, e.t_muestra0, e.dt) for e in datos]
+        else:
+            ruta = self.ruta_base + SUFIJO_TIEMPOS
+            if not os.path.isfile(ruta):
+                return None
+            with open(ruta, newline="") as f:
+                marcas = [
+                    (int(fila["block_seq"]), float(fila["t_muestra0"]), float(fila["dt"]))
+                    for fila in csv.DictReader(f)
+                ]
+        if not len(seq):
+            return np.empty(0)
+        # Posición de cada fila dentro de su bloque: distancia al primer índice de su corrida
+        inicio_corrida = np.flatnonzero(np.r_[True, np.diff(seq) != 0])
+        largo = np.diff(np.r_[inicio_corrida, len(seq)])
+        k = np.arange(len(seq)) - np.repeat(inicio_corrida, largo)
+        # Cada marca es del siguiente bloque escrito; las corridas sin marca son huecos en cero
+        t0 = np.full(len(inicio_corrida), np.nan)
+        dt = np.zeros(len(inicio_corrida))
+        j = 0
+        for i, s in enumerate(seq[inicio_corrida].tolist()):
+            if j < len(marcas) and marcas[j][0] == s:
+                _, t0[i], dt[i] = marcas[j]
+                j += 1
+        return np.repeat(t0, largo) + k * np.repeat(dt, largo)
+
+    def rango_tiempos(self):
+        """
+        (hora alineada del primer bloque, del último bloque) leyendo solo el
+        principio y el final de los metadatos, o None si no hay marcas de tiempo.
+        """
+        if self.indice_binario:
+            datos = [e for e in leer_indice(self.ruta_base + EXTENSION_INDICE) if e.tipo == TIPO_DATOS]
+            return (datos[0].t_muestra0, datos[-1].t_muestra0) if datos else None
+        ruta = self.ruta_base + SUFIJO_TIEMPOS
+        try:
+            with open(ruta, "rb") as f:
+                encabezado = f.readline().decode().strip().split(",")
+                primera = f.readline()
+                f.seek(max(f.seek(0, os.SEEK_END) - 4096, 0))
+                ultima = f.read().rstrip(b"\n").rsplit(b"\n", 1)[-1]
+        except OSError:
+            return None
+        if not primera.strip():
+            return None
+        columna = encabezado.index("t_muestra0")
+        return tuple(float(linea.decode().split(",")[columna]) for linea in (primera, ultima))
+
+    def aceleracion(self):
+        """(N, 3) en g, calculado al pedirlo."""
+        return self.muestras()[:, :3] * np.float32(FACTOR_ACEL)
+
+    def giro(self):
+        """(N, 3) en °/s, calculado al pedirlo."""
+        return self.muestras()[:, 3:] * np.float32(FACTOR_GIRO)
+
+    def eje(self, nombre):
+        """Un eje ("ax".."gz") escalado."""
+        i = EJES.index(nombre)
+        factor = FACTOR_ACEL if i < 3 else FACTOR_GIRO
+        return self.muestras()[:, i] * np.float32(factor)
+
+
+def _mapear_binario(ruta_datos):
+    """(N, 6) int16 sobre el .imu; descarta un registro a medio escribir al final."""
+    with open(ruta_datos, "rb") as f:
+        marca, version, columnas = struct.unpack(FORMATO_CAB_DATOS, f.read(TAMANO_CAB_DATOS))
+        if marca != MARCA_DATOS or version != VERSION_BINARIO or columnas != COLUMNAS:
+            raise ValueError(f"{ruta_datos}: archivo de datos no reconocido ({marca!r}, v{version})")
+        filas = (f.seek(0, os.SEEK_END) - TAMANO_CAB_DATOS) // TAMANO_REGISTRO
+    if filas == 0:
+        return np.empty((0, COLUMNAS), dtype="<i2")
+    return np.memmap(ruta_datos, dtype="<i2", mode="r", offset=TAMANO_CAB_DATOS, shape=(filas, COLUMNAS))
+
+
+def cargar_csv(ruta_csv):
+    """Tabla DTYPE_FILA (seq, valores) de un CSV, desde su caché .npy o parseándolo una vez."""
+    ruta_cache = os.path.splitext(ruta_csv)[0] + SUFIJO_CACHE
+    try:
+        if os.path.getmtime(ruta_cache) >= os.path.getmtime(ruta_csv):
+            return np.load(ruta_cache, mmap_mode="r")
+    except OSError:
+        pass
+    tabla = _parsear_csv(ruta_csv)
+    try:
+        np.save(ruta_cache, tabla)
+        return np.load(ruta_cache, mmap_mode="r")
+    except OSError:
+        return tabla  # carpeta de solo lectura: queda en memoria
+
+
+def _parsear_csv(ruta_csv):
+    """
+    Lee un CSV block_seq,ax..gz a la tabla DTYPE_FILA (vía rápida de numpy, con
+    respaldo tolerante). Como el detector original, solo se usan las primeras 7
+    columnas: las que sobren a la derecha se ignoran.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)  # CSV con solo el encabezado
+            crudo = np.loadtxt(
+                ruta_csv, delimiter=",", skiprows=1, dtype=np.int64, ndmin=2, usecols=range(7)
+            )
+    except ValueError:
+        crudo = _parsear_csv_tolerante(ruta_csv)
+    if not crudo.size:
+        return np.empty(0, dtype=DTYPE_FILA)  # solo el encabezado (o vacío)
+    tabla = np.empty(len(crudo), dtype=DTYPE_FILA)
+    tabla["seq"] = crudo[:, 0]
+    tabla["valores"] = np.clip(crudo[:, 1:7], -32768, 32767)  # que 65536 no pase a ser 0
+    return tabla
+
+
+def _valor_celda(texto):
+    """
+    int16 de una celda conservando si es cero o no, como el detector original:
+    un decimal como 0.5 o una celda no numérica cuentan como distintos de cero.
+    """
+    try:
+        return max(-32768, min(32767, int(texto)))
+    except ValueError:
+        pass
+    try:
+        x = float(texto)
+    except ValueError:
+        return VALOR_NO_NUMERICO
+    if x == 0.0:
+        return 0
+    if x != x or x in (float("inf"), float("-inf")):
+        return VALOR_NO_NUMERICO
+    entero = max(-32768, min(32767, int(x)))
+    return entero if entero else (1 if x > 0 else -1)
+
+
+def _parsear_csv_tolerante(ruta_csv):
+    """
+    Fila por fila: se saltean solo las filas cuyo block_seq no es un entero
+    (encabezados repetidos, líneas rotas); las celdas raras se leen con _valor_celda.
+    """
+    filas = []
+    with open(ruta_csv, newline="") as f:
+        for fila in csv.reader(f):
+            try:
+                seq = int(fila[0])
+            except (ValueError, IndexError):
+                continue
+            valores = [_valor_celda(v) for v in fila[1:7]]
+            filas.append([seq] + valores + [0] * (6 - len(valores)))
+    if not filas:
+        return np.empty((0, 7), dtype=np.int64)
+    return np.array(filas, dtype=np.int64)
+
+
+class Sesion:
+    """Una carpeta imu_capturasN; los dispositivos se descubren por sus subcarpetas."""
+
+    def __init__(self, indice, base_dir=".", prefijo=PREFIJO_SESION):
+        self.indice   = indice
+        self.base_dir = base_dir
+        self.prefijo  = prefijo
+        self.ruta     = os.path.join(base_dir, f"{prefijo}{indice}")
+        self._dispositivos = {}
+
+    def nombres(self):
+        """Nombres base de los dispositivos presentes (carpetas <nombre>N)."""
+        sufijo = str(self.indice)
+        try:
+            carpetas = sorted(os.listdir(self.ruta))
+        except OSError:
+            return []
+        return [
+            c[:-len(sufijo)] for c in carpetas
+            if c.endswith(sufijo) and os.path.isdir(os.path.join(self.ruta, c))
+        ]
+
+    def __getitem__(self, nombre):
+        disp = self._dispositivos.get(nombre)
+        if disp is None:
+            disp = self._dispositivos[nombre] = DispositivoSesion(
+                ruta_base_dispositivo(nombre, self.indice, self.base_dir, self.prefijo)
+            )
+        return disp
+
+    def __contains__(self, nombre):
+        return self[nombre].existe()
+
+    def dispositivos(self):
+        """{nombre: DispositivoSesion} de los que tienen datos."""
+        return {n: self[n] for n in self.nombres() if self[n].existe()}
+
+
+def abrir_sesion(indice, base_dir=".", prefijo=PREFIJO_SESION):
+    return Sesion(indice, base_dir, prefijo)
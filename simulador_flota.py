@@ -0,0 +1,449 @@
+"""
+Simulador de una flota de ESP32: genera por UDP los mismos datagramas IMU2 que
+arma taskNetwork en el firmware (UdpHdr "<4s B B H I I I" + bloque de 256 B con
+21 muestras de 6 x int16 big-endian y 4 bytes de footer en cero), para probar
+los receptores sin hardware. Con --tam-bloque cada dispositivo puede mandar
+bloques más grandes (1024 B = 85 muestras, como ESP32_1000HZ_DLPF_1024by), y
+con una lista (--tam-bloque 256,1024) la flota queda mezclada. Con --version 2
+los bloques van en protocolo v2 (mapa de fallas I2C y CRC32, ver recepcion_lotes.py).
+
+Cada dispositivo manda un bloque cada muestras / frecuencia segundos
+(256 B a 1 kHz -> ~47.6 bloques/s) y su red se modela con ModeloRed: pérdidas sueltas,
+ráfagas de pérdida, reordenamiento, duplicados y reinicios del ESP32 (seq y
+millis() vuelven a 0), más bytes dañados en el camino y lecturas I2C fallidas.
+
+Con --nack los emisores hacen de ESP32 con retransmisión: guardan los últimos
+HISTORIAL_BLOQUES datagramas (los NUM_BUFS del firmware), escuchan en su mismo
+socket los NACK del receptor y reenvían lo que todavía tienen. Lo reenviado
+también puede perderse (con la probabilidad de pérdida suelta del modelo).
+
+Con --fec copia|paridad los bloques salen en datagramas v3 con redundancia
+(fec_imu.CodificadorFEC, lo que haría el firmware); el modelo de red se aplica
+a cada datagrama, incluidos los de paridad.
+
+Uso: python simulador_flota.py [-n 4] [-f 1000] [-t 10] [--perdida 0.01] ...
+     (python simulador_flota.py -h para todas las opciones)
+"""
+import argparse
+import math
+import select
+import multiprocessing as mp
+import random
+import socket
+import struct
+import time
+
+from fec_imu import MODOS_FEC, CodificadorFEC
+from recepcion_lotes import (
+    FORMATO_CABECERA, MARCA_MAGICA, TAMANO_CABECERA, armar_datagrama_v2, leer_nack, marcar_retransmision,
+)
+
+IP_DESTINO      = "127.0.0.1"
+PUERTO_DESTINO  = 50000
+TAM_BLOQUE      = 256
+MUESTRAS_BLOQUE = 21          # 21*(6*2)=252 + 4 footer = 256
+TAM_FOOTER      = 4
+BLOQUES_TABLA   = 64          # bloques de señal precalculados por dispositivo
+HISTORIAL_BLOQUES = 12        # bloques enviados que se pueden retransmitir (NUM_BUFS del firmware)
+
+
+class ModeloRed:
+    """Perturbaciones que sufre el flujo de un dispositivo antes de llegar al PC."""
+
+    def __init__(self, perdida=0.0, rafaga=0.0, largo_rafaga=10, reorden=0.0,
+                 distancia_reorden=3, duplicado=0.0, reinicio_cada=0.0, deriva_ppm=0.0,
+                 corrupcion=0.0, fallas_i2c=0.0):
+        self.perdida           = perdida            # probabilidad de perder un bloque suelto
+        self.rafaga            = rafaga             # probabilidad de que empiece una ráfaga de pérdidas
+        self.largo_rafaga      = largo_rafaga       # bloques perdidos por ráfaga (media)
+        self.reorden           = reorden            # probabilidad de que un bloque se atrase
+        self.distancia_reorden = distancia_reorden  # bloques que lo pasan cuando se atrasa
+        self.duplicado         = duplicado          # probabilidad de mandar un bloque dos veces
+        self.reinicio_cada     = reinicio_cada      # s entre reinicios del ESP32 (0 = nunca)
+        self.deriva_ppm        = deriva_ppm         # deriva del millis() frente al reloj del PC
+        self.corrupcion        = corrupcion         # probabilidad de que un byte del payload llegue dañado
+        self.fallas_i2c        = fallas_i2c         # probabilidad por muestra de que falle la lectura I2C
+
+
+class EspSimulado:
+    """Un dispositivo: arma los datagramas en orden y les aplica el ModeloRed."""
+
+    def __init__(self, id_disp, frecuencia=1000.0, modelo=None, semilla=None, tam_bloque=TAM_BLOQUE,
+                 version=1, fec=None, fec_bloques=None):
+        self.id_disp    = id_disp
+        self.frecuencia = frecuencia
+        self.version    = 1 if fec else version  # el datagrama v3 lleva el bloque en formato v1
+        self.codificador = CodificadorFEC(id_disp, fec, fec_bloques) if fec else None
+        self.tam_bloque = tam_bloque
+        self.muestras   = muestras_en_bloque(tam_bloque)
+        self.periodo    = self.muestras / frecuencia  # s entre bloques
+        self.modelo     = modelo or ModeloRed()
+        self.azar       = random.Random(semilla if semilla is not None else id_disp)
+        self.tabla      = [self._bloque(k) for k in range(BLOQUES_TABLA)]
+
+        self.seq        = 0
+        self.t_arranque = None  # hora del PC en que millis() vale 0
+        self.retenidos  = []    # [bloques que faltan, datagrama] atrasados por reordenamiento
+        self.en_rafaga  = 0
+        self.historial  = {}    # seq -> datagrama tal como salió, para retransmitir
+
+        self.generados    = 0
+        self.enviados     = 0
+        self.perdidos     = 0
+        self.reordenados  = 0
+        self.duplicados   = 0
+        self.reinicios    = 0
+        self.corrompidos  = 0
+        self.muestras_fallidas = 0
+        self.bytes_enviados = 0
+        self.bytes_bloques  = 0  # lo que ocuparían los datagramas sin redundancia FEC
+        self.bytes_fec      = 0  # redundancia FEC agregada (secciones y datagramas de paridad)
+        self.nacks          = 0  # pedidos de retransmisión recibidos
+        self.bytes_nack     = 0
+        self.retransmitidos = 0
+        self.bytes_retransmitidos = 0
+        self.sin_historial  = 0  # bloques pedidos que ya no estaban en el historial
+
+    def _bloque(self, k):
+        """
+        Bloque de tam_bloque bytes con senos distintos por eje y por dispositivo
+        (en v2, solo las muestras: el mapa y el CRC se agregan al enviar).
+        """
+        muestras = []
+        for i in range(self.muestras):
+            n = k * self.muestras + i
+            fase = 2 * math.pi * n / (BLOQUES_TABLA * self.muestras)
+            muestras.extend(
+                int(8000 * math.sin(fase * (eje + 1) + self.id_disp)) for eje in range(6)
+            )
+        datos = struct.pack(f">{len(muestras)}h", *muestras)
+        if self.version == 2:
+            return datos
+        return datos + bytes(self.tam_bloque - len(datos))
+
+    def millis(self, ahora):
+        transcurrido = (ahora - self.t_arranque) * (1 + self.modelo.deriva_ppm * 1e-6)
+        return int(transcurrido * 1000) & 0xFFFFFFFF
+
+    def datagramas(self, ahora):
+        """Lo que llega a la red por el bloque que toca enviar ahora (0, 1 o más datagramas)."""
+        m = self.modelo
+        if self.t_arranque is None:
+            self.t_arranque = ahora
+        if m.reinicio_cada and ahora - self.t_arranque >= m.reinicio_cada:
+            self.t_arranque, self.seq = ahora, 0
+            self.historial.clear()
+            self.reinicios += 1
+
+        bloque = self.tabla[self.seq % BLOQUES_TABLA]
+        if self.codificador is not None:
+            propios = self.codificador.datagramas(self.seq, self.millis(ahora), bloque)
+            datagrama = propios[0]
+            self.bytes_fec += sum(len(d) for d in propios) - TAMANO_CABECERA - len(bloque)
+        elif self.version == 2:
+            fallas = self._fallas_i2c()
+            if fallas:
+                bloque = bytearray(bloque)
+                for i in range(self.muestras):
+                    if fallas >> i & 1:
+                        bloque[i * 12:(i + 1) * 12] = bytes(12)  # como llenarBloque() si leerMPU falla
+            datagrama = armar_datagrama_v2(self.id_disp, self.seq, self.millis(ahora), bytes(bloque), fallas)
+            propios = [datagrama]
+        else:
+            cabecera = struct.pack(
+                FORMATO_CABECERA, MARCA_MAGICA, 1, self.id_disp, 0,
+                self.seq, self.millis(ahora), self.tam_bloque,
+            )
+            datagrama = cabecera + bloque
+            propios = [datagrama]
+        self.bytes_bloques += TAMANO_CABECERA + len(bloque) if self.codificador is not None else len(datagrama)
+        self.historial[self.seq] = datagrama
+        self.historial.pop(self.seq - HISTORIAL_BLOQUES, None)
+        if m.corrupcion and self.azar.random() < m.corrupcion:
+            datagrama = bytearray(datagrama)
+            datagrama[self.azar.randrange(TAMANO_CABECERA, len(datagrama))] ^= 1 << self.azar.randrange(8)
+            propios[0] = bytes(datagrama)
+            self.corrompidos += 1
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        self.generados += 1
+
+        salida = []
+        for datagrama in propios:
+            self._atravesar_red(datagrama, salida)
+
+        # Los atrasados salen después de que pasen `distancia_reorden` bloques
+        for retenido in self.retenidos:
+            retenido[0] -= 1
+        salida.extend(d for falta, d in self.retenidos if falta <= 0)
+        self.retenidos = [r for r in self.retenidos if r[0] > 0]
+
+        self.enviados += len(salida)
+        self.bytes_enviados += sum(len(d) for d in salida)
+        return salida
+
+    def _atravesar_red(self, datagrama, salida):
+        """Aplica el ModeloRed a un datagrama: se pierde, se atrasa o sale (quizás duplicado)."""
+        m = self.modelo
+        if self.en_rafaga == 0 and m.rafaga and self.azar.random() < m.rafaga:
+            self.en_rafaga = max(1, int(self.azar.expovariate(1 / m.largo_rafaga)))
+        if self.en_rafaga:
+            self.en_rafaga -= 1
+            self.perdidos += 1
+        elif m.perdida and self.azar.random() < m.perdida:
+            self.perdidos += 1
+        elif m.reorden and self.azar.random() < m.reorden:
+            self.retenidos.append([m.distancia_reorden, datagrama])
+            self.reordenados += 1
+        else:
+            salida.append(datagrama)
+            if m.duplicado and self.azar.random() < m.duplicado:
+                salida.append(datagrama)
+                self.duplicados += 1
+
+    def retransmitir(self, tramos, bytes_nack=0):
+        """Datagramas que se reenvían por un NACK [(seq_inicio, n_bloques)] (los que sigan en el historial)."""
+        self.nacks += 1
+        self.bytes_nack += bytes_nack
+        salida = []
+        for inicio, n in tramos:
+            for seq in range(inicio, inicio + n):
+                datagrama = self.historial.get(seq)
+                if datagrama is None:
+                    self.sin_historial += 1
+                    continue
+                self.retransmitidos += 1
+                self.bytes_retransmitidos += len(datagrama)
+                if self.modelo.perdida and self.azar.random() < self.modelo.perdida:
+                    continue
+                salida.append(marcar_retransmision(datagrama))
+        return salida
+
+    def _fallas_i2c(self):
+        """Mapa de bits de las muestras del bloque cuya lectura I2C falla."""
+        p = self.modelo.fallas_i2c
+        if not p:
+            return 0
+        fallas = 0
+        for i in range(self.muestras):
+            if self.azar.random() < p:
+                fallas |= 1 << i
+        self.muestras_fallidas += fallas.bit_count()
+        return fallas
+
+    def contadores(self):
+        return {
+            "tam_bloque":  self.tam_bloque,
+            "generados":   self.generados,
+            "enviados":    self.enviados,
+            "perdidos":    self.perdidos,
+            "reordenados": self.reordenados,
+            "duplicados":  self.duplicados,
+            "reinicios":   self.reinicios,
+            "corrompidos": self.corrompidos,
+            "muestras_fallidas": self.muestras_fallidas,
+            "bytes_enviados": self.bytes_enviados,
+            "bytes_bloques": self.bytes_bloques,
+            "bytes_fec":   self.bytes_fec,
+            "nacks":       self.nacks,
+            "bytes_nack":  self.bytes_nack,
+            "retransmitidos": self.retransmitidos,
+            "bytes_retransmitidos": self.bytes_retransmitidos,
+            "sin_historial": self.sin_historial,
+        }
+
+
+def muestras_en_bloque(tam_bloque):
+    """Muestras completas en un bloque de tam_bloque bytes (256 -> 21, 1024 -> 85)."""
+    return (tam_bloque - TAM_FOOTER) // 12
+
+
+def tam_bloque_de(tam_bloque, id_disp, primer_id=1):
+    """Tamaño de bloque del dispositivo: un int para toda la flota o una lista repartida en ronda."""
+    if isinstance(tam_bloque, int):
+        return tam_bloque
+    return tam_bloque[(id_disp - primer_id) % len(tam_bloque)]
+
+
+def atender_nacks(sock, por_id):
+    """Lee los NACK que llegaron al socket y reenvía lo pedido; devuelve los errores de envío."""
+    errores = 0
+    while True:
+        try:
+            datos, origen = sock.recvfrom(2048)
+        except (BlockingIOError, InterruptedError):
+            return errores
+        nack = leer_nack(datos)
+        if nack is None or nack[0] not in por_id:
+            continue
+        for datagrama in por_id[nack[0]].retransmitir(nack[1], len(datos)):
+            try:
+                sock.sendto(datagrama, origen)
+            except OSError:
+                errores += 1
+
+
+def correr_dispositivos(ids, frecuencia, duracion, modelo, destino, resultados=None, tam_bloque=TAM_BLOQUE,
+                        version=1, nack=False, fec=None, fec_bloques=None):
+    """
+    Envía los bloques de `ids` a su ritmo durante `duracion` s (un solo proceso).
+    Con nack, entre envío y envío atiende los NACK que el receptor manda al socket.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4_000_000)
+    dispositivos = [
+        EspSimulado(d, frecuencia, modelo, tam_bloque=tam_bloque_de(tam_bloque, d, ids[0]), version=version,
+                    fec=fec, fec_bloques=fec_bloques)
+        for d in ids
+    ]
+    t0 = time.perf_counter()
+    # Los dispositivos arrancan desfasados, como en una flota real
+    proximos = [t0 + i * disp.periodo / len(ids) for i, disp in enumerate(dispositivos)]
+    reloj_pc = time.time() - t0
+    fin = t0 + duracion
+    errores = 0
+    por_id = {d.id_disp: d for d in dispositivos}
+    if nack:
+        sock.setblocking(False)
+
+    while True:
+        ahora = time.perf_counter()
+        if ahora >= fin:
+            break
+        for i, disp in enumerate(dispositivos):
+            # Si el emisor se atrasó, se ponen al día los bloques vencidos
+            while proximos[i] <= ahora:
+                for datagrama in disp.datagramas(reloj_pc + proximos[i]):
+                    try:
+                        sock.sendto(datagrama, destino)
+                    except OSError:
+                        errores += 1
+                proximos[i] += disp.periodo
+        espera = min(proximos) - time.perf_counter()
+        if nack:
+            if select.select([sock], [], [], max(espera, 0))[0]:
+                errores += atender_nacks(sock, por_id)
+        elif espera > 0:
+            time.sleep(espera)
+    sock.close()
+
+    contadores = {d.id_disp: d.contadores() for d in dispositivos}
+    if resultados is not None:
+        resultados.put((contadores, errores))
+    return contadores, errores
+
+
+def correr_flota(num_dispositivos=4, frecuencia=1000.0, duracion=10.0, modelo=None,
+                 destino=(IP_DESTINO, PUERTO_DESTINO), procesos=1, primer_id=1, tam_bloque=TAM_BLOQUE,
+                 version=1, nack=False, fec=None, fec_bloques=None):
+    """
+    Simula num_dispositivos repartidos en `procesos` procesos emisores y devuelve
+    ({id_disp: contadores}, errores de envío). `tam_bloque` es un int o una
+    lista de tamaños que se reparte en ronda entre los dispositivos.
+    """
+    ids = list(range(primer_id, primer_id + num_dispositivos))
+    tam_bloque = {d: tam_bloque_de(tam_bloque, d, primer_id) for d in ids}
+    if procesos <= 1:
+        return correr_dispositivos(
+            ids, frecuencia, duracion, modelo, destino, tam_bloque=[tam_bloque[d] for d in ids],
+            version=version, nack=nack, fec=fec, fec_bloques=fec_bloques,
+        )
+
+    resultados = mp.Queue()
+    grupos = [ids[i::procesos] for i in range(procesos)]
+    hijos = [
+        mp.Process(target=correr_dispositivos,
+                   args=(g, frecuencia, duracion, modelo, destino, resultados, [tam_bloque[d] for d in g],
+                         version, nack, fec, fec_bloques))
+        for g in grupos if g
+    ]
+    for p in hijos:
+        p.start()
+    contadores, errores = {}, 0
+    for _ in hijos:
+        c, e = resultados.get()
+        contadores.update(c)
+        errores += e
+    for p in hijos:
+        p.join()
+    return contadores, errores
+
+
+def totales(contadores):
+    claves = [k for k in next(iter(contadores.values())) if k != "tam_bloque"] if contadores else []
+    return {k: sum(c[k] for c in contadores.values()) for k in claves}
+
+
+def lista_tamanos(texto):
+    """'256' -> 256, '256,1024' -> [256, 1024] (para --tam-bloque)."""
+    tamanos = [int(t) for t in texto.split(",")]
+    for t in tamanos:
+        if muestras_en_bloque(t) < 1:
+            raise argparse.ArgumentTypeError(f"bloque de {t} B: no entra ni una muestra")
+    return tamanos[0] if len(tamanos) == 1 else tamanos
+
+
+def argumentos_flota(parser):
+    """Opciones de la flota compartidas con los benchmarks."""
+    parser.add_argument("--tam-bloque", type=lista_tamanos, default=TAM_BLOQUE,
+                        help="bytes de payload por bloque; una lista (256,1024) mezcla la flota")
+    parser.add_argument("--version", type=int, choices=(1, 2), default=1,
+                        help="protocolo de los bloques (2 = mapa de fallas y CRC32)")
+    parser.add_argument("--nack", action="store_true",
+                        help="los emisores atienden pedidos de retransmisión del receptor")
+    parser.add_argument("--fec", choices=sorted(MODOS_FEC), default=None,
+                        help="redundancia FEC en datagramas v3 (copia de los anteriores o paridad XOR)")
+    parser.add_argument("--fec-bloques", type=int, default=None,
+                        help="copias por datagrama (copia) o bloques por grupo (paridad)")
+
+
+def argumentos_modelo(parser):
+    """Agrega al parser las opciones de ModeloRed (compartidas con bench_receptor.py)."""
+    parser.add_argument("--perdida", type=float, default=0.0, help="prob. de pérdida suelta")
+    parser.add_argument("--rafaga", type=float, default=0.0, help="prob. de iniciar ráfaga de pérdidas")
+    parser.add_argument("--largo-rafaga", type=int, default=10, help="bloques por ráfaga (media)")
+    parser.add_argument("--reorden", type=float, default=0.0, help="prob. de atrasar un bloque")
+    parser.add_argument("--distancia-reorden", type=int, default=3, help="bloques que lo pasan")
+    parser.add_argument("--duplicado", type=float, default=0.0, help="prob. de duplicar un bloque")
+    parser.add_argument("--reinicio-cada", type=float, default=0.0, help="s entre reinicios (0 = nunca)")
+    parser.add_argument("--deriva-ppm", type=float, default=0.0, help="deriva del millis() del ESP32")
+    parser.add_argument("--corrupcion", type=float, default=0.0, help="prob. de dañar un byte del bloque")
+    parser.add_argument("--fallas-i2c", type=float, default=0.0, help="prob. por muestra de lectura fallida (v2)")
+
+
+def modelo_desde(args):
+    return ModeloRed(
+        perdida=args.perdida, rafaga=args.rafaga, largo_rafaga=args.largo_rafaga,
+        reorden=args.reorden, distancia_reorden=args.distancia_reorden,
+        duplicado=args.duplicado, reinicio_cada=args.reinicio_cada, deriva_ppm=args.deriva_ppm,
+        corrupcion=args.corrupcion, fallas_i2c=args.fallas_i2c,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flota simulada de ESP32 (IMU2 por UDP)")
+    parser.add_argument("-n", "--dispositivos", type=int, default=4)
+    parser.add_argument("-f", "--frecuencia", type=float, default=1000.0, help="Hz de muestreo")
+    parser.add_argument("-t", "--duracion", type=float, default=10.0, help="segundos")
+    parser.add_argument("-p", "--procesos", type=int, default=1, help="procesos emisores")
+    parser.add_argument("--ip", default=IP_DESTINO)
+    parser.add_argument("--puerto", type=int, default=PUERTO_DESTINO)
+    argumentos_flota(parser)
+    argumentos_modelo(parser)
+    args = parser.parse_args()
+
+    print(f"{args.dispositivos} dispositivos a {args.frecuencia:.0f} Hz -> {args.ip}:{args.puerto} "
+          f"durante {args.duracion:.1f} s")
+    contadores, errores = correr_flota(
+        args.dispositivos, args.frecuencia, args.duracion, modelo_desde(args),
+        (args.ip, args.puerto), args.procesos, tam_bloque=args.tam_bloque, version=args.version,
+        nack=args.nack, fec=args.fec, fec_bloques=args.fec_bloques,
+    )
+    for id_disp, c in sorted(contadores.items()):
+        print(f"id{id_disp}: " + " ".join(f"{k}={v}" for k, v in c.items()))
+    t = totales(contadores)
+    print(f"total: {t['enviados']} datagramas ({t['enviados'] / args.duracion:,.0f}/s), "
+          f"errores de envío={errores}")
+
+
+if __name__ == "__main__":
+    main()
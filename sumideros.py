@@ -0,0 +1,405 @@
+"""
+Sumideros de escritura por dispositivo para los receptores UDP.
+
+Todos exponen la misma interfaz (escribir_bloque, escribir_hueco, vaciar,
+cerrar) y se crean con abrir_sumidero(tipo, ruta_sin_extension):
+
+  - "binario": el de los receptores por defecto. Registros int16
+               little-endian de ancho fijo (6 columnas, ax..gz) en <nombre>.imu,
+               más un índice <nombre>.idx con una entrada por bloque recibido y
+               una por cada rango de bloques perdidos. Los huecos no ocupan
+               filas en el .imu: con mala Wi-Fi el disco no crece con las
+               pérdidas. Cada entrada lleva el millis() del dispositivo y la
+               hora alineada al PC de la primera muestra más el intervalo entre
+               muestras.
+  - "csv":     el formato original (legado), una fila de texto por muestra. Los
+               huecos se siguen materializando como filas en cero, como las
+               esperan las herramientas viejas, y además se anotan en
+               <nombre>_huecos.csv. Las marcas de tiempo por bloque van en
+               <nombre>_tiempos.csv. Hay que pedirlo explícitamente (--sumidero csv).
+
+Al cerrar, ambos dejan <nombre>_resumen.json con la cantidad de filas, bloques
+y bloques perdidos, para que sesion_imu.py no tenga que recorrer los datos.
+
+Con bloques v2 (ver recepcion_lotes.py), las muestras cuya lectura I2C falló se
+anotan en <nombre>_fallas.csv (block_seq y mapa de bits en hexadecimal, bit i =
+muestra i del bloque), que solo se crea si hubo alguna: en los datos siguen en
+cero, pero ya no se confunden con un hueco.
+
+convertir_sesion_csv.py regenera el CSV clásico a partir del formato binario.
+"""
+import csv
+import itertools
+import json
+import os
+import struct
+import sys
+from array import array
+from collections import namedtuple
+
+ENCABEZADO_CSV = ["block_seq", "ax", "ay", "az", "gx", "gy", "gz"]
+COLUMNAS       = 6
+
+# Archivo de datos .imu: cabecera fija y luego registros de COLUMNAS * int16 (<i2)
+MARCA_DATOS         = b"IMUB"
+FORMATO_CAB_DATOS   = "<4s H H 8x"  # magic, versión, columnas, reservado
+TAMANO_CAB_DATOS    = struct.calcsize(FORMATO_CAB_DATOS)
+TAMANO_REGISTRO     = COLUMNAS * 2
+
+# Archivo de índice .idx: cabecera fija y una entrada por bloque o por hueco
+MARCA_INDICE        = b"IMUI"
+FORMATO_CAB_INDICE  = "<4s H 10x"   # magic, versión, reservado
+TAMANO_CAB_INDICE   = struct.calcsize(FORMATO_CAB_INDICE)
+# block_seq, n_bloques, n_filas, tipo, motivo, fila_inicio, t_host, t_muestra0, dt, ms
+#   datos: n_bloques = 1, n_filas = filas escritas en el .imu
+#   hueco: block_seq = primera seq perdida, n_bloques = cuántas, n_filas = filas
+#          por bloque que se habrían escrito (no ocupan lugar en el .imu)
+#   t_host: llegada al PC; t_muestra0 + i * dt: hora alineada de la muestra i;
+#   ms: millis() del ESP32 en la cabecera
+FORMATO_ENTRADA     = "<I I H B B Q d d f I"
+TAMANO_ENTRADA      = struct.calcsize(FORMATO_ENTRADA)
+
+EntradaIndice = namedtuple(
+    "EntradaIndice",
+    "block_seq n_bloques n_filas tipo motivo fila_inicio t_host t_muestra0 dt ms",
+)
+
+VERSION_BINARIO = 3
+
+TIPO_DATOS = 0
+TIPO_HUECO = 1
+
+# Motivo de un hueco
+HUECO_PERDIDA = 1  # la ventana de reordenamiento venció sin que llegara el bloque
+HUECO_CIERRE  = 2  # quedaba pendiente al cerrar la sesión o al reiniciarse el dispositivo
+HUECO_CORRUPTO = 3  # el bloque llegó pero su CRC (v2) no cerró
+
+NOMBRES_MOTIVO = {HUECO_PERDIDA: "perdida", HUECO_CIERRE: "cierre", HUECO_CORRUPTO: "corrupto"}
+
+EXTENSION_DATOS  = ".imu"
+EXTENSION_INDICE = ".idx"
+SUFIJO_HUECOS    = "_huecos.csv"
+ENCABEZADO_HUECOS = ["seq_inicio", "n_bloques", "motivo", "t_host", "filas_por_bloque"]
+SUFIJO_TIEMPOS    = "_tiempos.csv"
+ENCABEZADO_TIEMPOS = ["block_seq", "ms", "t_muestra0", "dt"]
+SUFIJO_RESUMEN    = "_resumen.json"
+SUFIJO_FALLAS     = "_fallas.csv"
+ENCABEZADO_FALLAS = ["block_seq", "mapa"]
+
+
+def _a_bytes_le(muestras):
+    """Muestras (array numpy (N, 6) o lista de tuplas) -> bytes int16 little-endian."""
+    if hasattr(muestras, "astype"):
+        return muestras.astype("<i2", copy=False).tobytes()
+    valores = array("h", itertools.chain.from_iterable(muestras))
+    if sys.byteorder == "big":
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def escribir_resumen(ruta_sin_extension, formato, filas, filas_datos, bloques, bloques_perdidos,
+                     muestras_fallidas=0):
+    """Deja <ruta>_resumen.json; `filas` cuenta también las filas en cero de los huecos."""
+    with open(ruta_sin_extension + SUFIJO_RESUMEN, "w") as f:
+        json.dump({
+            "formato":           formato,
+            "filas":             filas,
+            "filas_datos":       filas_datos,
+            "bloques":           bloques,
+            "bloques_perdidos":  bloques_perdidos,
+            "muestras_fallidas": muestras_fallidas,
+        }, f)
+
+
+def leer_resumen(ruta_sin_extension):
+    """El resumen que dejó el sumidero al cerrar, o None (sesión en curso o anterior al resumen)."""
+    try:
+        with open(ruta_sin_extension + SUFIJO_RESUMEN) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class _ConteoResumen:
+    """Contadores para el resumen; solo son válidos si el sumidero arrancó con archivos nuevos."""
+
+    def _iniciar_conteo(self, ruta_sin_extension, archivos_nuevos):
+        self.ruta_base         = ruta_sin_extension
+        self.resumen_valido    = archivos_nuevos
+        self.filas_datos       = 0
+        self.filas_hueco       = 0
+        self.bloques           = 0
+        self.bloques_perdidos  = 0
+        self.muestras_fallidas = 0
+        self.archivo_fallas    = None  # <nombre>_fallas.csv, se abre con la primera falla
+        if not archivos_nuevos:
+            # Se está agregando a una sesión ya cerrada: su resumen deja de valer
+            try:
+                os.remove(ruta_sin_extension + SUFIJO_RESUMEN)
+            except OSError:
+                pass
+
+    def _contar_bloque(self, n_filas):
+        self.filas_datos += n_filas
+        self.bloques     += 1
+
+    def _contar_hueco(self, n_bloques, filas_por_bloque):
+        self.filas_hueco      += n_bloques * filas_por_bloque
+        self.bloques_perdidos += n_bloques
+
+    def escribir_fallas(self, secuencia_bloque, mapa):
+        """Anota las muestras del bloque cuya lectura I2C falló (bit i del mapa = muestra i)."""
+        if self.archivo_fallas is None:
+            self.archivo_fallas = open(self.ruta_base + SUFIJO_FALLAS, "a", newline="")
+            self.escritor_fallas = csv.writer(self.archivo_fallas)
+            if self.archivo_fallas.tell() == 0:
+                self.escritor_fallas.writerow(ENCABEZADO_FALLAS)
+        self.escritor_fallas.writerow([secuencia_bloque, f"{mapa:x}"])
+        self.muestras_fallidas += mapa.bit_count()
+
+    def _cerrar_fallas(self):
+        if self.archivo_fallas is not None:
+            self.archivo_fallas.close()
+
+    def _escribir_resumen(self, formato):
+        if self.resumen_valido:
+            escribir_resumen(
+                self.ruta_base, formato, self.filas_datos + self.filas_hueco,
+                self.filas_datos, self.bloques, self.bloques_perdidos, self.muestras_fallidas,
+            )
+
+
+class SumideroCSV(_ConteoResumen):
+    """Una fila de texto por muestra: block_seq, ax, ay, az, gx, gy, gz (formato legado, ver arriba)."""
+
+    extension = ".csv"
+
+    def __init__(self, ruta_sin_extension):
+        self.ruta    = ruta_sin_extension + self.extension
+        self.ruta_huecos = ruta_sin_extension + SUFIJO_HUECOS
+        self.ruta_tiempos = ruta_sin_extension + SUFIJO_TIEMPOS
+        self.archivo = open(self.ruta, "a", newline="")
+        self.escritor = csv.writer(self.archivo)
+        self._iniciar_conteo(ruta_sin_extension, self.archivo.tell() == 0)
+        if self.archivo.tell() == 0:
+            self.escritor.writerow(ENCABEZADO_CSV)
+        # Se crea aunque no haya huecos: su presencia indica que el índice es completo
+        self.huecos = open(self.ruta_huecos, "a", newline="")
+        self.escritor_huecos = csv.writer(self.huecos)
+        if self.huecos.tell() == 0:
+            self.escritor_huecos.writerow(ENCABEZADO_HUECOS)
+        # Una línea por bloque: la muestra i del bloque se tomó en t_muestra0 + i * dt
+        self.tiempos = open(self.ruta_tiempos, "a", newline="")
+        self.escritor_tiempos = csv.writer(self.tiempos)
+        if self.tiempos.tell() == 0:
+            self.escritor_tiempos.writerow(ENCABEZADO_TIEMPOS)
+
+    def escribir_bloque(self, secuencia_bloque, muestras, t_host=0.0, ms=0, t_muestra0=0.0, dt=0.0):
+        if hasattr(muestras, "dtype"):
+            from decodificador_imu import filas_csv
+            self.escritor.writerows(filas_csv(secuencia_bloque, muestras))
+        else:
+            self.escritor.writerows([secuencia_bloque, *tupla] for tupla in muestras)
+        self.escritor_tiempos.writerow([secuencia_bloque, ms, f"{t_muestra0:.6f}", f"{dt:.9f}"])
+        self._contar_bloque(len(muestras))
+        return len(muestras)
+
+    def escribir_hueco(self, seq_inicio, n_bloques, filas_por_bloque, motivo, t_host=0.0):
+        """Filas en cero por cada bloque perdido (formato clásico) y una línea en _huecos.csv."""
+        for seq in range(seq_inicio, seq_inicio + n_bloques):
+            fila_cero = [seq, 0, 0, 0, 0, 0, 0]  # ax..gz = 0
+            self.escritor.writerows([fila_cero] * filas_por_bloque)
+        self.escritor_huecos.writerow(
+            [seq_inicio, n_bloques, NOMBRES_MOTIVO.get(motivo, motivo), f"{t_host:.6f}", filas_por_bloque]
+        )
+        self._contar_hueco(n_bloques, filas_por_bloque)
+        return n_bloques * filas_por_bloque
+
+    def vaciar(self):
+        self.archivo.flush()
+        self.huecos.flush()
+        self.tiempos.flush()
+        if self.archivo_fallas is not None:
+            self.archivo_fallas.flush()
+
+    def bytes_escritos(self):
+        """Tamaño actual de los archivos (sin lo que aún esté en el búfer de texto, < 8 KiB)."""
+        return self.archivo.buffer.tell() + self.huecos.buffer.tell() + self.tiempos.buffer.tell()
+
+    def cerrar(self):
+        self.archivo.close()
+        self.huecos.close()
+        self.tiempos.close()
+        self._cerrar_fallas()
+        self._escribir_resumen("csv")
+
+
+class SumideroBinario(_ConteoResumen):
+    """Registros int16 de ancho fijo en .imu más un índice de bloques y huecos en .idx."""
+
+    extension = EXTENSION_DATOS
+
+    def __init__(self, ruta_sin_extension):
+        self.ruta        = ruta_sin_extension + EXTENSION_DATOS
+        self.ruta_indice = ruta_sin_extension + EXTENSION_INDICE
+        self.datos  = open(self.ruta, "ab")
+        self.indice = open(self.ruta_indice, "ab")
+        self._iniciar_conteo(ruta_sin_extension, self.datos.tell() == 0 and self.indice.tell() == 0)
+        if self.datos.tell() == 0:
+            self.datos.write(struct.pack(FORMATO_CAB_DATOS, MARCA_DATOS, VERSION_BINARIO, COLUMNAS))
+        if self.indice.tell() == 0:
+            self.indice.write(struct.pack(FORMATO_CAB_INDICE, MARCA_INDICE, VERSION_BINARIO))
+        # Al reabrir en modo append, la próxima fila es la que sigue a las ya escritas
+        self.filas = (self.datos.tell() - TAMANO_CAB_DATOS) // TAMANO_REGISTRO
+
+    def escribir_bloque(self, secuencia_bloque, muestras, t_host=0.0, ms=0, t_muestra0=0.0, dt=0.0):
+        n_filas = len(muestras)
+        self.datos.write(_a_bytes_le(muestras))
+        self.indice.write(struct.pack(
+            FORMATO_ENTRADA, secuencia_bloque, 1, n_filas, TIPO_DATOS, 0, self.filas,
+            t_host, t_muestra0, dt, ms,
+        ))
+        self.filas += n_filas
+        self._contar_bloque(n_filas)
+        return n_filas
+
+    def escribir_hueco(self, seq_inicio, n_bloques, filas_por_bloque, motivo, t_host=0.0):
+        """Una sola entrada de índice para todo el rango perdido; no escribe filas."""
+        self.indice.write(struct.pack(
+            FORMATO_ENTRADA, seq_inicio, n_bloques, filas_por_bloque, TIPO_HUECO, motivo,
+            self.filas, t_host, 0.0, 0.0, 0,
+        ))
+        self._contar_hueco(n_bloques, filas_por_bloque)
+        return 0
+
+    def vaciar(self):
+        self.datos.flush()
+        self.indice.flush()
+        if self.archivo_fallas is not None:
+            self.archivo_fallas.flush()
+
+    def bytes_escritos(self):
+        return self.datos.tell() + self.indice.tell()
+
+    def cerrar(self):
+        self.datos.close()
+        self.indice.close()
+        self._cerrar_fallas()
+        self._escribir_resumen("binario")
+
+
+SUMIDEROS = {
+    "csv": SumideroCSV,
+    "binario": SumideroBinario,
+}
+
+
+def abrir_sumidero(tipo, ruta_sin_extension):
+    """Crea el sumidero `tipo` ("csv" o "binario") para la ruta dada sin extensión."""
+    try:
+        clase = SUMIDEROS[tipo]
+    except KeyError:
+        raise ValueError(f"Tipo de sumidero desconocido: {tipo!r} (opciones: {', '.join(SUMIDEROS)})")
+    return clase(ruta_sin_extension)
+
+
+def leer_indice(ruta_indice):
+    """Devuelve la lista de entradas (EntradaIndice) de un .idx."""
+    with open(ruta_indice, "rb") as f:
+        contenido = f.read()
+    marca, version = struct.unpack_from(FORMATO_CAB_INDICE, contenido)
+    if marca != MARCA_INDICE or version != VERSION_BINARIO:
+        raise ValueError(f"{ruta_indice}: índice no reconocido ({marca!r}, v{version})")
+    cuerpo = contenido[TAMANO_CAB_INDICE:]
+    completo = len(cuerpo) - len(cuerpo) % TAMANO_ENTRADA  # ignora una entrada a medio escribir
+    return [EntradaIndice._make(e) for e in struct.iter_unpack(FORMATO_ENTRADA, cuerpo[:completo])]
+
+
+def leer_huecos(ruta_sin_extension):
+    """
+    Huecos registrados para un dispositivo como lista de
+    (seq_inicio, n_bloques, motivo, filas_por_bloque), leyendo solo el índice
+    binario o el _huecos.csv (nunca las filas de datos). filas_por_bloque es
+    None en los _huecos.csv anteriores a los bloques de tamaño variable.
+    Devuelve None si no hay ni índice ni archivo de huecos.
+    """
+    if os.path.isfile(ruta_sin_extension + EXTENSION_INDICE):
+        return [
+            (e.block_seq, e.n_bloques, NOMBRES_MOTIVO.get(e.motivo, e.motivo), e.n_filas)
+            for e in leer_indice(ruta_sin_extension + EXTENSION_INDICE)
+            if e.tipo == TIPO_HUECO
+        ]
+    ruta_huecos = ruta_sin_extension + SUFIJO_HUECOS
+    if os.path.isfile(ruta_huecos):
+        with open(ruta_huecos, newline="") as f:
+            return [
+                (int(fila["seq_inicio"]), int(fila["n_bloques"]), fila["motivo"],
+                 int(fila["filas_por_bloque"]) if fila.get("filas_por_bloque") else None)
+                for fila in csv.DictReader(f)
+            ]
+    return None
+
+
+def leer_fallas(ruta_sin_extension):
+    """{block_seq: mapa} de los bloques v2 con lecturas I2C fallidas ({} si no hubo)."""
+    try:
+        with open(ruta_sin_extension + SUFIJO_FALLAS, newline="") as f:
+            return {int(fila["block_seq"]): int(fila["mapa"], 16) for fila in csv.DictReader(f)}
+    except OSError:
+        return {}
+
+
+def leer_muestras(ruta_datos):
+    """Lee el .imu completo como array('h') plano (ax,ay,az,gx,gy,gz, ax, ...)."""
+    with open(ruta_datos, "rb") as f:
+        contenido = f.read()
+    marca, version, columnas = struct.unpack_from(FORMATO_CAB_DATOS, contenido)
+    if marca != MARCA_DATOS or version != VERSION_BINARIO or columnas != COLUMNAS:
+        raise ValueError(f"{ruta_datos}: archivo de datos no reconocido ({marca!r}, v{version})")
+    cuerpo = contenido[TAMANO_CAB_DATOS:]
+    valores = array("h")
+    valores.frombytes(cuerpo[:len(cuerpo) - len(cuerpo) % TAMANO_REGISTRO])
+    if sys.byteorder == "big":
+        valores.byteswap()
+    return valores
+
+
+def binario_a_csv(ruta_sin_extension, ruta_csv=None):
+    """
+    Escribe el CSV clásico (block_seq, ax..gz) a partir de <ruta>.imu + <ruta>.idx.
+    Los huecos se expanden a filas en cero, como los escribía el receptor original,
+    y las marcas de tiempo por bloque se escriben en <ruta>_tiempos.csv.
+    """
+    ruta_csv = ruta_csv or ruta_sin_extension + ".csv"
+    entradas = leer_indice(ruta_sin_extension + EXTENSION_INDICE)
+    valores  = leer_muestras(ruta_sin_extension + EXTENSION_DATOS)
+    total_filas = len(valores) // COLUMNAS
+
+    filas = 0
+    with open(ruta_csv, "w", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(ENCABEZADO_CSV)
+        for e in entradas:
+            if e.tipo == TIPO_HUECO:
+                for seq in range(e.block_seq, e.block_seq + e.n_bloques):
+                    escritor.writerows([[seq, 0, 0, 0, 0, 0, 0]] * e.n_filas)
+                filas += e.n_bloques * e.n_filas
+                continue
+            fin = min(e.fila_inicio + e.n_filas, total_filas)
+            for fila in range(e.fila_inicio, fin):
+                escritor.writerow([e.block_seq, *valores[fila * COLUMNAS:(fila + 1) * COLUMNAS]])
+            filas += max(fin - e.fila_inicio, 0)
+
+    with open(ruta_sin_extension + SUFIJO_TIEMPOS, "w", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(ENCABEZADO_TIEMPOS)
+        escritor.writerows(
+            [e.block_seq, e.ms, f"{e.t_muestra0:.6f}", f"{e.dt:.9f}"]
+            for e in entradas if e.tipo == TIPO_DATOS
+        )
+    return filas
+
+
+def existe_binario(ruta_sin_extension):
+    return os.path.isfile(ruta_sin_extension + EXTENSION_DATOS) and \
+        os.path.isfile(ruta_sin_extension + EXTENSION_INDICE)